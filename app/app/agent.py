@@ -1,13 +1,26 @@
 
 # Basic agent implementation for the codebase using local service classes only
-from src.services.itinerary_generator import ItineraryGenerator
+import os
+
+from src.services.booking_payment import BookingPaymentService
+from src.services.condition_monitor import ConditionMonitor
 from src.services.cost_sharing import CostSharingService
+from src.services.feedback_analytics import FeedbackAnalytics
+from src.services.firebase_gateway import FirebaseGateway
+from src.services.interfaces.multilingual_support import MultilingualSupportInterface
+from src.services.interfaces.user_interaction import UserInteractionInterface
+from src.services.itinerary_cache import ItineraryCache
+from src.services.itinerary_generator import ItineraryGenerator
 from src.services.multilingual_support import MultilingualSupportService
-from src.interfaces.multilingual_support import MultilingualSupportInterface
+from src.services.recommendations_repository import RecommendationsRepository
+from src.services.recommendations_snapshot import SnapshotLoader, snapshots_available
+from src.services.share_snapshots import LocalArtifactStore, ShareSnapshotService
 from src.services.testing_feedback import TestingFeedbackService
-from src.services.booking_payment import BookingPaymentService
+from src.services.tracing import instrument
 from src.services.user_profile import UserProfileService
-from src.interfaces.user_interaction import UserInteractionInterface
+
+from .workflow import Step, Workflow
+
 
 # Dummy clients for illustration (replace with actual clients)
 class DummyAIClient:
@@ -15,19 +28,35 @@ class DummyAIClient:
         return f"[Translated to {target_language}]: {text}"
 
 class DummyFirebaseClient:
+    def save_itinerary(self, user_id, itinerary):
+        pass
     def get_cost_breakdown(self, itinerary_id):
         return {"total": 1000, "details": {}}
+    def get_itinerary(self, itinerary_id):
+        return None
+    def update_itinerary(self, itinerary_id, updates):
+        pass
     def generate_shareable_link(self, itinerary_id):
         return f"https://share/{itinerary_id}"
-    def save_feedback(self, user_id, feedback):
+    def save_feedback(self, user_id, feedback, key=None):
         pass
     def save_booking_confirmation(self, itinerary_id, booking_confirmation):
         pass
+    def save_booking_request(self, user_id, key, booking_details):
+        pass
+    def save_payment_confirmation(self, user_id, key, payment_details):
+        pass
     def save_user_profile(self, user_id, user_data):
         pass
+    def get_user_profile(self, user_id):
+        return {"user_id": user_id, "preferences": {}, "history": []}
+    def update_user_profile(self, user_id, updates):
+        pass
 
 class DummyBigQueryClient:
-    def query(self, query):
+    def query(self, query, job_config=None):
+        return []
+    def insert_rows_json(self, table, rows, row_ids=None):
         return []
 
 class DummyEMTClient:
@@ -39,61 +68,161 @@ class DummyPaymentClient:
         return {"status": "paid"}
 
 ai_client = DummyAIClient()
-firebase_client = DummyFirebaseClient()
+# Write-behind batching in front of Firebase; bookings are still committed before the response
+firebase_client = FirebaseGateway(DummyFirebaseClient())
 bigquery_client = DummyBigQueryClient()
 emt_client = DummyEMTClient()
 payment_client = DummyPaymentClient()
 maps_api_key = "dummy-key"
 
 # Instantiate services
-itinerary_service = ItineraryGenerator(ai_client, maps_api_key, bigquery_client, firebase_client)
-cost_service = CostSharingService(firebase_client)
+itinerary_cache = ItineraryCache()
+# With pyarrow, recommendations are served from a memory-mapped Arrow export of the table,
+# refreshed in the background; without it, from the in-process index
+recommendations_snapshot = SnapshotLoader(os.getenv("RECOMMENDATIONS_SNAPSHOT", os.path.join("data", "recommendations.arrow"))) if snapshots_available() else None
+recommendations_repository = RecommendationsRepository(bigquery_client, snapshot=recommendations_snapshot)
+# Re-plans saved itineraries as weather and traffic change; fetches conditions once per region
+condition_monitor = ConditionMonitor(lambda itinerary_id, conditions: itinerary_service.adjust_realtime(itinerary_id, conditions))
+# Saved and adjusted itineraries refresh their cost breakdown, so cost reads are served from memory
+itinerary_service = ItineraryGenerator(ai_client, maps_api_key, bigquery_client, firebase_client, cache=itinerary_cache, recommendations=recommendations_repository, monitor=condition_monitor,
+                                       on_update=lambda itinerary: cost_service.track_itinerary(itinerary))
+# Shared links point to static, content-hashed exports when a snapshot directory is configured.
+# The app does not serve that directory: SHARE_BASE_URL must point at an origin that serves it
+# with the Cache-Control/ETag headers recorded in each file's .headers.json sidecar.
+share_snapshot_dir = os.getenv("SHARE_SNAPSHOT_DIR")
+share_snapshots = ShareSnapshotService(LocalArtifactStore(share_snapshot_dir, base_url=os.getenv("SHARE_BASE_URL", "https://share/"))) if share_snapshot_dir else None
+cost_service = CostSharingService(firebase_client, snapshots=share_snapshots)
 translation_service: MultilingualSupportInterface = MultilingualSupportService(ai_client)
-feedback_service = TestingFeedbackService(firebase_client, bigquery_client)
+# Feedback analytics are kept as running aggregates, checkpointed to disk when a path is configured
+feedback_analytics = FeedbackAnalytics(checkpoint_path=os.getenv("FEEDBACK_ANALYTICS_CHECKPOINT"))
+feedback_service = TestingFeedbackService(firebase_client, bigquery_client, analytics=feedback_analytics)
 booking_service = BookingPaymentService(emt_client, firebase_client, payment_client)
 user_profile_service: UserInteractionInterface = UserProfileService(firebase_client)
 
-# Basic agent functions
+# Background work (write-behind flusher, recommendations snapshot, condition polling,
+# analytics checkpoints) starts with the app, not at import; until then every service
+# still works, synchronously and without polling.
+def start_background_services():
+    firebase_client.start()
+    recommendations_repository.start()
+    condition_monitor.start()
+    feedback_analytics.start()
+    # Without a checkpoint, start from one aggregate query over the feedback table
+    feedback_service.seed_analytics()
+
+def stop_background_services():
+    condition_monitor.stop()
+    recommendations_repository.stop()
+    feedback_analytics.stop()
+    firebase_client.stop()
+
+# Basic agent functions; each runs in an "agent.<step>" span that its client calls nest under
+@instrument("agent.itinerary")
 def itinerary_agent(user_id, preferences, session_state):
-    itinerary = itinerary_service.generate_itinerary(user_id, preferences)
+    # generate() also computes the cost breakdown, so the cost step is served from memory
+    itinerary = itinerary_service.generate(user_id, preferences)
+    session_state["itinerary"] = itinerary
+    return itinerary
+
+@instrument("agent.itinerary")
+async def aitinerary_agent(user_id, preferences, session_state):
+    itinerary = await itinerary_service.agenerate(user_id, preferences)
     session_state["itinerary"] = itinerary
     return itinerary
 
+@instrument("agent.cost")
 def cost_agent(itinerary_id, session_state):
     cost = cost_service.get_cost_breakdown(itinerary_id)
     session_state["cost"] = cost
     return {"status": "success", "cost": cost}
 
+@instrument("agent.cost")
+async def acost_agent(itinerary_id, session_state):
+    cost = await cost_service.aget_cost_breakdown(itinerary_id)
+    session_state["cost"] = cost
+    return {"status": "success", "cost": cost}
+
+@instrument("agent.translation")
 def translation_agent(text, target_language, session_state):
     translated = translation_service.translate(text, target_language)
     session_state["translated"] = translated
     return {"status": "success", "translated": translated}
 
+@instrument("agent.translation")
+async def atranslation_agent(text, target_language, session_state):
+    translated = await translation_service.atranslate(text, target_language)
+    session_state["translated"] = translated
+    return {"status": "success", "translated": translated}
+
+@instrument("agent.feedback")
 def feedback_agent(user_id, feedback, session_state):
+    if not feedback:
+        # Workflow run without feedback: nothing to record
+        return {"status": "skipped", "message": "No feedback"}
     feedback_service.collect_feedback(user_id, feedback)
     session_state.setdefault("feedbacks", []).append(feedback)
     return {"status": "success", "message": "Feedback collected"}
 
+@instrument("agent.feedback")
+async def afeedback_agent(user_id, feedback, session_state):
+    if not feedback:
+        return {"status": "skipped", "message": "No feedback"}
+    await feedback_service.acollect_feedback(user_id, feedback)
+    session_state.setdefault("feedbacks", []).append(feedback)
+    return {"status": "success", "message": "Feedback collected"}
+
+@instrument("agent.booking")
 def booking_agent(itinerary_id, payment_info, session_state):
     booking_confirmation = booking_service.book(itinerary_id, payment_info)
     session_state["booking_confirmation"] = booking_confirmation
     return {"status": "success", "booking_confirmation": booking_confirmation}
 
+@instrument("agent.booking")
+async def abooking_agent(itinerary_id, payment_info, session_state):
+    booking_confirmation = await booking_service.abook(itinerary_id, payment_info)
+    session_state["booking_confirmation"] = booking_confirmation
+    return {"status": "success", "booking_confirmation": booking_confirmation}
+
+@instrument("agent.update_name")
 def update_name(user_id, name, session_state):
     user_profile_service.update_name(user_id, name)
     session_state.setdefault("user_profile", {})["name"] = name
     return {"status": "success", "name": name}
 
+@instrument("agent.update_age")
 def update_age(user_id, age, session_state):
     user_profile_service.update_age(user_id, age)
     session_state.setdefault("user_profile", {})["age"] = age
     return {"status": "success", "age": age}
 
+@instrument("agent.realtime_adjustment")
 def realtime_adjustment_agent(itinerary_id, session_state):
     # Placeholder: implement actual adjustment logic
     session_state["adjusted_itinerary"] = {"id": itinerary_id, "adjusted": True}
     return {"status": "success", "adjusted_itinerary": session_state["adjusted_itinerary"]}
 
+# Workflow steps: each declares the session_state keys it reads and writes; afn is the
+# async agent Workflow.arun() awaits on the event loop (the routes' path)
+itinerary_step = Step("itinerary", itinerary_agent, inputs=("user_id", "preferences"), outputs=("itinerary",),
+                      args=lambda s: (s["user_id"], s["preferences"]), afn=aitinerary_agent)
+cost_step = Step("cost", cost_agent, inputs=("itinerary",), outputs=("cost",),
+                 args=lambda s: (s["itinerary"]["id"],), afn=acost_agent)
+translation_step = Step("translation", translation_agent, inputs=("itinerary", "target_language"), outputs=("translated",),
+                        args=lambda s: (s["itinerary"].get("summary", ""), s["target_language"]), afn=atranslation_agent)
+feedback_step = Step("feedback", feedback_agent, inputs=("user_id", "feedback"), outputs=("feedbacks",),
+                     args=lambda s: (s["user_id"], s["feedback"]), afn=afeedback_agent)
+booking_step = Step("booking", booking_agent, inputs=("itinerary", "payment_info"), outputs=("booking_confirmation",),
+                    args=lambda s: (s["itinerary"]["id"], s["payment_info"]), afn=abooking_agent)
+realtime_step = Step("realtime_adjustment", realtime_adjustment_agent, inputs=("itinerary",), outputs=("adjusted_itinerary",),
+                     args=lambda s: (s["itinerary"]["id"],))
+
+# Full trip planning: the itinerary and feedback steps start together, everything keyed on the itinerary id fans out after it
+trip_planner_workflow = Workflow("trip_planner", [itinerary_step, cost_step, translation_step, feedback_step, booking_step, realtime_step])
+# Follow-up steps for an itinerary already in session_state
+parallel_workflow = Workflow("parallel", [cost_step, translation_step, booking_step, realtime_step])
+# Feedback collection loop
+loop_workflow = Workflow("feedback_loop", [feedback_step], max_workers=1)
+
 # Example workflow runner
 def run_agent_workflow(user_id, preferences, user_data, payment_info, target_language="en", feedback=None):
     session_state = {
@@ -104,11 +233,4 @@ def run_agent_workflow(user_id, preferences, user_data, payment_info, target_lan
         "target_language": target_language,
         "feedback": feedback or {},
     }
-    itinerary_agent(user_id, preferences, session_state)
-    cost_agent(session_state["itinerary"]["id"], session_state)
-    translation_agent(session_state["itinerary"].get("summary", ""), target_language, session_state)
-    feedback_agent(user_id, feedback or "", session_state)
-    booking_agent(session_state["itinerary"]["id"], payment_info, session_state)
-    realtime_adjustment_agent(session_state["itinerary"]["id"], session_state)
-    return session_state
-
+    return trip_planner_workflow.run(session_state)
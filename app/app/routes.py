@@ -0,0 +1,451 @@
+"""
+Async trip planner routes.
+
+These endpoints used to be synchronous Flask handlers in src/app.py. Every
+service call is awaited through src.services.async_support.call, so a slow
+Gemini, Maps or EMT call holds a coroutine rather than a worker thread; the
+trip planner workflow behind /itinerary runs on the event loop (Workflow.arun).
+"""
+
+import functools
+import os
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from src.services.async_support import call
+from src.services.booking_payment import ALL_OR_NOTHING, BookingError
+from src.services.codecs import dumps_json
+from src.services.feedback_ingestion import (
+    Backpressure,
+    BigQuerySink,
+    CloudLoggingSink,
+    FeedbackIngestion,
+    FeedbackServiceSink,
+    Journal,
+)
+
+
+class CodecJSONResponse(JSONResponse):
+    """JSON response rendered with the fast codec (orjson when installed)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+router = APIRouter(default_response_class=CodecJSONResponse)
+
+# Feedback journal location unless FEEDBACK_JOURNAL is set (relative to the working directory)
+DEFAULT_FEEDBACK_JOURNAL = os.path.join("data", "feedback.journal")
+
+
+@dataclass
+class TripPlannerServices:
+    """Service objects the routes depend on, stored on app.state.services."""
+
+    itinerary: Any
+    cost: Any
+    translation: Any
+    feedback: Any
+    user_profile: Any
+    booking: Any
+    trip_planner: Any
+    feedback_loop: Any
+    feedback_logger: Any = None
+    feedback_ingestion: Any = None
+
+
+def build_default_services(feedback_logger: Any = None) -> TripPlannerServices:
+    """Build the services wired up in app/app/agent.py.
+
+    Args:
+        feedback_logger: Optional Cloud Logging logger that receives every feedback payload.
+
+    Returns:
+        The services container for app.state.services.
+    """
+    from . import agent
+
+    # Feedback is queued and written in batches: Firebase + analytics, BigQuery rows, Cloud Logging
+    sinks = [FeedbackServiceSink(agent.feedback_service), BigQuerySink(agent.bigquery_client)]
+    if feedback_logger is not None:
+        sinks.append(CloudLoggingSink(feedback_logger))
+    # Feedback is acknowledged with 202 once it is fsynced here, so the journal is always on
+    journal_path = os.getenv("FEEDBACK_JOURNAL", DEFAULT_FEEDBACK_JOURNAL)
+    feedback_ingestion = FeedbackIngestion(
+        sinks,
+        journal=Journal(journal_path),
+        dead_letter_journal=Journal(f"{journal_path}.dead"),
+    )
+    feedback_ingestion.start()
+
+    return TripPlannerServices(
+        itinerary=agent.itinerary_service,
+        cost=agent.cost_service,
+        translation=agent.translation_service,
+        feedback=agent.feedback_service,
+        user_profile=agent.user_profile_service,
+        booking=agent.booking_service,
+        trip_planner=agent.trip_planner_workflow,
+        feedback_loop=agent.loop_workflow,
+        feedback_logger=feedback_logger,
+        feedback_ingestion=feedback_ingestion,
+    )
+
+
+def get_services(request: Request) -> TripPlannerServices:
+    services = getattr(request.app.state, "services", None)
+    if services is None:
+        services = request.app.state.services = build_default_services()
+    return services
+
+
+# Route parameter types; Annotated keeps FastAPI's markers out of the defaults
+Services = Annotated[TripPlannerServices, Depends(get_services)]
+JSONBody = Annotated[dict, Body()]
+IdempotencyKey = Annotated[str | None, Header()]
+
+
+@router.post("/profile", status_code=201)
+async def create_profile(
+    user_data: JSONBody, services: Services
+) -> dict[str, str]:
+    await call(services.user_profile.create_profile, user_data)
+    return {"status": "success", "message": "Profile created"}
+
+
+@router.post("/itinerary")
+async def generate_itinerary(
+    data: JSONBody, services: Services
+) -> JSONResponse:
+    session_state = {
+        "user_id": data.get("user_id"),
+        "preferences": data.get("preferences", {}),
+        "target_language": data.get("target_language", "en"),
+        "feedback": data.get("feedback", {}),
+    }
+    # Awaited on the event loop: async agent steps await their clients natively
+    result = await services.trip_planner.arun(session_state)
+    # Returned as a Response so the session state is encoded once, without jsonable_encoder
+    return CodecJSONResponse(result)
+
+
+@router.post("/itinerary/stream")
+async def stream_itinerary(
+    request: Request,
+    data: JSONBody,
+    services: Services,
+) -> StreamingResponse:
+    events = services.itinerary.generate_stream(
+        data.get("user_id"), data.get("preferences", {})
+    )
+    return event_stream_response(request, events)
+
+
+@router.post("/itinerary/{itinerary_id}/adjust")
+async def adjust_itinerary(
+    itinerary_id: str, services: Services
+) -> Any:
+    return await call(services.itinerary.adjust_realtime, itinerary_id)
+
+
+@router.post("/feedback", status_code=202)
+async def collect_feedback(
+    data: JSONBody, services: Services
+) -> CodecJSONResponse:
+    """Collect and log feedback.
+
+    With an ingestion pipeline the feedback is queued and the request returns 202
+    at once; otherwise the feedback workflow runs inline and the request returns
+    201. (The original handler answered 200; clients should accept any 2xx.)
+
+    Args:
+        data: Feedback payload: user_id and feedback, or the original typed
+            Feedback body (score, text, invocation_id, log_type, service_name, user_id).
+
+    Returns:
+        The queued feedback id, or the feedback workflow result
+
+    Raises:
+        HTTPException: 422 when the body carries no feedback, 503 with Retry-After
+            when the ingestion queue is full.
+    """
+    user_id, feedback = _feedback_of(data)
+    if not feedback:
+        raise HTTPException(status_code=422, detail="Feedback body needs 'feedback' or 'score'")
+    if services.feedback_ingestion is not None:
+        try:
+            feedback_id = await call(
+                services.feedback_ingestion.submit,
+                user_id,
+                feedback,
+                payload=data,
+            )
+        except Backpressure as exc:
+            raise HTTPException(
+                status_code=503, detail=str(exc), headers={"Retry-After": "1"}
+            ) from exc
+        return CodecJSONResponse(
+            {"status": "accepted", "message": "Feedback queued", "feedback_id": feedback_id},
+            status_code=202,
+        )
+    if services.feedback_logger is not None:
+        await call(services.feedback_logger.log_struct, data, severity="INFO")
+    session_state = {"user_id": user_id, "feedback": feedback}
+    result = await call(services.feedback_loop.run, session_state)
+    return CodecJSONResponse(
+        {"status": "success", "message": "Feedback collected", "workflow_result": result},
+        status_code=201,
+    )
+
+
+def _feedback_of(data: dict) -> tuple[Any, Any]:
+    """User id and feedback of a /feedback body, in either accepted shape.
+
+    Args:
+        data: The request body.
+
+    Returns:
+        (user_id, feedback); the original typed Feedback body becomes a feedback
+        dict with its score as the rating.
+    """
+    if "feedback" in data:
+        return data.get("user_id"), data["feedback"]
+    if "score" not in data:
+        return data.get("user_id"), None
+    feedback = {key: data[key] for key in ("text", "invocation_id", "service_name") if data.get(key)}
+    return data.get("user_id") or None, {"rating": data["score"], "score": data["score"], **feedback}
+
+
+@router.get("/feedback/analytics")
+async def feedback_analytics(
+    services: Services,
+) -> Any:
+    return await call(services.feedback.analyze_feedback)
+
+
+@router.get("/feedback/export")
+async def export_feedback(
+    services: Services,
+    page_size: int = 1000,
+    page_token: str | None = None,
+) -> Any:
+    """Export raw feedback rows one page at a time.
+
+    Args:
+        page_size: Rows per page.
+        page_token: next_page_token from the previous page.
+
+    Returns:
+        The rows of this page and the token for the next one.
+    """
+    try:
+        return await call(services.feedback.export_feedback, page_size, page_token)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.post("/translate")
+async def translate(
+    data: JSONBody, services: Services
+) -> dict[str, Any]:
+    try:
+        translated = await call(
+            services.translation.translate,
+            data.get("text"),
+            data.get("target_language", "en"),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    return {"translated_text": translated}
+
+
+@router.get("/cost/{itinerary_id}")
+async def cost_breakdown(
+    itinerary_id: str, services: Services
+) -> Any:
+    return await call(services.cost.get_cost_breakdown, itinerary_id)
+
+
+@router.post("/cost/{itinerary_id}/items")
+async def update_cost_item(
+    itinerary_id: str,
+    item: JSONBody,
+    services: Services,
+) -> Any:
+    """Add or change one line item and return the updated breakdown.
+
+    Args:
+        itinerary_id: The itinerary.
+        item: item_id, category, amount, and optionally quantity and shares.
+
+    Returns:
+        The updated cost breakdown.
+    """
+    try:
+        return await call(services.cost.update_item, itinerary_id, item)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"No cost breakdown for {itinerary_id}") from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+
+@router.delete("/cost/{itinerary_id}/items/{item_id}")
+async def remove_cost_item(
+    itinerary_id: str, item_id: str, services: Services
+) -> Any:
+    """Remove one line item and return the updated breakdown.
+
+    Args:
+        itinerary_id: The itinerary.
+        item_id: The line item to remove.
+
+    Returns:
+        The updated cost breakdown.
+    """
+    try:
+        return await call(services.cost.remove_item, itinerary_id, item_id)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"No cost breakdown for {itinerary_id}") from exc
+
+
+@router.put("/cost/{itinerary_id}/split")
+async def set_cost_split(
+    itinerary_id: str,
+    data: JSONBody,
+    services: Services,
+) -> Any:
+    """Set the travellers and split mode (equal, weighted or itemised).
+
+    Args:
+        itinerary_id: The itinerary.
+        data: travellers, mode and, for weighted splits, weights.
+
+    Returns:
+        The updated cost breakdown.
+    """
+    try:
+        return await call(
+            services.cost.set_split,
+            itinerary_id,
+            data.get("travellers", []),
+            data.get("mode", "equal"),
+            data.get("weights"),
+        )
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"No cost breakdown for {itinerary_id}") from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+
+@router.get("/share/{itinerary_id}")
+async def share_itinerary(
+    itinerary_id: str, services: Services
+) -> dict[str, Any]:
+    snapshot = await call(services.cost.share_snapshot, itinerary_id)
+    if snapshot is not None:
+        # Static exports: served by the artifact store / CDN, never by this app
+        return {"shareable_link": snapshot["link"], "snapshot": snapshot}
+    link = await call(services.cost.share_itinerary, itinerary_id)
+    return {"shareable_link": link}
+
+
+@router.post("/book")
+async def book_itinerary(
+    data: JSONBody,
+    services: Services,
+    idempotency_key: IdempotencyKey = None,
+) -> dict[str, Any]:
+    """Book an itinerary and take payment.
+
+    Args:
+        data: itinerary_id and payment_info.
+        idempotency_key: Optional Idempotency-Key header; a retried request with the
+            same key returns the original booking instead of booking again. Without
+            it, only an identical request within a minute is treated as a retry.
+
+    Returns:
+        The booking confirmation and payment status.
+    """
+    try:
+        booking_confirmation, payment_status = await call(
+            services.booking.book,
+            data.get("itinerary_id"),
+            data.get("payment_info"),
+            idempotency_key=idempotency_key,
+        )
+    except BookingError as exc:
+        status_code = 402 if exc.step in ("payment", "capture") else 409
+        raise HTTPException(status_code=status_code, detail=str(exc)) from exc
+    return {
+        "booking_confirmation": booking_confirmation,
+        "payment_status": payment_status,
+    }
+
+
+@router.post("/book/legs")
+async def book_itinerary_legs(
+    data: JSONBody,
+    services: Services,
+    idempotency_key: IdempotencyKey = None,
+) -> dict[str, Any]:
+    """Book an itinerary leg by leg (hotels, trains, activities).
+
+    Args:
+        data: itinerary_id, payment_info, and optionally legs, mode
+            ("all_or_nothing" or "best_effort") and max_parallel.
+        idempotency_key: Optional Idempotency-Key header.
+
+    Returns:
+        The batch status, per-leg statuses and the payment status.
+    """
+    try:
+        report = await call(
+            services.booking.book_legs,
+            data.get("itinerary_id"),
+            data.get("payment_info"),
+            legs=data.get("legs"),
+            mode=data.get("mode", ALL_OR_NOTHING),
+            max_parallel=data.get("max_parallel", 8),
+            idempotency_key=idempotency_key,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    except BookingError as exc:
+        status_code = 402 if exc.step == "payment" else 409
+        detail = exc.report.to_dict() if exc.report is not None else str(exc)
+        raise HTTPException(status_code=status_code, detail=detail) from exc
+    return report.to_dict()
+
+
+def event_stream_response(request: Request, events: Iterator[dict]) -> StreamingResponse:
+    """Stream events as Server-Sent Events or NDJSON, depending on the Accept header.
+
+    Args:
+        request: The incoming request.
+        events: Blocking iterator of event dicts; it is advanced off the event loop.
+
+    Returns:
+        A streaming response with proxy buffering disabled.
+    """
+    if "text/event-stream" in request.headers.get("accept", ""):
+        media_type = "text/event-stream"
+
+        def encode(event: dict) -> bytes:
+            return b"event: " + event["event"].encode() + b"\ndata: " + dumps_json(event) + b"\n\n"
+    else:
+        media_type = "application/x-ndjson"
+
+        def encode(event: dict) -> bytes:
+            return dumps_json(event) + b"\n"
+
+    async def body() -> AsyncIterator[bytes]:
+        done = object()
+        while (event := await call(functools.partial(next, events, done))) is not done:
+            yield encode(event)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(body(), media_type=media_type, headers=headers)
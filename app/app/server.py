@@ -13,17 +13,23 @@
 # limitations under the License.
 
 import os
+from contextlib import asynccontextmanager
 
 import google.auth
 from fastapi import FastAPI
 from google.adk.cli.fast_api import get_fast_api_app
 from google.cloud import logging as google_cloud_logging
-from opentelemetry import trace
-from opentelemetry.sdk.trace import TracerProvider, export
 
+from app import agent
+from app.routes import build_default_services, router
 from app.utils.gcs import create_bucket_if_not_exists
 from app.utils.tracing import CloudTraceLoggingSpanExporter
-from app.utils.typing import Feedback
+from src.services.tracing import DEFAULT_SAMPLE_RATE, configure_tracing
+
+try:
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+except ImportError:
+    FastAPIInstrumentor = None
 
 _, project_id = google.auth.default()
 logging_client = google_cloud_logging.Client()
@@ -37,10 +43,14 @@ create_bucket_if_not_exists(
     bucket_name=bucket_name, project=project_id, location="us-central1"
 )
 
-provider = TracerProvider()
-processor = export.BatchSpanProcessor(CloudTraceLoggingSpanExporter())
-provider.add_span_processor(processor)
-trace.set_tracer_provider(provider)
+# Sampled spans for every service call and agent step. TRACE_EXPORTER: "cloud"
+# (default), "otlp" or "file" (JSON lines at TRACE_FILE, for offline use).
+trace_exporter = os.getenv("TRACE_EXPORTER", "cloud")
+provider = configure_tracing(
+    exporter=CloudTraceLoggingSpanExporter() if trace_exporter == "cloud" else trace_exporter,
+    path=os.getenv("TRACE_FILE", "traces.jsonl"),
+    sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", DEFAULT_SAMPLE_RATE)),
+)
 
 AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # In-memory session configuration - no persistent storage
@@ -57,18 +67,28 @@ app.title = "travel-recommendation"
 app.description = "API for interacting with the Agent travel-recommendation"
 
 
-@app.post("/feedback")
-def collect_feedback(feedback: Feedback) -> dict[str, str]:
-    """Collect and log feedback.
+# Trip planner routes (profile, itinerary, feedback, translate, cost, share, book)
+app.state.services = build_default_services(feedback_logger=logger)
+app.include_router(router)
+
+# Background threads run for the app's lifetime, around the ADK app's own lifespan
+adk_lifespan = app.router.lifespan_context
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    agent.start_background_services()
+    try:
+        async with adk_lifespan(app) as state:
+            yield state
+    finally:
+        agent.stop_background_services()
 
-    Args:
-        feedback: The feedback data to log
 
-    Returns:
-        Success message
-    """
-    logger.log_struct(feedback.model_dump(), severity="INFO")
-    return {"status": "success"}
+app.router.lifespan_context = lifespan
+if FastAPIInstrumentor is not None:
+    # Server span per request, parent of the agent and client spans
+    FastAPIInstrumentor.instrument_app(app, tracer_provider=provider)
 
 
 # Main execution
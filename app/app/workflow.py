@@ -0,0 +1,241 @@
+"""
+Dependency-graph workflow runner for the trip planner agents.
+
+Each step declares which session_state keys it reads and which it writes. Steps
+whose inputs are available run concurrently, at most max_workers at a time per
+run, on a thread pool shared by the workflow's runs and sized for max_runs of them
+at once. arun() schedules the same way on the event loop, awaiting each step's
+async agent where it has one. The runner records per-step status and timings under
+session_state["workflow"], and traces each run as a span the steps' spans nest under.
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.services.async_support import OFFLOAD_WORKERS, call
+from src.services.tracing import bind, span
+
+
+@dataclass(frozen=True)
+class Step:
+    """A single agent call in a workflow.
+
+    Attributes:
+        name: Unique step name, used for timings and error reporting.
+        fn: Agent function, called as fn(*args(session_state), session_state).
+        inputs: session_state keys that must be present before the step runs.
+        outputs: session_state keys the step writes.
+        args: Builds the agent's positional arguments from session_state.
+        afn: Optional async agent with fn's signature, awaited by arun(); without
+            it arun() runs fn on the offload pool.
+    """
+
+    name: str
+    fn: Callable[..., Any]
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+    args: Callable[[dict], tuple] = field(default=lambda state: ())
+    afn: Callable[..., Awaitable[Any]] | None = None
+
+
+class Workflow:
+    """Runs a set of steps in dependency order, concurrently where possible.
+
+    Args:
+        name: Workflow name, used for spans and the session_state report.
+        steps: The steps to run.
+        max_workers: Maximum steps of one run in flight at once.
+        repeat: Number of times each run executes the steps.
+        max_runs: Runs expected at once; the shared pool has max_workers threads
+            for each. Routes run workflows on the offload pool, so by default one
+            per offload thread. Further runs still progress, their steps queued.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        steps: list[Step],
+        max_workers: int = 4,
+        repeat: int = 1,
+        max_runs: int = OFFLOAD_WORKERS,
+    ) -> None:
+        self.name = name
+        self.steps = list(steps)
+        self.max_workers = max_workers
+        self.repeat = repeat
+        # Threads are started on demand, so the pool only grows under concurrent runs
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers * max_runs, thread_name_prefix=f"workflow-{name}"
+        )
+        self._validate()
+
+    def _validate(self) -> None:
+        names = [step.name for step in self.steps]
+        if len(names) != len(set(names)):
+            raise ValueError(f"Workflow '{self.name}' has duplicate step names")
+        producers: dict[str, str] = {}
+        for step in self.steps:
+            for key in step.outputs:
+                if key in producers:
+                    raise ValueError(
+                        f"Key '{key}' is written by both '{producers[key]}' and '{step.name}'"
+                    )
+                producers[key] = step.name
+
+    def run(self, session_state: dict) -> dict:
+        """Run the workflow against session_state.
+
+        Steps whose inputs are neither in session_state nor produced by another
+        step are skipped. A failing step marks its dependants as skipped; the
+        remaining independent steps still run.
+
+        Args:
+            session_state: Shared state; steps read inputs from and write outputs to it.
+
+        Returns:
+            The same session_state, with session_state["workflow"][name] holding
+            per-step status and timings plus the total elapsed seconds.
+        """
+        with span(f"workflow.{self.name}", workflow_steps=len(self.steps)):
+            for _ in range(self.repeat):
+                self._run_once(session_state)
+        return session_state
+
+    async def arun(self, session_state: dict) -> dict:
+        """Run the workflow against session_state on the running event loop.
+
+        Same scheduling, per-run cap and report as run(). Steps run as tasks: a
+        step's afn is awaited natively, and a step without one runs its fn on the
+        offload pool, so a blocking agent never holds the event loop.
+
+        Args:
+            session_state: Shared state; steps read inputs from and write outputs to it.
+
+        Returns:
+            The same session_state, with the report under session_state["workflow"][name].
+        """
+        with span(f"workflow.{self.name}", workflow_steps=len(self.steps)):
+            for _ in range(self.repeat):
+                await self._arun_once(session_state)
+        return session_state
+
+    def _run_once(self, session_state: dict) -> None:
+        report: dict[str, dict[str, Any]] = {}
+        session_state.setdefault("workflow", {})[self.name] = {"steps": report}
+        available = set(session_state)
+        waiting = {step.name: step for step in self.steps}
+        running: dict[Future, tuple[Step, float]] = {}
+        start = time.perf_counter()
+
+        while waiting or running:
+            for step in self._ready(waiting, running, available, report):
+                # Bound to the workflow span, so each step's spans nest under it
+                future = self._executor.submit(bind(_call), step, session_state)
+                running[future] = (step, time.perf_counter())
+            if not running:
+                _skip_cycle(waiting, report)
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step, started = running.pop(future)
+                _record(report, available, step, started - start, started, future.exception())
+
+        session_state["workflow"][self.name]["elapsed"] = time.perf_counter() - start
+
+    async def _arun_once(self, session_state: dict) -> None:
+        report: dict[str, dict[str, Any]] = {}
+        session_state.setdefault("workflow", {})[self.name] = {"steps": report}
+        available = set(session_state)
+        waiting = {step.name: step for step in self.steps}
+        running: dict[asyncio.Task, tuple[Step, float]] = {}
+        start = time.perf_counter()
+
+        try:
+            while waiting or running:
+                for step in self._ready(waiting, running, available, report):
+                    # Tasks copy the current context, so each step's spans nest under the workflow span
+                    task = asyncio.ensure_future(_acall(step, session_state))
+                    running[task] = (step, time.perf_counter())
+                if not running:
+                    _skip_cycle(waiting, report)
+                    break
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    step, started = running.pop(task)
+                    _record(report, available, step, started - start, started, task.exception())
+        finally:
+            # The request was cancelled (e.g. the client went away): stop the steps still in flight
+            for task in running:
+                task.cancel()
+
+        session_state["workflow"][self.name]["elapsed"] = time.perf_counter() - start
+
+    def _ready(
+        self,
+        waiting: dict[str, Step],
+        running: dict[Any, tuple[Step, float]],
+        available: set[str],
+        report: dict[str, dict[str, Any]],
+    ) -> list[Step]:
+        # Takes the steps that can start now off waiting, and reports those that never can
+        produced_later = {
+            key
+            for step in list(waiting.values()) + [s for s, _ in running.values()]
+            for key in step.outputs
+        }
+        ready: list[Step] = []
+        for name, step in list(waiting.items()):
+            missing = set(step.inputs) - available
+            if not missing:
+                if len(running) + len(ready) >= self.max_workers:
+                    # Ready, but this run already has max_workers steps in flight
+                    continue
+                del waiting[name]
+                ready.append(step)
+            elif not missing <= produced_later:
+                del waiting[name]
+                report[name] = {
+                    "status": "skipped",
+                    "missing": sorted(missing - produced_later),
+                }
+        return ready
+
+
+def _call(step: Step, session_state: dict) -> Any:
+    return step.fn(*step.args(session_state), session_state)
+
+
+async def _acall(step: Step, session_state: dict) -> Any:
+    # call() awaits a coroutine function natively and runs a plain function on the offload pool
+    return await call(step.afn or step.fn, *step.args(session_state), session_state)
+
+
+def _skip_cycle(waiting: dict[str, Step], report: dict[str, dict[str, Any]]) -> None:
+    # Nothing is running, so whatever is still waiting depends on itself through a cycle
+    for name, step in waiting.items():
+        report[name] = {"status": "skipped", "missing": sorted(step.inputs)}
+
+
+def _record(
+    report: dict[str, dict[str, Any]],
+    available: set[str],
+    step: Step,
+    offset: float,
+    started: float,
+    error: BaseException | None,
+) -> None:
+    entry: dict[str, Any] = {
+        "started": offset,
+        "elapsed": time.perf_counter() - started,
+    }
+    if error is None:
+        entry["status"] = "success"
+        available.update(step.outputs)
+    else:
+        entry["status"] = "error"
+        entry["error"] = repr(error)
+    report[step.name] = entry
@@ -0,0 +1,90 @@
+"""
+Benchmark: booking whole itineraries leg by leg against a fake EMT server.
+
+Books a set of multi-leg itineraries (hotels, trains, activities) with
+BookingPaymentService.book_legs at different max_parallel settings, and reports
+latency per itinerary and leg throughput. With --failure-rate, best-effort and
+all-or-nothing outcomes are compared.
+
+Run from the repository root:
+    python -m benchmarks.batch_booking --itineraries 20 --days 5 --latency 0.05
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stubs import FakeEMTServer, StubPaymentClient
+from src.services.booking_payment import (
+    ALL_OR_NOTHING,
+    BEST_EFFORT,
+    BookingError,
+    BookingPaymentService,
+    itinerary_legs,
+)
+
+
+class NullFirebaseClient:
+    def save_booking_confirmation(self, itinerary_id, booking_confirmation):
+        pass
+
+
+def synthetic_itinerary(index, days, activities_per_day=4):
+    return {
+        "id": f"trip-{index}",
+        "accommodation": [{"name": f"Hotel {d}", "night": d, "cost": 3500} for d in range(days)],
+        "transport": [{"train": f"12{index % 90:02d}{d}", "cost": 800} for d in range(0, days, 2)],
+        "details": [
+            {"activities": [{"name": f"Activity {d}.{a}", "cost": 500} for a in range(activities_per_day)]}
+            for d in range(days)
+        ],
+    }
+
+
+def run(itineraries, emt, max_parallel, mode, threads):
+    service = BookingPaymentService(emt, NullFirebaseClient(), StubPaymentClient(latency=0.0), workers=256)
+    outcomes = {"booked": 0, "partial": 0, "failed": 0}
+
+    def book(itinerary):
+        start = time.perf_counter()
+        try:
+            outcomes[service.book_legs(itinerary["id"], {"card": "tok"}, legs=itinerary_legs(itinerary),
+                                       mode=mode, max_parallel=max_parallel).status] += 1
+        except BookingError:
+            outcomes["failed"] += 1
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = sorted(pool.map(book, itineraries))
+    elapsed = time.perf_counter() - start
+    service.executor.shutdown(wait=True)
+    return elapsed, latencies, outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--itineraries", type=int, default=20)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="EMT latency per leg in seconds")
+    parser.add_argument("--capacity", type=int, default=64, help="Concurrent requests the fake EMT serves")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--threads", type=int, default=8, help="Itineraries booked concurrently")
+    args = parser.parse_args()
+    itineraries = [synthetic_itinerary(i, args.days) for i in range(args.itineraries)]
+    legs = sum(len(itinerary_legs(itinerary)) for itinerary in itineraries)
+    print(f"{args.itineraries} itineraries, {legs} legs, EMT latency {args.latency * 1000:.0f} ms, capacity {args.capacity}")
+
+    modes = [ALL_OR_NOTHING, BEST_EFFORT] if args.failure_rate else [ALL_OR_NOTHING]
+    for mode in modes:
+        for max_parallel in (1, 4, 8, 16):
+            emt = FakeEMTServer(latency=args.latency, capacity=args.capacity, failure_rate=args.failure_rate)
+            elapsed, latencies, outcomes = run(itineraries, emt, max_parallel, mode, args.threads)
+            print(f"{mode:15s} max_parallel={max_parallel:3d}  "
+                  f"p50 {latencies[len(latencies) // 2] * 1000:7.1f} ms  "
+                  f"{emt.calls / elapsed:7.1f} legs/s  peak EMT concurrency {emt.peak_concurrency:3d}  "
+                  f"cancelled {emt.cancelled:4d}  {outcomes}")
+
+
+if __name__ == "__main__":
+    main()
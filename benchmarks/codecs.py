@@ -0,0 +1,61 @@
+"""
+Benchmark: encoding a 10-day itinerary for HTTP responses (json vs. the codec's
+JSON) and for the itinerary cache (plain JSON vs. the default blob codec).
+
+Run from the repository root:
+    python -m benchmarks.codecs --days 10
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.itinerary_model import synthetic_itinerary
+from src.services.codecs import (
+    BlobCodec,
+    blob_codec,
+    decode_blob,
+    dumps_json,
+    loads_json,
+)
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def report(label, encode, decode, repeat):
+    payload = encode()
+    print(f"{label:24s} {len(payload) / 1024:8.1f} KiB  encode {timed(encode, repeat):6.2f} ms  "
+          f"decode {timed(lambda: decode(payload), repeat):6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    itinerary = synthetic_itinerary(args.days)
+
+    print("HTTP responses")
+    report("json.dumps", lambda: json.dumps(itinerary, default=str).encode(), json.loads, args.repeat)
+    report("dumps_json", lambda: dumps_json(itinerary), loads_json, args.repeat)
+
+    print("Cached blobs")
+    report("json (previous format)", lambda: json.dumps(itinerary, default=str, separators=(",", ":")).encode(),
+           decode_blob, args.repeat)
+    json_zlib = BlobCodec("json", "zlib")
+    report("json + zlib", lambda: json_zlib.encode(itinerary), decode_blob, args.repeat)
+    codec = blob_codec
+    name = f"{codec.serializer.tag.decode()}/{codec.compression.tag.decode()} (default)"
+    report(name, lambda: codec.encode(itinerary), decode_blob, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
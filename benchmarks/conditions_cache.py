@@ -0,0 +1,72 @@
+"""
+Benchmark: upstream weather fetches for many concurrent itineraries in one city.
+
+Every itinerary asks for its conditions at the same time, as the condition
+monitor or a burst of adjust requests would. Without the cache each one calls the
+provider; with it, itineraries in the same geohash cell and hour share one fetch.
+
+Run from the repository root:
+    python -m benchmarks.conditions_cache --itineraries 500
+"""
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.services.conditions_cache import ConditionsCache, FakeConditionsProvider
+from src.services.realtime_adjustments import fetch_conditions_from_maps_api
+
+
+def synthetic_itineraries(count, seed=11):
+    # Stops scattered around Panaji, Goa (a few km across)
+    rng = random.Random(seed)
+    return [
+        {
+            "destination": "Goa",
+            "locations": [{
+                "place_id": f"p{i}",
+                "geometry": {"location": {"lat": 15.49 + rng.random() * 0.02, "lng": 73.82 + rng.random() * 0.02}},
+            }],
+        }
+        for i in range(count)
+    ]
+
+
+def run(itineraries, fetch, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(fetch, itineraries))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--itineraries", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.2, help="Provider latency in seconds")
+    args = parser.parse_args()
+    itineraries = synthetic_itineraries(args.itineraries)
+
+    provider = FakeConditionsProvider(latency=args.latency)
+    uncached = run(itineraries, lambda it: provider.fetch("goa", None, 0), args.threads)
+    print(f"no cache:   {provider.calls:5d} upstream fetches  {uncached * 1000:8.1f} ms")
+
+    provider = FakeConditionsProvider(latency=args.latency)
+    cache = ConditionsCache(provider)
+    cached = run(itineraries, lambda it: fetch_conditions_from_maps_api(it, cache=cache), args.threads)
+    print(f"cold cache: {provider.calls:5d} upstream fetches  {cached * 1000:8.1f} ms  {cache.stats()}")
+    calls = provider.calls
+    warm = run(itineraries, lambda it: fetch_conditions_from_maps_api(it, cache=cache), args.threads)
+    print(f"warm cache: {provider.calls - calls:5d} upstream fetches  {warm * 1000:8.1f} ms  {cache.stats()}")
+
+    # Expire everything: stale entries are served at once and revalidated in the background
+    cache.ttl = 0
+    calls = provider.calls
+    stale = run(itineraries, lambda it: fetch_conditions_from_maps_api(it, cache=cache), args.threads)
+    cache.executor.shutdown(wait=True)
+    print(f"stale:      {provider.calls - calls:5d} upstream fetches  {stale * 1000:8.1f} ms  {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
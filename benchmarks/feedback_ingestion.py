@@ -0,0 +1,101 @@
+"""
+Benchmark: feedback ingestion throughput into a fake sink.
+
+Producer threads submit feedback as fast as they can, while the pipeline writes
+to a sink that costs a fixed latency per call plus a small cost per row (like a
+BigQuery streaming insert). max_batch=1 is the old one-row-per-call behaviour.
+The benchmark reports submit latency, end-to-end throughput and rejections
+(backpressure), with and without the local journal; with it, submit() waits for
+the journal's group-commit fsync, and the number of fsyncs is reported.
+
+Run from the repository root:
+    python -m benchmarks.feedback_ingestion --items 20000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from src.services.feedback_ingestion import Backpressure, FeedbackIngestion, Journal
+
+
+class FakeSink:
+    def __init__(self, call_latency=0.02, row_latency=0.00002):
+        self.call_latency = call_latency
+        self.row_latency = row_latency
+        self.calls = 0
+        self.rows = 0
+
+    def write(self, items):
+        time.sleep(self.call_latency + self.row_latency * len(items))
+        self.calls += 1
+        self.rows += len(items)
+
+
+def run(items, producers, max_batch, max_queue, journal_dir, call_latency):
+    sink = FakeSink(call_latency=call_latency)
+    journal = Journal(os.path.join(journal_dir, f"feedback-{max_batch}.journal")) if journal_dir else None
+    ingestion = FeedbackIngestion([sink], max_queue=max_queue, max_batch=max_batch, flush_interval=0.05,
+                                  journal=journal, put_timeout=5.0)
+    ingestion.start()
+    latencies = []
+    lock = threading.Lock()
+
+    def produce(count):
+        local = []
+        for i in range(count):
+            start = time.perf_counter()
+            try:
+                ingestion.submit(f"user-{i % 5000}", {"rating": i % 5 + 1, "destination": "goa"})
+            except Backpressure:
+                pass
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=produce, args=(items // producers,)) for _ in range(producers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    accepted = time.perf_counter() - start
+    ingestion.stop()
+    elapsed = time.perf_counter() - start
+    if journal is not None:
+        journal.close()
+    latencies.sort()
+    return {
+        "accepted_s": accepted,
+        "drained_s": elapsed,
+        "throughput": sink.rows / elapsed,
+        "sink_calls": sink.calls,
+        "p50_us": statistics.median(latencies) * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+        "rejected": ingestion.stats["rejected"],
+        "fsyncs": journal.syncs if journal is not None else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--producers", type=int, default=8)
+    parser.add_argument("--max-queue", type=int, default=10000)
+    parser.add_argument("--call-latency", type=float, default=0.02, help="Sink latency per write call in seconds")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as journal_dir:
+        for max_batch, items in ((1, min(args.items, 500)), (100, args.items), (500, args.items)):
+            for directory in (None, journal_dir):
+                result = run(items, args.producers, max_batch, args.max_queue, directory, args.call_latency)
+                print(f"max_batch={max_batch:4d} journal={'on ' if directory else 'off'} items={items:6d}  "
+                      f"{result['throughput']:9.0f} rows/s  sink calls {result['sink_calls']:5d}  "
+                      f"submit p50 {result['p50_us']:7.1f} us  p99 {result['p99_us']:9.1f} us  "
+                      f"fsyncs {result['fsyncs']:5d}  drained in {result['drained_s']:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
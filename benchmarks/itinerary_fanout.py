@@ -0,0 +1,57 @@
+"""
+Benchmark: sequential vs concurrent ItineraryGenerator.generate against stub clients.
+
+Every run asks for a different destination and theme, so the Places search cache
+and the recommendations lookup cache miss and each run waits on the Maps and
+BigQuery stubs as well as the AI stub.
+
+Run from the repository root:
+    python -m benchmarks.itinerary_fanout
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.stubs import (
+    StubAIClient,
+    StubBigQueryClient,
+    StubFirebaseClient,
+    StubMapsClient,
+)
+from src.services.itinerary_generator import ItineraryGenerator
+
+
+def measure(generator, label, parallel, runs):
+    samples = []
+    for run in range(runs):
+        # Unique per mode and run: no cached search or lookup can serve it
+        preferences = {"destination": f"Jaipur {label} {run}", "theme": f"heritage-{label}-{run}", "budget": 20000}
+        start = time.perf_counter()
+        generator.generate("bench-user", preferences, parallel=parallel)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples), samples[int(0.99 * (len(samples) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--ai-latency", type=float, default=0.3)
+    parser.add_argument("--maps-latency", type=float, default=0.15)
+    parser.add_argument("--bq-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    generator = ItineraryGenerator(
+        StubAIClient(args.ai_latency), None, StubBigQueryClient(args.bq_latency), StubFirebaseClient(),
+        maps_client=StubMapsClient(args.maps_latency),
+    )
+    for label, parallel in (("sequential", False), ("concurrent", True)):
+        queries = generator.recommendations.queries
+        p50, p99 = measure(generator, label, parallel, args.runs)
+        print(f"{label:>10}: p50={p50 * 1000:7.1f} ms  p99={p99 * 1000:7.1f} ms  "
+              f"bigquery lookups={generator.recommendations.queries - queries}/{args.runs}")
+
+
+if __name__ == "__main__":
+    main()
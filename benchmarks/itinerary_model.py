@@ -0,0 +1,134 @@
+"""
+Benchmark: memory and serialisation of a 10-day itinerary as loose dicts (with
+full Places API results, as generate() used to store them) vs. the typed model.
+
+Run from the repository root:
+    python -m benchmarks.itinerary_model --days 10
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from src.services.itinerary_model import Itinerary
+
+
+def places_result(i, rng):
+    # Roughly the shape of a Places text search result
+    return {
+        "business_status": "OPERATIONAL",
+        "formatted_address": f"{i} Example Road, Jaipur, Rajasthan 302001, India",
+        "geometry": {
+            "location": {"lat": 26.9 + rng.random() / 10, "lng": 75.8 + rng.random() / 10},
+            "viewport": {
+                "northeast": {"lat": 26.95, "lng": 75.85},
+                "southwest": {"lat": 26.85, "lng": 75.75},
+            },
+        },
+        "icon": "https://maps.gstatic.com/mapfiles/place_api/icons/v1/png_71/museum-71.png",
+        "icon_background_color": "#13B5C7",
+        "icon_mask_base_uri": "https://maps.gstatic.com/mapfiles/place_api/icons/v2/museum_pinlet",
+        "name": f"Attraction {i}",
+        "opening_hours": {
+            "open_now": True,
+            "periods": [{"open": {"day": d, "time": "0900"}, "close": {"day": d, "time": "1800"}} for d in range(7)],
+            "weekday_text": [f"Day {d}: 9:00 AM - 6:00 PM" for d in range(7)],
+        },
+        "photos": [
+            {
+                "height": 3000, "width": 4000,
+                "html_attributions": [f'<a href="https://maps.google.com/maps/contrib/{rng.getrandbits(64)}">A photographer</a>'],
+                "photo_reference": "Aap_uE" + "x" * 180,
+            }
+            for _ in range(10)
+        ],
+        "place_id": f"ChIJ{rng.getrandbits(96):024x}",
+        "plus_code": {"compound_code": "WRQ8+2X Jaipur, Rajasthan", "global_code": "7JRQWRQ8+2X"},
+        "price_level": rng.randint(0, 4),
+        "rating": round(rng.uniform(3, 5), 1),
+        "reference": f"ChIJ{rng.getrandbits(96):024x}",
+        "types": ["museum", "tourist_attraction", "point_of_interest", "establishment"],
+        "user_ratings_total": rng.randint(10, 50000),
+    }
+
+
+def synthetic_itinerary(days, per_day=6, seed=3):
+    rng = random.Random(seed)
+    locations = [places_result(i, rng) for i in range(days * per_day)]
+    details = [
+        {
+            "date": f"2025-12-{day + 1:02d}",
+            "title": f"Day {day + 1} in Jaipur",
+            "activities": [
+                {
+                    "name": locations[day * per_day + j]["name"],
+                    "place_id": locations[day * per_day + j]["place_id"],
+                    "start": f"{9 + j * 2:02d}:00",
+                    "end": f"{10 + j * 2:02d}:30",
+                    "type": rng.choice(["indoor", "outdoor"]),
+                    "cost": rng.randint(0, 2000),
+                    "description": "A short AI-written description of the visit. " * 3,
+                }
+                for j in range(per_day)
+            ],
+        }
+        for day in range(days)
+    ]
+    return {
+        "id": "a" * 32,
+        "user_id": "user-1",
+        "summary": "Ten days of forts, palaces and bazaars",
+        "details": details,
+        "locations": locations,
+        "analytics": [{"name": f"Rec {i}", "budget": 500 * i, "theme": "heritage"} for i in range(10)],
+        "preferences": {"destination": "Jaipur", "theme": "heritage", "budget": 50000, "duration": days},
+    }
+
+
+def allocated(build):
+    tracemalloc.start()
+    value = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size
+
+
+def timeit(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    payload_json = json.dumps(synthetic_itinerary(args.days))
+    payload, dict_bytes = allocated(lambda: json.loads(payload_json))
+    model = Itinerary.from_payload(payload)
+    # Decoded from bytes so the model owns its strings instead of sharing the payload's
+    _, model_bytes = allocated(lambda: Itinerary.from_bytes(model.to_bytes()))
+    print(f"memory:        dicts {dict_bytes / 1024:8.1f} KiB   model {model_bytes / 1024:8.1f} KiB")
+
+    dict_json = json.dumps(payload)
+    model_json = model.to_json()
+    model_bin = model.to_bytes()
+    print(f"size:          dict JSON {len(dict_json) / 1024:6.1f} KiB   model JSON {len(model_json) / 1024:6.1f} KiB"
+          f"   model binary {len(model_bin) / 1024:6.1f} KiB")
+    print(f"encode (ms):   dict JSON {timeit(lambda: json.dumps(payload), args.runs):6.3f}"
+          f"   model JSON {timeit(model.to_json, args.runs):6.3f}   model binary {timeit(model.to_bytes, args.runs):6.3f}")
+    print(f"decode (ms):   dict JSON {timeit(lambda: json.loads(dict_json), args.runs):6.3f}"
+          f"   model binary {timeit(lambda: Itinerary.from_bytes(model_bin), args.runs):6.3f}")
+    print(f"convert (ms):  from_payload {timeit(lambda: Itinerary.from_payload(payload), args.runs):6.3f}")
+
+
+if __name__ == "__main__":
+    main()
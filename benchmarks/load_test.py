@@ -0,0 +1,174 @@
+"""
+Load test: synchronous worker-pool handlers (the old Flask model) vs. the async
+FastAPI routes, against stub backends with fixed latency.
+
+"sync" pushes each request through a blocking handler on a fixed pool of worker
+threads, like a threaded Flask/gunicorn worker. "async" sends the same requests
+to app/app/routes.py in-process over ASGI. Both run in a single process.
+Requests rotate between booking, translation and itinerary generation (the trip
+planner workflow, with Gemini, Maps and BigQuery stages). Every request books a
+different itinerary, translates a different text or plans a different
+destination and theme, so neither the booking idempotency store, the translation
+memory nor the places and recommendations caches can answer from a previous
+request: each one reaches the stub backends.
+
+Run from the repository root:
+    python -m benchmarks.load_test --concurrency 10 50 200 1000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from fastapi import FastAPI
+
+from app.app.routes import TripPlannerServices, router
+from app.app.workflow import Step, Workflow
+from benchmarks.stubs import (
+    StubAIClient,
+    StubBigQueryClient,
+    StubEMTClient,
+    StubFirebaseClient,
+    StubMapsClient,
+    StubPaymentClient,
+)
+from src.services.booking_payment import BookingPaymentService
+from src.services.itinerary_generator import ItineraryGenerator
+from src.services.multilingual_support import MultilingualSupportService
+
+REQUEST_KINDS = ("book", "translate", "itinerary")
+
+
+def build_services(args):
+    itinerary = ItineraryGenerator(
+        StubAIClient(args.ai_latency), None, StubBigQueryClient(args.bq_latency), StubFirebaseClient(args.firebase_latency),
+        maps_client=StubMapsClient(args.maps_latency),
+    )
+    return TripPlannerServices(
+        itinerary=itinerary,
+        cost=None,
+        translation=MultilingualSupportService(StubAIClient(args.ai_latency)),
+        feedback=None,
+        user_profile=None,
+        booking=BookingPaymentService(
+            StubEMTClient(args.emt_latency), StubFirebaseClient(args.firebase_latency), StubPaymentClient(args.payment_latency)
+        ),
+        trip_planner=trip_planner_workflow(itinerary),
+        feedback_loop=None,
+    )
+
+
+def trip_planner_workflow(generator):
+    # The itinerary step of app/app/agent.py's trip planner workflow, over the stub-backed generator
+    def itinerary_agent(user_id, preferences, session_state):
+        session_state["itinerary"] = generator.generate(user_id, preferences)
+        return session_state["itinerary"]
+
+    async def aitinerary_agent(user_id, preferences, session_state):
+        session_state["itinerary"] = await generator.agenerate(user_id, preferences)
+        return session_state["itinerary"]
+
+    return Workflow("trip_planner", [
+        Step("itinerary", itinerary_agent, inputs=("user_id", "preferences"), outputs=("itinerary",),
+             args=lambda s: (s["user_id"], s["preferences"]), afn=aitinerary_agent),
+    ])
+
+
+def client_plan(client, requests_per_client, run):
+    # Rotate the heaviest external paths: booking (EMT + payment + Firebase), translation (Gemini)
+    # and itinerary generation (Gemini + Maps + BigQuery + Firebase).
+    # Keys are unique per run, client and request, so no request is a replay or a cache hit
+    return [
+        (REQUEST_KINDS[(client + i) % len(REQUEST_KINDS)], f"{run}-{client}-{i}")
+        for i in range(requests_per_client)
+    ]
+
+
+def itinerary_request(key):
+    return {"user_id": f"user-{key}", "preferences": {"destination": f"Jaipur {key}", "theme": f"heritage-{key}", "budget": 20000}}
+
+
+def run_sync(services, concurrency, requests_per_client, workers):
+    def handle(kind, key):
+        if kind == "book":
+            services.booking.book(f"itin-{key}", {"amount": 1000})
+        elif kind == "translate":
+            services.translation.translate(f"Amber Fort {key}", "hi")
+        else:
+            services.trip_planner.run(itinerary_request(key))
+
+    latencies = []
+
+    # Closed-loop clients; requests beyond the worker count queue behind busy workers, as in a threaded WSGI server
+    with ThreadPoolExecutor(max_workers=workers) as server, ThreadPoolExecutor(max_workers=concurrency) as clients:
+        def client(index):
+            for kind, key in client_plan(index, requests_per_client, f"sync{concurrency}"):
+                start = time.perf_counter()
+                server.submit(handle, kind, key).result()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        list(clients.map(client, range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return elapsed, latencies
+
+
+async def run_async(services, concurrency, requests_per_client):
+    app = FastAPI()
+    app.state.services = services
+    app.include_router(router)
+    latencies = []
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits, timeout=None) as http:
+        async def client(index):
+            for kind, key in client_plan(index, requests_per_client, f"async{concurrency}"):
+                start = time.perf_counter()
+                if kind == "book":
+                    response = await http.post("/book", json={"itinerary_id": f"itin-{key}", "payment_info": {"amount": 1000}})
+                elif kind == "translate":
+                    response = await http.post("/translate", json={"text": f"Amber Fort {key}", "target_language": "hi"})
+                else:
+                    response = await http.post("/itinerary", json=itinerary_request(key))
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(index) for index in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return elapsed, latencies
+
+
+def report(label, concurrency, total, elapsed, latencies):
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(0.99 * (len(latencies) - 1))]
+    print(f"{label:>5} c={concurrency:<5} {total / elapsed:9.1f} req/s  p50={p50 * 1000:8.1f} ms  p99={p99 * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200, 1000])
+    parser.add_argument("--requests-per-client", type=int, default=6)
+    parser.add_argument("--sync-workers", type=int, default=32, help="Threads of the synchronous worker")
+    parser.add_argument("--ai-latency", type=float, default=0.3)
+    parser.add_argument("--maps-latency", type=float, default=0.15)
+    parser.add_argument("--bq-latency", type=float, default=0.2)
+    parser.add_argument("--emt-latency", type=float, default=0.25)
+    parser.add_argument("--payment-latency", type=float, default=0.2)
+    parser.add_argument("--firebase-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    services = build_services(args)
+    for concurrency in args.concurrency:
+        total = concurrency * args.requests_per_client
+        report("sync", concurrency, total, *run_sync(services, concurrency, args.requests_per_client, args.sync_workers))
+        report("async", concurrency, total, *asyncio.run(run_async(services, concurrency, args.requests_per_client)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: local Arrow snapshot lookups vs. a remote BigQuery-style query on a
+synthetic recommendations table.
+
+The remote path is a stub that filters the same table after sleeping for
+--remote-latency seconds, standing in for the BigQuery round trip.
+
+Run from the repository root:
+    python -m benchmarks.recommendations_snapshot --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.services.itinerary_cache import budget_bucket
+from src.services.recommendations_snapshot import SnapshotLoader, write_snapshot
+
+THEMES = ["heritage", "nightlife", "adventure", "beach", "spiritual", "wildlife", "food", "shopping"]
+
+
+def synthetic_table(rows, seed=7):
+    rng = np.random.default_rng(seed)
+    return pa.table({
+        "id": np.arange(rows, dtype=np.int64),
+        "theme": pa.array(rng.choice(THEMES, rows)),
+        "budget": rng.integers(100, 200000, rows),
+        "name": pa.array([f"place-{i}" for i in range(rows)]),
+        "rating": rng.uniform(1, 5, rows).round(1),
+    })
+
+
+class StubRemoteRecommendations:
+    def __init__(self, table, latency):
+        self.table = table
+        self.latency = latency
+
+    def lookup(self, theme, bucket, limit):
+        time.sleep(self.latency)
+        mask = pc.and_(pc.equal(self.table["theme"], theme), pc.less_equal(self.table["budget"], bucket))
+        return self.table.filter(mask).sort_by("budget").slice(0, limit).to_pylist()
+
+
+def timeit(fn, queries):
+    samples = []
+    for theme, budget in queries:
+        start = time.perf_counter()
+        fn(theme, budget_bucket(budget), 10)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples), samples[int(0.99 * (len(samples) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--remote-queries", type=int, default=10)
+    parser.add_argument("--remote-latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    table = synthetic_table(args.rows)
+    rng = random.Random(1)
+    queries = [(rng.choice(THEMES), rng.randint(1000, 150000)) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "recommendations.arrow")
+        start = time.perf_counter()
+        write_snapshot(table, path)
+        export_time = time.perf_counter() - start
+        loader = SnapshotLoader(path)
+        start = time.perf_counter()
+        loader.reload()
+        load_time = time.perf_counter() - start
+
+        remote = StubRemoteRecommendations(table, args.remote_latency)
+        print(f"rows={args.rows:,}  export={export_time * 1000:.0f} ms  load={load_time * 1000:.0f} ms")
+        for label, fn, sample in (
+            ("snapshot", loader.lookup, queries),
+            ("remote", remote.lookup, queries[:args.remote_queries]),
+        ):
+            p50, p99 = timeit(fn, sample)
+            print(f"{label:>9}: p50={p50 * 1000:9.3f} ms  p99={p99 * 1000:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: day-plan optimisation for 10, 50 and 200 stops.
+
+Reports the time of plan_day (Haversine matrix included, which its budget covers)
+and the travel time of the optimized route against the plain nearest-neighbour
+construction (earliest start, no improvement). The optimizer may fit in more stops
+than nearest-neighbour (or drop different ones), so the nearest-neighbour baseline is
+run on exactly the stops the optimized route visits, and the drop counts of both are
+reported alongside.
+
+Run from the repository root:
+    python -m benchmarks.route_optimizer
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from src.services.route_optimizer import haversine_minutes, plan_day
+
+# plan_day reduced to the earliest-start nearest-neighbour construction
+NEAREST_NEIGHBOUR = {"time_budget_ms": 0.0, "construction_rules": ((0.0, 0.0),)}
+
+
+def synthetic_stops(count, seed):
+    rng = random.Random(seed)
+    stops = []
+    for i in range(count):
+        opens = rng.choice([8, 9, 10, 11]) * 60
+        stops.append({
+            "place_id": f"p{i}",
+            "name": f"Stop {i}",
+            "geometry": {"location": {"lat": 26.85 + rng.random() * 0.2, "lng": 75.70 + rng.random() * 0.25}},
+            "window": (opens, opens + rng.choice([6, 8, 10, 12]) * 60),
+            "visit_minutes": rng.choice([5, 10, 15]) if count > 20 else rng.choice([30, 45, 60]),
+        })
+    return stops
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        timings, baseline, optimized = [], [], []
+        dropped, nn_dropped, same_dropped = [], [], []
+        for run in range(args.runs):
+            stops = synthetic_stops(size, seed=run)
+            start = time.perf_counter()
+            plan = plan_day(stops, day_start=8 * 60, day_end=23 * 60, time_budget_ms=args.budget_ms)
+            timings.append(time.perf_counter() - start)
+            dropped.append(len(plan["dropped"]))
+            matrix = haversine_minutes([(s["geometry"]["location"]["lat"], s["geometry"]["location"]["lng"]) for s in stops])
+            # Nearest-neighbour alone over all stops: only its drop count is comparable
+            nn = plan_day(stops, day_start=8 * 60, day_end=23 * 60, matrix=matrix, **NEAREST_NEIGHBOUR)
+            nn_dropped.append(len(nn["dropped"]))
+            # Travel is compared on the stop set the optimized route visits
+            index = {stop["place_id"]: i for i, stop in enumerate(stops)}
+            visited = [index[stop["place_id"]] for stop in plan["stops"]]
+            same = plan_day([stops[i] for i in visited], day_start=8 * 60, day_end=23 * 60,
+                            matrix=matrix[visited][:, visited], **NEAREST_NEIGHBOUR)
+            same_dropped.append(len(same["dropped"]))
+            if not same["dropped"]:
+                optimized.append(plan["travel_minutes"])
+                baseline.append(same["travel_minutes"])
+        comparable = len(optimized)
+        travel = "travel: no run where nearest-neighbour fits the optimized stop set"
+        if comparable:
+            saving = 1 - statistics.mean(optimized) / statistics.mean(baseline)
+            travel = (f"travel on the same stops ({comparable}/{args.runs} runs): nn={statistics.mean(baseline):7.1f} min  "
+                      f"optimized={statistics.mean(optimized):7.1f} min  ({saving:.1%} less)")
+        print(
+            f"stops={size:<4} p50={statistics.median(timings) * 1000:6.2f} ms  max={max(timings) * 1000:6.2f} ms  {travel}  "
+            f"dropped: optimized={statistics.mean(dropped):.1f}  nn={statistics.mean(nn_dropped):.1f}  "
+            f"nn on optimized stops={statistics.mean(same_dropped):.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Stub backends with configurable latency for offline benchmarks.
+
+Each stub implements both the blocking client methods and the async variants
+from src/services/interfaces/async_clients.py.
+"""
+
+import asyncio
+import hashlib
+import random
+import threading
+import time
+
+
+class StubAIClient:
+    def __init__(self, latency=0.3):
+        self.latency = latency
+
+    def generate_itinerary(self, preferences):
+        time.sleep(self.latency)
+        return {"summary": f"Trip to {preferences.get('destination')}", "details": []}
+
+    def translate(self, text, target_language):
+        time.sleep(self.latency)
+        return f"[{target_language}] {text}"
+
+    async def agenerate_itinerary(self, preferences):
+        await asyncio.sleep(self.latency)
+        return {"summary": f"Trip to {preferences.get('destination')}", "details": []}
+
+    async def atranslate(self, text, target_language):
+        await asyncio.sleep(self.latency)
+        return f"[{target_language}] {text}"
+
+
+class StubMapsClient:
+    def __init__(self, latency=0.15):
+        self.latency = latency
+
+    def places(self, query):
+        time.sleep(self.latency)
+        return {"results": [{"name": f"{query} attraction {i}"} for i in range(5)]}
+
+    async def aplaces(self, query):
+        await asyncio.sleep(self.latency)
+        return {"results": [{"name": f"{query} attraction {i}"} for i in range(5)]}
+
+
+class StubBigQueryClient:
+    def __init__(self, latency=0.2):
+        self.latency = latency
+
+    def query(self, query, job_config=None):
+        time.sleep(self.latency)
+        return [{"name": "Heritage walk", "budget": 500}]
+
+    async def aquery(self, query, job_config=None):
+        await asyncio.sleep(self.latency)
+        return [{"name": "Heritage walk", "budget": 500}]
+
+
+class StubFirebaseClient:
+    def __init__(self, latency=0.05):
+        self.latency = latency
+
+    def save_itinerary(self, user_id, itinerary):
+        time.sleep(self.latency)
+
+    def save_booking_confirmation(self, itinerary_id, booking_confirmation):
+        time.sleep(self.latency)
+
+    async def asave_itinerary(self, user_id, itinerary):
+        await asyncio.sleep(self.latency)
+
+    async def asave_booking_confirmation(self, itinerary_id, booking_confirmation):
+        await asyncio.sleep(self.latency)
+
+
+class StubEMTClient:
+    def __init__(self, latency=0.25):
+        self.latency = latency
+
+    def book(self, itinerary_id, payment_info):
+        time.sleep(self.latency)
+        return {"confirmation": f"CONF-{itinerary_id}"}
+
+    async def abook(self, itinerary_id, payment_info):
+        await asyncio.sleep(self.latency)
+        return {"confirmation": f"CONF-{itinerary_id}"}
+
+
+class FakeEMTServer:
+    """
+    In-process fake of the EMT inventory API for batch booking benchmarks.
+    Serves at most `capacity` requests at once (others queue, as on a real server),
+    answers after `latency` seconds plus up to `jitter`, and deterministically
+    rejects a `failure_rate` share of legs. Bookings are idempotent on the
+    request's idempotency_key.
+    """
+    def __init__(self, latency=0.1, jitter=0.0, capacity=32, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.calls = 0
+        self.cancelled = 0
+        self.peak_concurrency = 0
+        self.bookings = {}  # idempotency_key -> confirmation
+        self._active = 0
+        self._slots = threading.BoundedSemaphore(capacity)
+        self._async_slots = None
+        self._capacity = capacity
+        self._lock = threading.Lock()
+
+    def book_leg(self, itinerary_id, leg, request):
+        with self._slots:
+            self._enter()
+            try:
+                time.sleep(self._delay(leg))
+                return self._book(itinerary_id, leg, request)
+            finally:
+                self._leave()
+
+    def book(self, itinerary_id, payment_info):
+        leg = payment_info.get('leg') or {"leg_id": itinerary_id, "kind": "itinerary"}
+        return self.book_leg(itinerary_id, leg, payment_info)
+
+    def cancel(self, confirmation):
+        with self._lock:
+            self.cancelled += 1
+            self.bookings.pop(confirmation.get('idempotency_key'), None)
+
+    async def abook_leg(self, itinerary_id, leg, request):
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self._capacity)
+        async with self._async_slots:
+            self._enter()
+            try:
+                await asyncio.sleep(self._delay(leg))
+                return self._book(itinerary_id, leg, request)
+            finally:
+                self._leave()
+
+    def _book(self, itinerary_id, leg, request):
+        key = request.get('idempotency_key') or f"{itinerary_id}:{leg['leg_id']}"
+        with self._lock:
+            if key in self.bookings:
+                return self.bookings[key]
+        if self._rng("failure", leg).random() < self.failure_rate:
+            raise RuntimeError(f"EMT: no inventory for {leg['leg_id']}")
+        confirmation = {"confirmation": f"EMT-{hashlib.sha1(key.encode()).hexdigest()[:10]}",
+                        "leg_id": leg['leg_id'], "kind": leg.get('kind'), "idempotency_key": key}
+        with self._lock:
+            return self.bookings.setdefault(key, confirmation)
+
+    def _delay(self, leg):
+        return self.latency + (self._rng("delay", leg).random() * self.jitter if self.jitter else 0.0)
+
+    def _rng(self, purpose, leg):
+        return random.Random(f"{self.seed}:{purpose}:{leg['leg_id']}")
+
+    def _enter(self):
+        with self._lock:
+            self.calls += 1
+            self._active += 1
+            self.peak_concurrency = max(self.peak_concurrency, self._active)
+
+    def _leave(self):
+        with self._lock:
+            self._active -= 1
+
+
+class StubPaymentClient:
+    def __init__(self, latency=0.2):
+        self.latency = latency
+
+    def process(self, payment_info):
+        time.sleep(self.latency)
+        return {"status": "paid"}
+
+    async def aprocess(self, payment_info):
+        await asyncio.sleep(self.latency)
+        return {"status": "paid"}
@@ -0,0 +1,62 @@
+"""
+Benchmark: per-call overhead of traced clients at different sampling rates.
+
+Times a no-op client method called directly and through traced(), under a parent
+span like a request's, with spans exported to a local file. A sampling rate is
+fixed when the tracer provider is installed, so each rate runs in its own process.
+
+Run from the repository root:
+    python -m benchmarks.tracing --calls 200000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.services import tracing
+
+
+class NoopClient:
+    def places(self, query):
+        return query
+
+
+def run(calls, sample_rate, path):
+    tracing.configure_tracing(exporter="file", path=path, sample_rate=sample_rate)
+    client = NoopClient()
+    proxy = tracing.traced(client, "maps")
+    start = time.perf_counter()
+    for _ in range(calls):
+        client.places("museum")
+    direct = time.perf_counter() - start
+    requests = calls // 10
+    start = time.perf_counter()
+    for _ in range(requests):
+        # One request span with ten client calls under it
+        with tracing.span("request"):
+            for _ in range(10):
+                proxy.places("museum")
+    traced = time.perf_counter() - start
+    return (traced - direct) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--rate", type=float, default=None, help="Run a single sampling rate in this process")
+    args = parser.parse_args()
+    if args.rate is not None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "traces.jsonl")
+            overhead = run(args.calls, args.rate, path)
+            print(f"sample_rate={args.rate:<5}  {overhead:6.2f} us per traced call")
+        return
+    for rate in (0.0, 0.01, 0.1, 1.0):
+        subprocess.run([sys.executable, "-m", "benchmarks.tracing", "--calls", str(args.calls), "--rate", str(rate)], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Personalized Trip Planner - Agent Client
+
+AI client for the itinerary and translation services backed by the Gemini trip
+planner agent. The agent is asked to answer in JSON Lines, one object per line:
+one {"day": {...}} per day, in order, then the top-level fields. Its reply
+streams in as text, so each day is handed to ItineraryGenerator.generate_stream()
+as soon as its line is complete, while the model is still writing later days.
+With an async text stream the client also implements AsyncAIClient, so the async
+itinerary path awaits the agent on the event loop.
+"""
+
+import json
+
+from src.services.async_support import offload
+from src.services.codecs import dumps_json
+from src.services.interfaces.async_clients import AsyncAIClient
+
+try:
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.genai import types as genai_types
+except ImportError:
+    RunConfig = StreamingMode = genai_types = None
+
+ITINERARY_PROMPT = (
+    "Plan a trip for these preferences. Answer in JSON Lines only, with no prose or code fences: "
+    'first one line {"day": {"title": ..., "activities": [...]}} per day, in order, then one line '
+    'with the other itinerary fields, e.g. {"summary": ...}.\nPreferences: '
+)
+TRANSLATE_PROMPT = "Translate the following text to {language}. Answer with the translation only.\n\n{text}"
+
+
+class AgentClient(AsyncAIClient):
+    """
+    Itinerary and translation calls over an agent's streamed text reply.
+    Args:
+        stream_text: callable(prompt) returning an iterator of text deltas
+            (see adk_text_stream() for an ADK runner).
+        astream_text: Optional callable(prompt) returning an async iterator of text
+            deltas (see adk_async_text_stream()); without it the async methods run
+            the blocking ones on the offload pool.
+    """
+    def __init__(self, stream_text, astream_text=None):
+        self.stream_text = stream_text
+        self.astream_text = astream_text
+
+    def stream_itinerary(self, preferences):
+        """
+        Yield {"day": {...}} chunks and then the top-level fields, as the agent writes them.
+        Raises:
+            ValueError: If a line of the reply is not a JSON object.
+        """
+        lines = _JsonLines()
+        for delta in self.stream_text(_itinerary_prompt(preferences)):
+            yield from lines.feed(delta)
+        yield from lines.close()
+
+    async def astream_itinerary(self, preferences):
+        """
+        Async variant of stream_itinerary(); needs astream_text.
+        """
+        lines = _JsonLines()
+        async for delta in self.astream_text(_itinerary_prompt(preferences)):
+            for chunk in lines.feed(delta):
+                yield chunk
+        for chunk in lines.close():
+            yield chunk
+
+    def generate_itinerary(self, preferences):
+        itinerary = _Itinerary()
+        for chunk in self.stream_itinerary(preferences):
+            itinerary.add(chunk)
+        return itinerary.value
+
+    async def agenerate_itinerary(self, preferences):
+        if self.astream_text is None:
+            return await offload(self.generate_itinerary, preferences)
+        itinerary = _Itinerary()
+        async for chunk in self.astream_itinerary(preferences):
+            itinerary.add(chunk)
+        return itinerary.value
+
+    def translate(self, text, target_language):
+        return "".join(self.stream_text(TRANSLATE_PROMPT.format(language=target_language, text=text))).strip()
+
+    async def atranslate(self, text, target_language):
+        if self.astream_text is None:
+            return await offload(self.translate, text, target_language)
+        deltas = [delta async for delta in self.astream_text(TRANSLATE_PROMPT.format(language=target_language, text=text))]
+        return "".join(deltas).strip()
+
+
+def adk_text_stream(runner, user_id="trip-planner"):
+    """
+    stream_text for AgentClient from a google.adk Runner, using SSE streaming so the
+    model's partial replies arrive as they are generated.
+    Args:
+        runner: google.adk Runner for the trip planner agent.
+        user_id (str): ADK user the per-call sessions belong to.
+    Returns:
+        callable: prompt -> iterator of text deltas.
+    """
+    if genai_types is None:
+        raise ImportError("google-adk is required for adk_text_stream")
+
+    def stream_text(prompt):
+        session = runner.session_service.create_session_sync(app_name=runner.app_name, user_id=user_id)
+        events = runner.run(
+            user_id=user_id, session_id=session.id, new_message=_message(prompt),
+            run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+        )
+        deltas = _Deltas()
+        for event in events:
+            yield from deltas.of(event)
+
+    return stream_text
+
+
+def adk_async_text_stream(runner, user_id="trip-planner"):
+    """
+    astream_text for AgentClient: adk_text_stream() over Runner.run_async, so the
+    agent is awaited on the event loop instead of holding a thread.
+    Args:
+        runner: google.adk Runner for the trip planner agent.
+        user_id (str): ADK user the per-call sessions belong to.
+    Returns:
+        callable: prompt -> async iterator of text deltas.
+    """
+    if genai_types is None:
+        raise ImportError("google-adk is required for adk_async_text_stream")
+
+    async def astream_text(prompt):
+        session = await runner.session_service.create_session(app_name=runner.app_name, user_id=user_id)
+        events = runner.run_async(
+            user_id=user_id, session_id=session.id, new_message=_message(prompt),
+            run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+        )
+        deltas = _Deltas()
+        async for event in events:
+            for text in deltas.of(event):
+                yield text
+
+    return astream_text
+
+
+def _itinerary_prompt(preferences):
+    return ITINERARY_PROMPT + dumps_json(preferences).decode("utf-8")
+
+
+def _message(prompt):
+    return genai_types.Content(role="user", parts=[genai_types.Part(text=prompt)])
+
+
+class _Deltas:
+    # Partial events carry the deltas; the final event repeats the whole text
+    def __init__(self):
+        self.streamed = False
+
+    def of(self, event):
+        if not event.partial and self.streamed:
+            return []
+        self.streamed = self.streamed or bool(event.partial)
+        return [part.text for part in (event.content.parts if event.content else None) or () if part.text]
+
+
+class _JsonLines:
+    # Splits streamed text into complete lines and parses each as a JSON object
+    def __init__(self):
+        self.pending = ""
+
+    def feed(self, delta):
+        self.pending += delta
+        *lines, self.pending = self.pending.split("\n")
+        return [chunk for chunk in map(_parse_line, lines) if chunk is not None]
+
+    def close(self):
+        chunk, self.pending = _parse_line(self.pending), ""
+        return [chunk] if chunk is not None else []
+
+
+class _Itinerary:
+    def __init__(self):
+        self.value = {'details': []}
+
+    def add(self, chunk):
+        if 'day' in chunk:
+            self.value['details'].append(chunk['day'])
+        else:
+            self.value.update(chunk)
+
+
+def _parse_line(line):
+    line = line.strip()
+    if not line or line.startswith("```"):
+        return None
+    chunk = json.loads(line)
+    if not isinstance(chunk, dict):
+        raise ValueError(f"Agent reply line is not a JSON object: {line[:80]}")
+    return chunk
@@ -0,0 +1,54 @@
+"""
+Personalized Trip Planner - Async Support
+
+Lets services await client calls without caring whether the client is async.
+A client that implements the async interfaces in interfaces/async_clients.py
+(e.g. `aplaces` next to `places`) is awaited natively; anything else runs on a
+dedicated offload pool so it never blocks the event loop; it runs in the caller's
+context, so its tracing spans stay under the request's span.
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+# Sized for blocking client calls that mostly wait on the network
+OFFLOAD_WORKERS = 256
+
+_offload = ThreadPoolExecutor(max_workers=OFFLOAD_WORKERS, thread_name_prefix="offload")
+
+
+def async_variant(method):
+    """
+    Return the native coroutine function for a bound client method, or None.
+    Looks for an `a<name>` method on the same object (places -> aplaces).
+    """
+    if inspect.iscoroutinefunction(method):
+        return method
+    owner = getattr(method, "__self__", None)
+    name = getattr(method, "__name__", None)
+    if owner is None or name is None:
+        return None
+    variant = getattr(owner, f"a{name}", None)
+    return variant if inspect.iscoroutinefunction(variant) else None
+
+
+async def call(method, *args, **kwargs):
+    """
+    Await a client call: natively if the client has an async variant, otherwise on the offload pool.
+    """
+    variant = async_variant(method)
+    if variant is not None:
+        return await variant(*args, **kwargs)
+    return await offload(method, *args, **kwargs)
+
+
+async def offload(fn, *args, **kwargs):
+    """
+    Run a blocking call on the offload pool, in the caller's context. Async variants
+    use it to fall back to their blocking twin (call() would find the variant itself).
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_offload, functools.partial(contextvars.copy_context().run, fn, *args, **kwargs))
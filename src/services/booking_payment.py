@@ -2,20 +2,534 @@
 Personalized Trip Planner - Booking & Payment Service
 
 Handles seamless booking via EMT inventory and payment processing. Stores confirmations in Firebase.
+
+Bookings run as a saga:
+1. Hold the EMT inventory and authorise the payment, concurrently.
+2. Confirm the hold and capture the payment.
+3. Write the confirmation to Firebase (durably, through the write-behind gateway).
+If a step fails, the steps that already succeeded are compensated (the hold is
+cancelled, the authorisation voided) before the error is raised. A payment client
+without authorize/capture charges in one step that cannot be held back, so then the
+inventory is booked first and the charge is taken only once it has succeeded.
+A failed confirmation write does not undo a settled booking; it is logged.
+
+Every booking has an idempotency key. With the client's Idempotency-Key, a retried
+request with the same key waits for the booking in progress, or gets the result of
+the completed one, instead of booking and charging again; completed results are
+remembered in-process for IDEMPOTENCY_TTL seconds, and the key is passed to EMT
+and the payment client. Without one, the key is a hash of the itinerary and payment
+details and only guards against duplicate submits: it is replayed for
+RETRY_WINDOW seconds, and EMT and the payment client get a key unique to the
+booking, so booking the same itinerary again later is a new booking.
+
+Clients without hold/confirm/cancel (EMT) or authorize/capture/void (payment) are
+driven through book() / process(), with cancel() / refund() as compensation when
+available.
+
+book_legs() books a whole itinerary as separate legs (hotels, trains, activities),
+at most max_parallel at a time, and reports the status of every leg. In
+all-or-nothing mode the first failed leg stops new bookings and cancels the booked
+ones; in best-effort mode the legs that could be booked are kept and paid for.
 """
 
+import asyncio
+import dataclasses
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from src.services.async_support import call
+from src.services.tracing import bind, traced
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL = 24 * 3600
+# Replay window for keys derived from the request (no client Idempotency-Key): double submits and quick retries
+RETRY_WINDOW = 60
+
+# Batch booking modes
+ALL_OR_NOTHING = "all_or_nothing"
+BEST_EFFORT = "best_effort"
+
+# Leg statuses
+BOOKED = "booked"
+FAILED = "failed"
+CANCELLED = "cancelled"
+SKIPPED = "skipped"
+
+
+class BookingError(Exception):
+    """
+    Raised when a booking step fails; completed steps have already been compensated.
+    """
+    def __init__(self, step, cause, compensation_errors=(), report=None):
+        super().__init__(f"Booking step '{step}' failed: {cause!r}")
+        self.step = step
+        self.cause = cause
+        self.compensation_errors = list(compensation_errors)
+        self.report = report  # BatchBooking with per-leg statuses, for book_legs()
+
+
+@dataclass(slots=True)
+class Leg:
+    """
+    One separately bookable part of an itinerary.
+    """
+    leg_id: str
+    kind: str  # 'hotel' / 'train' / 'activity'
+    details: dict = None
+    cost: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Leg from a request body.
+        Raises:
+            ValueError: If a field is missing, unknown or of the wrong type.
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"A leg must be an object, got {type(data).__name__}")
+        unknown = sorted(set(data) - {field.name for field in dataclasses.fields(cls)})
+        if unknown:
+            raise ValueError(f"Unknown leg fields: {', '.join(unknown)}")
+        for field in ('leg_id', 'kind'):
+            if not isinstance(data.get(field), str) or not data[field]:
+                raise ValueError(f"A leg needs a non-empty string '{field}'")
+        if data.get('details') is not None and not isinstance(data['details'], dict):
+            raise ValueError(f"Leg {data['leg_id']}: 'details' must be an object")
+        cost = data.get('cost', 0.0)
+        if isinstance(cost, bool) or not isinstance(cost, (int, float, str)):
+            raise ValueError(f"Leg {data['leg_id']}: 'cost' must be a number")
+        return cls(**data)
+
+    def to_dict(self):
+        return dataclasses.asdict(self)
+
+
+@dataclass(slots=True)
+class LegResult:
+    leg_id: str
+    kind: str
+    status: str = SKIPPED
+    confirmation: dict = None
+    error: str = None
+
+
+@dataclass(slots=True)
+class BatchBooking:
+    """
+    Outcome of book_legs(): 'booked' (every leg), 'partial' (best-effort) or 'failed'.
+    """
+    itinerary_id: str
+    mode: str
+    status: str
+    legs: list
+    payment_status: dict = None
+
+    def to_dict(self):
+        return dataclasses.asdict(self)
+
+
+def itinerary_legs(itinerary):
+    """
+    Split an itinerary into bookable legs.
+    Args:
+        itinerary (dict): Itinerary with optional 'accommodation'/'hotels' and
+            'transport'/'trains' lists, and activities under each day in 'details'.
+    Returns:
+        list[Leg]: Legs with ids stable across calls, so retries book the same legs.
+    """
+    itinerary_id = itinerary.get('id')
+    legs = []
+    for kind, fields in (("hotel", ('accommodation', 'hotels')), ("train", ('transport', 'trains'))):
+        entries = next((itinerary[field] for field in fields if itinerary.get(field)), [])
+        if isinstance(entries, dict):
+            entries = [entries]
+        for index, entry in enumerate(entries):
+            legs.append(Leg(f"{itinerary_id}:{kind}:{index}", kind, entry, entry.get('cost') or 0.0))
+    for day_index, day in enumerate(itinerary.get('details') or ()):
+        if not isinstance(day, dict):
+            continue
+        for index, activity in enumerate(day.get('activities') or ()):
+            if isinstance(activity, dict):
+                legs.append(Leg(f"{itinerary_id}:activity:{day_index}.{index}", "activity", activity, activity.get('cost') or 0.0))
+    return legs
+
+
+def booking_key(itinerary_id, payment_info):
+    """
+    Deterministic idempotency key for a booking request without a client-supplied key.
+    Args:
+        itinerary_id (str): The itinerary being booked.
+        payment_info (dict): Payment details of the request.
+    Returns:
+        str: Hex digest identifying the request.
+    """
+    canonical = json.dumps([itinerary_id, payment_info], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _idempotency(idempotency_key, itinerary_id, payment_info):
+    # (store key, key sent to EMT/payment, replay ttl); derived keys get a fresh downstream key per booking
+    if idempotency_key:
+        return idempotency_key, idempotency_key, None
+    key = booking_key(itinerary_id, payment_info)
+    return key, f"{key}:{uuid.uuid4().hex}", RETRY_WINDOW
+
+
+class IdempotencyStore:
+    """
+    Single-flight results per idempotency key. Concurrent requests with the same key
+    share one execution; successful results are replayed for ttl seconds, failures
+    are not kept so the client can retry.
+    """
+    def __init__(self, ttl=IDEMPOTENCY_TTL, max_entries=100_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._results = OrderedDict()  # key -> (expires, result)
+        self._inflight = {}  # key -> Future
+        self._lock = threading.Lock()
+        self.replayed = 0
+
+    def claim(self, key):
+        """
+        Returns:
+            tuple: (future, owner); the owner must resolve the future with finish() / fail().
+        """
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.replayed += 1
+                future = Future()
+                future.set_result(entry[1])
+                return future, False
+            future = self._inflight.get(key)
+            if future is not None:
+                self.replayed += 1
+                return future, False
+            self._inflight[key] = future = Future()
+            return future, True
+
+    def finish(self, key, future, result, ttl=None):
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._results[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        future.set_result(result)
+
+    def fail(self, key, future, exc):
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_exception(exc)
+
+    def run(self, key, fn, ttl=None):
+        future, owner = self.claim(key)
+        if owner:
+            try:
+                self.finish(key, future, fn(), ttl)
+            except BaseException as exc:
+                self.fail(key, future, exc)
+        return future.result()
+
+    async def arun(self, key, coro_fn, ttl=None):
+        future, owner = self.claim(key)
+        if owner:
+            try:
+                self.finish(key, future, await coro_fn(), ttl)
+            except BaseException as exc:
+                self.fail(key, future, exc)
+        return await asyncio.wrap_future(future)
+
 
 class BookingPaymentService:
-    def __init__(self, emt_client, firebase_client, payment_client):
-        self.emt = emt_client
-        self.firebase = firebase_client
-        self.payment = payment_client
+    def __init__(self, emt_client, firebase_client, payment_client, idempotency=None, workers=16):
+        self.emt = traced(emt_client, "emt")
+        self.firebase = traced(firebase_client, "firebase")
+        self.payment = traced(payment_client, "payment")
+        self.idempotency = idempotency or IdempotencyStore()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="booking")
 
-    def book(self, itinerary_id, payment_info):
+    def book(self, itinerary_id, payment_info, idempotency_key=None):
         """
         Book itinerary via EMT inventory and process payment, store confirmation in Firebase.
+        Returns:
+            tuple: (booking_confirmation, payment_status)
+        Raises:
+            BookingError: If holding, paying or confirming fails (after compensation).
         """
-        booking_confirmation = self.emt.book(itinerary_id, payment_info)  # Replace with actual EMT API call
-        payment_status = self.payment.process(payment_info)  # Replace with actual payment gateway integration
-        self.firebase.save_booking_confirmation(itinerary_id, booking_confirmation)
+        key, request_key, ttl = _idempotency(idempotency_key, itinerary_id, payment_info)
+        return self.idempotency.run(key, lambda: self._book(request_key, itinerary_id, payment_info), ttl)
+
+    async def abook(self, itinerary_id, payment_info, idempotency_key=None):
+        """
+        Async variant of book(); awaits clients natively when they implement the async interfaces.
+        """
+        key, request_key, ttl = _idempotency(idempotency_key, itinerary_id, payment_info)
+        return await self.idempotency.arun(key, lambda: self._abook(request_key, itinerary_id, payment_info), ttl)
+
+    def book_legs(self, itinerary_id, payment_info, legs=None, mode=ALL_OR_NOTHING, max_parallel=8, idempotency_key=None):
+        """
+        Book an itinerary leg by leg against EMT, with at most max_parallel bookings in flight,
+        then pay for the booked legs and store the report in Firebase.
+        Args:
+            itinerary_id (str): The itinerary being booked.
+            payment_info (dict): Payment details.
+            legs (list[Leg | dict]): Legs to book; split from the stored itinerary when omitted.
+            mode (str): ALL_OR_NOTHING or BEST_EFFORT.
+            max_parallel (int): Maximum concurrent EMT bookings for this itinerary.
+            idempotency_key (str): Client key; each leg is booked under "<key>:<leg_id>".
+        Returns:
+            BatchBooking: Per-leg statuses and the payment status.
+        Raises:
+            ValueError: If the mode or max_parallel is invalid, a leg is malformed or
+                repeated, or there are no legs to book.
+            BookingError: If nothing could be kept (all-or-nothing failure, no leg booked,
+                or payment failed); booked legs are cancelled and exc.report has the details.
+        """
+        if mode not in (ALL_OR_NOTHING, BEST_EFFORT):
+            raise ValueError(f"Unknown booking mode '{mode}'")
+        if isinstance(max_parallel, bool) or not isinstance(max_parallel, int) or max_parallel < 1:
+            raise ValueError(f"max_parallel must be a positive integer, got {max_parallel!r}")
+        if legs is None:
+            legs = itinerary_legs({'id': itinerary_id, **(self.firebase.get_itinerary(itinerary_id) or {})})
+        if not isinstance(legs, (list, tuple)):
+            raise ValueError("legs must be a list")
+        legs = [leg if isinstance(leg, Leg) else Leg.from_dict(leg) for leg in legs]
+        if not legs:
+            # Nothing to hold or pay for: an empty report would read as a successful booking
+            raise ValueError(f"Itinerary {itinerary_id} has no legs to book")
+        if len({leg.leg_id for leg in legs}) != len(legs):
+            # Each leg is booked under "<key>:<leg_id>", so a repeated id would be booked once
+            raise ValueError(f"Itinerary {itinerary_id} repeats a leg_id")
+        key, request_key, ttl = _idempotency(idempotency_key, itinerary_id, {'payment': payment_info, 'mode': mode, 'legs': [leg.leg_id for leg in legs]})
+        return self.idempotency.run(f"legs:{key}", lambda: self._book_legs(request_key, itinerary_id, payment_info, legs, mode, max_parallel), ttl)
+
+    def _book(self, key, itinerary_id, payment_info):
+        request = {**(payment_info or {}), 'idempotency_key': key}
+        saga = _Saga()
+        held = {}
+        if self._two_phase_payment():
+            # An authorisation can be voided, so it runs alongside the hold
+            steps = {"inventory": self._hold(itinerary_id, request), "payment": self._authorize(request)}
+            futures = {step: self.executor.submit(bind(method), *args) for step, (method, args) in steps.items()}
+            for step, future in futures.items():
+                try:
+                    held[step] = future.result()
+                except Exception as exc:
+                    saga.failed(step, exc)
+                else:
+                    saga.done(step, self._release(step, held[step]))
+            if saga.failure is not None:
+                saga.abort()
+        else:
+            held["inventory"] = self._step(saga, "inventory", self._hold(itinerary_id, request), None)
+            saga.done("inventory", self._release("inventory", held["inventory"]))
+
+        booking_confirmation = self._step(saga, "confirm", self._confirm(held["inventory"]), held["inventory"])
+        saga.done("inventory", self._release("inventory", booking_confirmation))
+        if "payment" in held:
+            payment_status = self._step(saga, "capture", self._capture(held["payment"]), held["payment"])
+        else:
+            # One-phase charge, taken only now that the inventory is booked
+            payment_status = self._step(saga, "payment", self._authorize(request), None)
+
+        self._save_confirmation(itinerary_id, booking_confirmation)
         return booking_confirmation, payment_status
+
+    async def _abook(self, key, itinerary_id, payment_info):
+        request = {**(payment_info or {}), 'idempotency_key': key}
+        saga = _Saga()
+        held = {}
+        if self._two_phase_payment():
+            steps = {"inventory": self._hold(itinerary_id, request), "payment": self._authorize(request)}
+            results = await asyncio.gather(*(call(method, *args) for method, args in steps.values()), return_exceptions=True)
+            for step, result in zip(steps, results, strict=True):
+                if isinstance(result, Exception):
+                    saga.failed(step, result)
+                else:
+                    held[step] = result
+                    saga.done(step, self._release(step, result))
+            if saga.failure is not None:
+                await saga.aabort()
+        else:
+            held["inventory"] = await self._astep(saga, "inventory", self._hold(itinerary_id, request), None)
+            saga.done("inventory", self._release("inventory", held["inventory"]))
+
+        booking_confirmation = await self._astep(saga, "confirm", self._confirm(held["inventory"]), held["inventory"])
+        saga.done("inventory", self._release("inventory", booking_confirmation))
+        if "payment" in held:
+            payment_status = await self._astep(saga, "capture", self._capture(held["payment"]), held["payment"])
+        else:
+            payment_status = await self._astep(saga, "payment", self._authorize(request), None)
+
+        try:
+            await call(self.firebase.save_booking_confirmation, itinerary_id, booking_confirmation)
+        except Exception:
+            logger.exception("Booking confirmation for itinerary %s was not stored", itinerary_id)
+        return booking_confirmation, payment_status
+
+    def _book_legs(self, key, itinerary_id, payment_info, legs, mode, max_parallel):
+        request = {**(payment_info or {}), 'idempotency_key': key}
+        results = {leg.leg_id: LegResult(leg.leg_id, leg.kind) for leg in legs}
+        report = BatchBooking(itinerary_id, mode, FAILED, list(results.values()))
+        saga = _Saga()
+        queued = iter(legs)
+        running = {}
+        while True:
+            # Keep max_parallel bookings in flight; stop submitting after a failure in all-or-nothing mode
+            while len(running) < max_parallel and not (saga.failure and mode == ALL_OR_NOTHING):
+                leg = next(queued, None)
+                if leg is None:
+                    break
+                running[self.executor.submit(bind(self._book_leg), itinerary_id, leg, request)] = leg
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                leg = running.pop(future)
+                result = results[leg.leg_id]
+                try:
+                    result.confirmation = future.result()
+                except Exception as exc:
+                    result.status, result.error = FAILED, repr(exc)
+                    saga.failed(leg.leg_id, exc)
+                else:
+                    result.status = BOOKED
+                    saga.done(leg.leg_id, self._release("inventory", result.confirmation))
+
+        booked = [leg for leg in legs if results[leg.leg_id].status == BOOKED]
+        if saga.failure is not None and (mode == ALL_OR_NOTHING or not booked):
+            self._cancel_legs(saga, booked, results, report)
+
+        # Exact paise, as the cost breakdown computes them; sent as a string to stay exact in JSON.
+        # Imported here: cost_engine builds its line items from this module's legs
+        from src.services.cost_engine import ZERO, money
+        total = sum((money(leg.cost) for leg in booked), ZERO)
+        method, args = self._authorize({**request, 'amount': str(total), 'legs': [leg.leg_id for leg in booked]})
+        try:
+            authorized = method(*args)
+            saga.done("payment", self._release("payment", authorized))
+            capture = self._capture(authorized)
+            report.payment_status = capture[0](*capture[1]) if capture else authorized
+        except Exception as exc:
+            saga.failure = ("payment", exc)
+            self._cancel_legs(saga, booked, results, report)
+
+        report.status = BOOKED if len(booked) == len(legs) else "partial"
+        self._save_confirmation(itinerary_id, report.to_dict())
+        return report
+
+    def _book_leg(self, itinerary_id, leg, request):
+        request = {**request, 'idempotency_key': f"{request['idempotency_key']}:{leg.leg_id}"}
+        book_leg = getattr(self.emt, 'book_leg', None)
+        if book_leg is not None:
+            return book_leg(itinerary_id, leg.to_dict(), request)
+        return self.emt.book(itinerary_id, {**request, 'leg': leg.to_dict()})
+
+    def _cancel_legs(self, saga, booked, results, report):
+        for leg in booked:
+            results[leg.leg_id].status = CANCELLED
+        saga.abort(report)
+
+    # --- Saga steps, as (method, args) so async clients are awaited natively ---
+    def _two_phase_inventory(self):
+        return hasattr(self.emt, 'hold') and hasattr(self.emt, 'confirm')
+
+    def _two_phase_payment(self):
+        return hasattr(self.payment, 'authorize') and hasattr(self.payment, 'capture')
+
+    def _hold(self, itinerary_id, request):
+        return (self.emt.hold if self._two_phase_inventory() else self.emt.book), (itinerary_id, request)
+
+    def _authorize(self, request):
+        return (self.payment.authorize if self._two_phase_payment() else self.payment.process), (request,)
+
+    def _confirm(self, held):
+        return (self.emt.confirm, (held,)) if self._two_phase_inventory() else None
+
+    def _capture(self, authorized):
+        return (self.payment.capture, (authorized,)) if self._two_phase_payment() else None
+
+    def _release(self, step, result):
+        """
+        Compensation undoing a completed inventory or payment step, or None if the client has none.
+        """
+        if step == "inventory":
+            method = getattr(self.emt, 'cancel', None)
+        elif self._two_phase_payment():
+            method = getattr(self.payment, 'void', None)
+        else:
+            method = getattr(self.payment, 'refund', None)
+        return (method, (result,)) if method is not None else None
+
+    def _step(self, saga, step, step_call, default):
+        if step_call is None:
+            return default
+        method, args = step_call
+        try:
+            return method(*args)
+        except Exception as exc:
+            saga.failed(step, exc)
+            saga.abort()
+
+    async def _astep(self, saga, step, step_call, default):
+        if step_call is None:
+            return default
+        method, args = step_call
+        try:
+            return await call(method, *args)
+        except Exception as exc:
+            saga.failed(step, exc)
+            await saga.aabort()
+
+    def _save_confirmation(self, itinerary_id, confirmation):
+        # Durable through the gateway; the booking is settled either way, so a failure is only logged
+        try:
+            self.firebase.save_booking_confirmation(itinerary_id, confirmation)
+        except Exception:
+            logger.exception("Booking confirmation for itinerary %s was not stored", itinerary_id)
+
+
+class _Saga:
+    """
+    Compensations for the completed steps of one booking, undone in reverse order on failure.
+    """
+    def __init__(self):
+        self.compensations = {}  # step -> (method, args)
+        self.failure = None
+
+    def done(self, step, compensation):
+        if compensation is None:
+            self.compensations.pop(step, None)
+        else:
+            self.compensations[step] = compensation
+
+    def failed(self, step, exc):
+        if self.failure is None:
+            self.failure = (step, exc)
+
+    def abort(self, report=None):
+        errors = []
+        for step, (method, args) in reversed(list(self.compensations.items())):
+            try:
+                method(*args)
+            except Exception as exc:
+                errors.append((step, exc))
+        raise BookingError(*self.failure, errors, report) from self.failure[1]
+
+    async def aabort(self):
+        errors = []
+        for step, (method, args) in reversed(list(self.compensations.items())):
+            try:
+                await call(method, *args)
+            except Exception as exc:
+                errors.append((step, exc))
+        raise BookingError(*self.failure, errors) from self.failure[1]
@@ -1,6 +1,9 @@
 """
 Personalized Trip Planner - Booking Service
 
+Implements dynamic, end-to-end itinerary creation and seamless booking tailored to individual budgets, interests, and real-time conditions.
+Tech stack: Gemini, Vertex AI, Google Maps API, Firebase, BigQuery.
+
 This module is updated to use only:
 - Firebase for booking data storage
 - BigQuery for analytics
@@ -9,20 +12,16 @@ This module is updated to use only:
 All external booking systems and payment gateways have been removed.
 """
 
-"""
-Personalized Trip Planner - Booking Service
+from src.services.tracing import traced
 
-Implements dynamic, end-to-end itinerary creation and seamless booking tailored to individual budgets, interests, and real-time conditions.
-Tech stack: Gemini, Vertex AI, Google Maps API, Firebase, BigQuery.
-"""
 
 class BookingService:
     def __init__(self, firebase_client, ai_client, maps_client, bigquery_client, emt_client):
-        self.firebase = firebase_client
-        self.ai = ai_client
-        self.maps = maps_client
-        self.bigquery = bigquery_client
-        self.emt = emt_client
+        self.firebase = traced(firebase_client, "firebase")
+        self.ai = traced(ai_client, "gemini")
+        self.maps = traced(maps_client, "maps")
+        self.bigquery = traced(bigquery_client, "bigquery")
+        self.emt = traced(emt_client, "emt")
 
     def create_user_profile(self, user_data):
         """
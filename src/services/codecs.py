@@ -0,0 +1,158 @@
+"""
+Personalized Trip Planner - Codecs
+
+Pluggable serialisation for HTTP responses, stored itineraries and cached blobs.
+- JSON (HTTP responses, streams): orjson when installed, the json module otherwise.
+- Blobs (itinerary cache, disk store): msgpack compressed with zstd, falling back
+  to JSON and/or zlib when those packages are missing. Blobs start with a short
+  header naming their serializer and compression, so any blob can be read back by
+  any process, and payloads without a header are read as the plain JSON that was
+  stored before this layer existed.
+"""
+
+import dataclasses
+import datetime
+import decimal
+import json
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# b"TPC" + serializer byte + compression byte
+BLOB_MAGIC = b"TPC"
+ZSTD_LEVEL = 3
+# Blobs smaller than this are stored uncompressed
+COMPRESS_MIN_BYTES = 256
+
+
+def _default(value):
+    """
+    Fallback for values the JSON/msgpack encoders do not handle natively.
+    """
+    to_dict = getattr(value, "to_dict", None)
+    if callable(to_dict):
+        return to_dict()
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    item = getattr(value, "item", None)
+    if callable(item):
+        # NumPy scalars
+        return item()
+    return str(value)
+
+
+def dumps_json(value) -> bytes:
+    """
+    Compact UTF-8 JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads_json(payload):
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+class _Serializer:
+    __slots__ = ("dumps", "loads", "tag")
+
+    def __init__(self, tag, dumps, loads):
+        self.tag = tag
+        self.dumps = dumps
+        self.loads = loads
+
+
+class _Compression:
+    __slots__ = ("compress", "decompress", "tag")
+
+    def __init__(self, tag, compress, decompress):
+        self.tag = tag
+        self.compress = compress
+        self.decompress = decompress
+
+
+SERIALIZERS = {b"j": _Serializer(b"j", dumps_json, loads_json)}
+if msgpack is not None:
+    SERIALIZERS[b"m"] = _Serializer(
+        b"m",
+        lambda value: msgpack.packb(value, default=_default, use_bin_type=True),
+        lambda payload: msgpack.unpackb(payload, raw=False, strict_map_key=False),
+    )
+
+COMPRESSIONS = {
+    b"n": _Compression(b"n", bytes, bytes),
+    b"l": _Compression(b"l", lambda data: zlib.compress(data, 6), zlib.decompress),
+}
+if zstandard is not None:
+    COMPRESSIONS[b"z"] = _Compression(
+        b"z",
+        lambda data: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+    )
+
+
+class BlobCodec:
+    """
+    Encodes values as self-describing compressed blobs.
+    Args:
+        serializer (str): "msgpack" or "json"; defaults to msgpack when available.
+        compression (str): "zstd", "zlib" or "none"; defaults to zstd when available.
+    """
+    def __init__(self, serializer=None, compression=None):
+        serializer_tag = {"msgpack": b"m", "json": b"j"}.get(serializer or ("msgpack" if msgpack else "json"))
+        compression_tag = {"zstd": b"z", "zlib": b"l", "none": b"n"}.get(compression or ("zstd" if zstandard else "zlib"))
+        if serializer_tag not in SERIALIZERS or compression_tag not in COMPRESSIONS:
+            raise ValueError(f"Codec {serializer}/{compression} is not available")
+        self.serializer = SERIALIZERS[serializer_tag]
+        self.compression = COMPRESSIONS[compression_tag]
+
+    def encode(self, value) -> bytes:
+        data = self.serializer.dumps(value)
+        compression = self.compression if len(data) >= COMPRESS_MIN_BYTES else COMPRESSIONS[b"n"]
+        return BLOB_MAGIC + self.serializer.tag + compression.tag + compression.compress(data)
+
+    def decode(self, payload):
+        return decode_blob(payload)
+
+
+def decode_blob(payload):
+    """
+    Decode a blob written by any BlobCodec, or legacy plain JSON (bytes or str).
+    """
+    if isinstance(payload, str):
+        return loads_json(payload)
+    payload = bytes(payload)
+    if not payload.startswith(BLOB_MAGIC):
+        return loads_json(payload)
+    serializer_tag, compression_tag = payload[3:4], payload[4:5]
+    serializer = SERIALIZERS.get(serializer_tag)
+    compression = COMPRESSIONS.get(compression_tag)
+    if serializer is None or compression is None:
+        raise ValueError(f"Blob needs codec {serializer_tag!r}/{compression_tag!r}, which is not installed")
+    return serializer.loads(compression.decompress(payload[5:]))
+
+
+# Default codec for stored itineraries and cached blobs
+blob_codec = BlobCodec()
@@ -0,0 +1,313 @@
+"""
+Personalized Trip Planner - Condition Monitor
+
+Background scheduler for real-time adjustments across all active itineraries.
+Each poll groups tracked itineraries by region (geohash cell of their stops) and
+time window (hour of their next activity), fetches weather and traffic once per
+group, and queues only the trips whose conditions changed. A worker pool re-plans
+them in order of next activity start, so the trip that is about to start goes first.
+Stop times are wall-clock minutes at the destination, so they are resolved in the
+trip's own timezone rather than the server's.
+"""
+
+import datetime
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from src.services.places_index import geohash, normalize_query
+from src.services.realtime_adjustments import (
+    fetch_conditions_from_maps_api,
+    itinerary_point,
+)
+
+# Itineraries whose next activity starts further ahead than this are not polled yet
+MONITOR_HORIZON = 6 * 3600
+# Width of the time windows itineraries are grouped into
+MONITOR_WINDOW = 3600
+# Timezone of itineraries that do not name their destination's
+DEFAULT_TIMEZONE = "UTC"
+
+
+def region_of(itinerary, precision=5):
+    """
+    Region key for an itinerary: geohash cell of its first located stop, or its
+    normalized destination when no stop has coordinates.
+    """
+    point = itinerary_point(itinerary)
+    if point is not None:
+        return geohash(point[0], point[1], precision)
+    return normalize_query(itinerary.get('destination'))
+
+
+def trip_date(itinerary):
+    """
+    Day the itinerary's route is planned for: its 'date' or 'start_date', else the
+    'start_date' of its preferences; None for undated itineraries.
+    """
+    date = itinerary.get('date') or itinerary.get('start_date') or (itinerary.get('preferences') or {}).get('start_date')
+    if not date:
+        return None
+    try:
+        return datetime.date.fromisoformat(str(date)[:10])
+    except ValueError:
+        return None
+
+
+def trip_timezone(itinerary):
+    """
+    Destination timezone of the itinerary: the IANA name in its 'timezone' or its
+    preferences' 'timezone', else DEFAULT_TIMEZONE.
+    """
+    name = itinerary.get('timezone') or (itinerary.get('preferences') or {}).get('timezone')
+    try:
+        return ZoneInfo(str(name or DEFAULT_TIMEZONE))
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def local_time(day, minutes, tz):
+    """
+    Epoch seconds of the wall-clock time `minutes` after midnight of `day` in `tz`.
+    """
+    midnight = datetime.datetime.combine(day, datetime.time(), tzinfo=tz)
+    return (midnight + datetime.timedelta(minutes=minutes)).timestamp()
+
+
+def next_start(itinerary, now):
+    """
+    Epoch seconds at which the itinerary's next (or current) stop starts on its trip
+    date, in the destination's timezone; None once the day is over, or if the itinerary has no date (an undated
+    trip is never due, so it is not monitored). Itineraries without a planned route
+    are due from the start of their day.
+    """
+    day = trip_date(itinerary)
+    if day is None:
+        return None
+    tz = trip_timezone(itinerary)
+    stops = (itinerary.get('route') or {}).get('stops') or []
+    if not stops:
+        midnight = local_time(day, 0, tz)
+        return max(now, midnight) if now < local_time(day + datetime.timedelta(days=1), 0, tz) else None
+    for stop in stops:
+        if local_time(day, stop['departure'], tz) > now:
+            return local_time(day, stop['arrival'], tz)
+    return None
+
+
+class _Tracked:
+    __slots__ = ("checked_at", "conditions", "itinerary", "itinerary_id", "region", "tracked_at")
+
+    def __init__(self, itinerary_id, itinerary, region, now):
+        self.itinerary_id = itinerary_id
+        self.itinerary = itinerary
+        self.region = region
+        self.tracked_at = now
+        self.checked_at = None
+        self.conditions = itinerary.get('conditions')
+
+
+class ConditionMonitor:
+    """
+    Tracks active itineraries and re-plans them as conditions change.
+    Args:
+        replan: Callable (itinerary_id, conditions) re-planning one trip, e.g.
+            ItineraryGenerator.adjust_realtime; a returned dict replaces the tracked itinerary.
+        fetch_conditions: Callable (itinerary, when) -> conditions, called once per region and window.
+        workers (int): Re-planning worker threads.
+        fetch_workers (int): Concurrent condition fetches per poll.
+        interval (float): Seconds between polls when started.
+    """
+    def __init__(self, replan, fetch_conditions=fetch_conditions_from_maps_api, workers=8, fetch_workers=16,
+                 interval=300.0, horizon=MONITOR_HORIZON, window=MONITOR_WINDOW, region_precision=5):
+        self.replan = replan
+        self.fetch_conditions = fetch_conditions
+        self.workers = workers
+        self.interval = interval
+        self.horizon = horizon
+        self.window = window
+        self.region_precision = region_precision
+        self.fetch_executor = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="conditions")
+        self._tracked = {}  # itinerary_id -> _Tracked
+        self._queue = []  # (next start, seq, itinerary_id, conditions, queued_at)
+        self._pending = {}  # itinerary_id -> seq of its latest queue entry
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._threads = []
+        self.counters = {"polls": 0, "fetches": 0, "fetch_errors": 0, "queued": 0, "replanned": 0, "replan_errors": 0}
+
+    def track(self, itinerary_id, itinerary):
+        """
+        Start (or keep) monitoring an itinerary; undated itineraries are skipped.
+        Returns:
+            bool: Whether the itinerary is monitored.
+        """
+        if trip_date(itinerary) is None:
+            self.untrack(itinerary_id)
+            return False
+        entry = _Tracked(itinerary_id, itinerary, region_of(itinerary, self.region_precision), time.time())
+        with self._lock:
+            previous = self._tracked.get(itinerary_id)
+            if previous is not None:
+                entry.checked_at = previous.checked_at
+            self._tracked[itinerary_id] = entry
+        return True
+
+    def untrack(self, itinerary_id):
+        with self._lock:
+            self._tracked.pop(itinerary_id, None)
+            self._pending.pop(itinerary_id, None)
+
+    def poll(self, now=None):
+        """
+        Fetch conditions once per (region, time window) for the itineraries due within
+        the horizon and queue the ones whose conditions changed.
+        Returns:
+            int: Number of itineraries queued for re-planning.
+        """
+        now = time.time() if now is None else now
+        groups = defaultdict(list)
+        with self._lock:
+            entries = list(self._tracked.values())
+        for entry in entries:
+            start = next_start(entry.itinerary, now)
+            if start is None:
+                # Trip day is over, or the trip has no date
+                self.untrack(entry.itinerary_id)
+            elif start - now <= self.horizon:
+                groups[(entry.region, int(start // self.window))].append((start, entry))
+
+        futures = {
+            key: self.fetch_executor.submit(self.fetch_conditions, members[0][1].itinerary, members[0][0])
+            for key, members in groups.items()
+        }
+        queued = 0
+        for key, future in futures.items():
+            try:
+                conditions = future.result()
+            except Exception:
+                self._count("fetch_errors")
+                continue
+            with self._lock:
+                for start, entry in groups[key]:
+                    entry.checked_at = now
+                    if conditions == entry.conditions or self._tracked.get(entry.itinerary_id) is not entry:
+                        continue
+                    seq = next(self._seq)
+                    heapq.heappush(self._queue, (start, seq, entry.itinerary_id, conditions, now))
+                    self._pending[entry.itinerary_id] = seq
+                    queued += 1
+                self._ready.notify_all()
+        self._count("polls")
+        self._count("fetches", len(futures))
+        self._count("queued", queued)
+        return queued
+
+    def drain(self):
+        """
+        Re-plan everything queued on the calling thread (used when no workers are started).
+        """
+        while self._run_next(block=False):
+            pass
+
+    def start(self):
+        """
+        Start the worker pool and the polling thread.
+        """
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._worker_loop, name=f"condition-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        self._threads.append(threading.Thread(target=self._poll_loop, name="condition-poll", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            self._ready.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def metrics(self, now=None):
+        """
+        Backlog and staleness:
+        - backlog: trips queued or being re-planned.
+        - oldest_queued_seconds: how long the oldest queued re-plan has waited.
+        - staleness_seconds: longest time since a trip due within the horizon had its conditions checked.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            live = [item for item in self._queue if self._pending.get(item[2]) == item[1]]
+            due = [
+                entry for entry in self._tracked.values()
+                if (next_start(entry.itinerary, now) or float("inf")) - now <= self.horizon
+            ]
+            return {
+                **self.counters,
+                "tracked": len(self._tracked),
+                "backlog": len(live) + self._in_flight,
+                "in_flight": self._in_flight,
+                "oldest_queued_seconds": max((now - item[4] for item in live), default=0.0),
+                "staleness_seconds": max(
+                    (now - (entry.checked_at or entry.tracked_at) for entry in due), default=0.0
+                ),
+            }
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                # A failed poll is retried on the next tick
+                pass
+            self._stop.wait(self.interval)
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            self._run_next(block=True)
+
+    def _run_next(self, block):
+        with self._lock:
+            while True:
+                while not self._queue:
+                    if not block or self._stop.is_set():
+                        return False
+                    self._ready.wait()
+                _, seq, itinerary_id, conditions, _ = heapq.heappop(self._queue)
+                # Superseded by a newer entry for the same trip, or untracked
+                if self._pending.get(itinerary_id) == seq:
+                    break
+            del self._pending[itinerary_id]
+            self._in_flight += 1
+        try:
+            updated = self.replan(itinerary_id, conditions)
+        except Exception:
+            self._count("replan_errors")
+        else:
+            self._count("replanned")
+            with self._lock:
+                entry = self._tracked.get(itinerary_id)
+                if entry is not None:
+                    entry.conditions = conditions
+                    if isinstance(updated, dict):
+                        entry.itinerary = updated
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        return True
@@ -0,0 +1,168 @@
+"""
+Personalized Trip Planner - Conditions Cache
+
+Shared weather/traffic cache in front of a pluggable conditions provider.
+Entries are keyed by (geohash cell, hour bucket), so every itinerary in the same
+~5 km cell asking about the same hour shares one upstream fetch:
+- Fresh entries (younger than ttl) are served directly.
+- Stale entries (up to ttl + stale_ttl) are served immediately while one
+  background fetch revalidates them.
+- Concurrent misses for the same key wait on a single in-flight fetch.
+"""
+
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from src.services.interfaces.conditions_provider import ConditionsProviderInterface
+from src.services.places_index import geohash
+from src.services.tracing import annotate, bind, traced
+
+HOUR = 3600
+
+
+class StaticConditionsProvider(ConditionsProviderInterface):
+    """
+    Placeholder provider returning fixed conditions until a real weather/traffic API is wired in.
+    """
+    def fetch(self, cell, point, hour):
+        # Placeholder for actual Maps / weather API integration
+        return {"weather": "Sunny", "traffic": "Moderate", "events": []}
+
+
+class FakeConditionsProvider(ConditionsProviderInterface):
+    """
+    Offline provider for tests and benchmarks: deterministic conditions per (cell, hour),
+    optional latency, per-key overrides, and a count of upstream calls.
+    """
+    WEATHER = ("Sunny", "Clouds")
+    TRAFFIC = ("Light", "Moderate", "Heavy")
+
+    def __init__(self, latency=0.0, rain_probability=0.3, seed=0):
+        self.latency = latency
+        self.rain_probability = rain_probability
+        self.seed = seed
+        self.calls = 0
+        self._overrides = {}
+        self._lock = threading.Lock()
+
+    def set(self, cell, hour, conditions):
+        """
+        Force the conditions returned for a cell and hour bucket.
+        """
+        self._overrides[(cell, hour)] = conditions
+
+    def fetch(self, cell, point, hour):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        override = self._overrides.get((cell, hour))
+        if override is not None:
+            return override
+        digest = hashlib.sha256(f"{self.seed}:{cell}:{hour}".encode()).digest()
+        rng = random.Random(digest)
+        start = time.localtime(hour).tm_hour * 60
+        if rng.random() < self.rain_probability:
+            weather = {"main": "Rain", "start": start, "end": start + rng.choice((60, 120, 180))}
+        else:
+            weather = {"main": rng.choice(self.WEATHER)}
+        return {"weather": weather, "traffic": rng.choice(self.TRAFFIC), "events": []}
+
+
+class ConditionsCache:
+    def __init__(self, provider, ttl=15 * 60, stale_ttl=60 * 60, precision=5, max_entries=100_000, executor=None):
+        self.provider = traced(provider, "conditions")
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.precision = precision
+        self.max_entries = max_entries
+        self.executor = executor or ThreadPoolExecutor(max_workers=4, thread_name_prefix="conditions-refresh")
+        self._entries = OrderedDict()  # (cell, hour) -> (fetched_at, conditions)
+        self._inflight = {}  # (cell, hour) -> Future
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, lat, lng, when=None):
+        """
+        Conditions at (lat, lng) for the hour containing `when` (epoch seconds, default now).
+        """
+        return self.lookup(geohash(lat, lng, self.precision), (lat, lng), when)
+
+    def lookup(self, cell, point=None, when=None):
+        """
+        Conditions for a region cell (a geohash, or a normalized destination name when
+        there are no coordinates) for the hour containing `when`.
+        """
+        now = time.time()
+        hour = int((now if when is None else when) // HOUR) * HOUR
+        key = (cell, hour)
+        owner = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry[0]
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    annotate(conditions_cache_hit=True)
+                    return entry[1]
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = future = Future()
+                        self.executor.submit(bind(self._fetch), key, point, future)
+                    annotate(conditions_cache_hit=True, conditions_cache_stale=True)
+                    return entry[1]
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                self._inflight[key] = future = Future()
+                owner = True
+        annotate(conditions_cache_hit=False)
+        if owner:
+            self._fetch(key, point, future)
+        return future.result()
+
+    def invalidate(self, cell=None):
+        """
+        Drop cached conditions for one cell, or everything.
+        """
+        with self._lock:
+            if cell is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == cell]:
+                    del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses,
+                "coalesced": self.coalesced, "entries": len(self._entries),
+            }
+
+    def _fetch(self, key, point, future):
+        try:
+            conditions = self.provider.fetch(key[0], point, key[1])
+        except Exception as exc:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(exc)
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), conditions)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._inflight.pop(key, None)
+        future.set_result(conditions)
@@ -0,0 +1,377 @@
+"""
+Personalized Trip Planner - Cost Engine
+
+Computes itinerary costs from line items (hotels, trains, activities) with exact
+Decimal arithmetic: the trip total, per-category subtotals and per-traveller
+splits (equal, weighted or itemised). Each itinerary's breakdown is kept in
+memory and updated incrementally: changing one activity adjusts the totals and
+that item's share of the split instead of recomputing the trip. The rendered
+breakdown is memoised per version, so repeated reads do no work and no Firebase read.
+Cached breakdowns are keyed on the itinerary's 'version' and reloaded once they are
+older than a TTL, so changes written by other processes are picked up; the cache is
+LRU-bounded. Item and split changes are stored on the itinerary ('cost_overrides',
+'travellers', 'split') by the cost sharing service, so a reload keeps them.
+
+Splits are allocated in whole paise with the largest-remainder method, so the
+travellers' shares always add up to the total exactly.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import ROUND_FLOOR, ROUND_HALF_UP, Decimal, InvalidOperation
+
+from src.services.booking_payment import itinerary_legs
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0")
+DEFAULT_CURRENCY = "INR"
+
+# Split modes
+EQUAL = "equal"
+WEIGHTED = "weighted"
+ITEMISED = "itemised"
+
+# Line item categories for itinerary leg kinds
+CATEGORIES = {"hotel": "accommodation", "train": "transport", "activity": "activities"}
+# Amount strings: an optional sign and currency symbol or code around digits that are
+# plain, grouped in thousands (1,250,000) or in lakhs (12,50,000), with an optional
+# decimal point. Anything else (1.250,50 or 1,25) is ambiguous and rejected.
+_CURRENCY = r"(?:₹|rs\.?|inr|\$|usd|€|eur|£|gbp)"
+_AMOUNT = re.compile(
+    rf"(?P<sign>[-+]?)\s*(?:{_CURRENCY}\s*)?(?P<sign2>[-+]?)"
+    r"(?P<number>\d{1,3}(?:,\d{3})+|\d{1,2}(?:,\d{2})+,\d{3}|\d+)(?P<fraction>\.\d+)?"
+    rf"(?:\s*{_CURRENCY})?",
+    re.IGNORECASE,
+)
+
+
+def money(value):
+    """
+    Exact Decimal amount rounded to paise; floats go through str() so 0.1 stays 0.1,
+    and strings may carry a currency symbol or code and thousands or lakh separators
+    ("₹1,250", "Rs.12,50,000", "1250.50 INR").
+    """
+    if value is None or value == "":
+        return ZERO
+    if isinstance(value, str):
+        value = _parse_amount(value)
+    try:
+        amount = value if isinstance(value, Decimal) else Decimal(str(value))
+    except InvalidOperation as exc:
+        raise ValueError(f"Invalid amount {value!r}") from exc
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _parse_amount(text):
+    match = _AMOUNT.fullmatch(text.strip())
+    if match is None or (match['sign'] and match['sign2']):
+        raise ValueError(f"Invalid amount {text!r}")
+    sign = "-" if "-" in (match['sign'], match['sign2']) else ""
+    return f"{sign}{match['number'].replace(',', '')}{match['fraction'] or ''}"
+
+
+def allocate(amount, weights):
+    """
+    Split an amount by weight in whole paise; shares sum exactly to the amount.
+    Args:
+        amount (Decimal): Amount to split.
+        weights (dict): Traveller -> weight (non-negative, not all zero).
+    Returns:
+        dict: Traveller -> Decimal share.
+    """
+    weights = {traveller: Decimal(str(weight)) for traveller, weight in weights.items()}
+    total_weight = sum(weights.values())
+    if not weights or total_weight <= 0:
+        raise ValueError("Split needs at least one traveller with a positive weight")
+    cents = int(money(amount) / CENT)
+    if cents < 0:
+        # Discounts and refunds: split the magnitude, then flip the sign
+        return {traveller: -share for traveller, share in allocate(-money(amount), weights).items()}
+    shares, remainders = {}, []
+    for traveller, weight in weights.items():
+        exact = Decimal(cents) * weight / total_weight
+        whole = int(exact.to_integral_value(rounding=ROUND_FLOOR))
+        shares[traveller] = whole
+        remainders.append((exact - whole, traveller))
+    # Hand the leftover paise to the largest remainders (first listed wins ties)
+    leftover = cents - sum(shares.values())
+    for _, traveller in sorted(remainders, key=lambda entry: -entry[0])[:leftover]:
+        shares[traveller] += 1
+    return {traveller: Decimal(share) * CENT for traveller, share in shares.items()}
+
+
+@dataclass(slots=True)
+class LineItem:
+    """
+    One priced part of an itinerary. shares (traveller -> weight) assigns the item to
+    specific travellers in itemised splits; without it the item is shared by everyone.
+    """
+    item_id: str
+    category: str
+    amount: Decimal
+    quantity: int = 1
+    shares: dict = None
+
+    @property
+    def total(self):
+        return (self.amount * self.quantity).quantize(CENT, rounding=ROUND_HALF_UP)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            item_id=str(data['item_id']),
+            category=data.get('category') or "other",
+            amount=money(data.get('amount', data.get('cost'))),
+            quantity=int(data.get('quantity') or 1),
+            shares=data.get('shares'),
+        )
+
+
+def itinerary_line_items(itinerary):
+    """
+    Line items for an itinerary: explicit 'line_items' plus its priced bookable legs
+    (hotels, trains, activities), with the leg ids as item ids, then the stored
+    'cost_overrides' (changed or removed items). Legs without a cost are left out;
+    an explicit cost of 0 (a free activity) is kept.
+    """
+    items = [LineItem.from_dict(item) for item in itinerary.get('line_items') or ()]
+    for leg in itinerary_legs(itinerary):
+        details = leg.details or {}
+        if details.get('cost') is None or details.get('cost') == "":
+            continue
+        items.append(LineItem(
+            item_id=leg.leg_id,
+            category=CATEGORIES.get(leg.kind, leg.kind),
+            amount=money(leg.cost),
+            quantity=int(details.get('quantity') or 1),
+            shares=details.get('shares'),
+        ))
+    overrides = [override for override in (itinerary.get('cost_overrides') or {}).values() if override]
+    if overrides:
+        by_id = {item.item_id: item for item in items}
+        for override in overrides:
+            if override.get('removed'):
+                by_id.pop(str(override['item_id']), None)
+            else:
+                item = LineItem.from_dict(override)
+                by_id[item.item_id] = item
+        items = list(by_id.values())
+    return items
+
+
+def override_key(item_id):
+    """
+    Firebase-safe key of an item under 'cost_overrides' (item ids may contain '.', '/', ...).
+    """
+    return hashlib.sha1(str(item_id).encode("utf-8")).hexdigest()
+
+
+class CostBreakdown:
+    """
+    Running cost state of one itinerary.
+    """
+    def __init__(self, itinerary_id, travellers=None, mode=EQUAL, weights=None, currency=DEFAULT_CURRENCY):
+        self.itinerary_id = itinerary_id
+        self.currency = currency
+        self.version = 0
+        self.items = {}  # item_id -> LineItem
+        self.total = ZERO
+        self.categories = {}  # category -> [subtotal, item count]
+        self._allocations = {}  # item_id -> {traveller: share}, itemised mode only
+        self._per_traveller = {}  # traveller -> running share, itemised mode only
+        self._rendered = None
+        self._rendered_version = -1
+        self.set_split(travellers or [], mode, weights)
+
+    def upsert(self, item):
+        """
+        Add or replace one line item; O(1) apart from the item's own split.
+        """
+        previous = self.items.get(item.item_id)
+        if previous is not None:
+            self._remove(previous)
+        self.items[item.item_id] = item
+        self.total += item.total
+        subtotal = self.categories.setdefault(item.category, [ZERO, 0])
+        subtotal[0] += item.total
+        subtotal[1] += 1
+        if self.mode == ITEMISED and self.travellers:
+            allocation = allocate(item.total, self._item_weights(item))
+            self._allocations[item.item_id] = allocation
+            for traveller, share in allocation.items():
+                self._per_traveller[traveller] = self._per_traveller.get(traveller, ZERO) + share
+        self.version += 1
+
+    def remove(self, item_id):
+        item = self.items.pop(item_id, None)
+        if item is None:
+            return False
+        self._remove(item)
+        self.version += 1
+        return True
+
+    def set_split(self, travellers, mode=EQUAL, weights=None):
+        """
+        Change who shares the trip and how; itemised splits are re-allocated from scratch.
+        """
+        if mode not in (EQUAL, WEIGHTED, ITEMISED):
+            raise ValueError(f"Unknown split mode '{mode}'")
+        self.travellers = list(travellers)
+        self.mode = mode
+        self.weights = {traveller: (weights or {}).get(traveller, 1) for traveller in self.travellers}
+        self._allocations, self._per_traveller = {}, {}
+        if mode == ITEMISED and self.travellers:
+            for item in self.items.values():
+                allocation = allocate(item.total, self._item_weights(item))
+                self._allocations[item.item_id] = allocation
+                for traveller, share in allocation.items():
+                    self._per_traveller[traveller] = self._per_traveller.get(traveller, ZERO) + share
+        self.version += 1
+
+    def split(self):
+        """
+        Per-traveller amounts, summing exactly to the total.
+        """
+        if not self.travellers:
+            return {}
+        if self.mode == ITEMISED:
+            return {traveller: self._per_traveller.get(traveller, ZERO) for traveller in self.travellers}
+        weights = self.weights if self.mode == WEIGHTED else dict.fromkeys(self.travellers, 1)
+        return allocate(self.total, weights)
+
+    def to_dict(self):
+        """
+        Rendered breakdown (amounts as strings, to stay exact in JSON), memoised per version.
+        """
+        if self._rendered_version != self.version:
+            self._rendered = {
+                'itinerary_id': self.itinerary_id,
+                'version': self.version,
+                'currency': self.currency,
+                'total': str(self.total),
+                'categories': {category: str(subtotal) for category, (subtotal, count) in self.categories.items() if count},
+                'split': {'mode': self.mode, 'travellers': {traveller: str(share) for traveller, share in self.split().items()}},
+                'items': len(self.items),
+            }
+            self._rendered_version = self.version
+        return self._rendered
+
+    def _remove(self, item):
+        self.total -= item.total
+        subtotal = self.categories[item.category]
+        subtotal[0] -= item.total
+        subtotal[1] -= 1
+        for traveller, share in self._allocations.pop(item.item_id, {}).items():
+            self._per_traveller[traveller] -= share
+
+    def _item_weights(self, item):
+        weights = {traveller: weight for traveller, weight in (item.shares or {}).items() if traveller in self.weights}
+        return weights or dict.fromkeys(self.travellers, 1)
+
+
+class CostEngine:
+    """
+    In-memory CostBreakdowns for recently used itineraries, least recently used evicted first.
+    """
+    def __init__(self, max_entries=10_000, ttl=60.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl  # Seconds before a cached breakdown is reloaded from its itinerary
+        self.clock = clock
+        self._breakdowns = OrderedDict()  # itinerary_id -> (loaded_at, itinerary version, CostBreakdown)
+        self._lock = threading.Lock()
+
+    def track(self, itinerary):
+        """
+        (Re)build the breakdown of an itinerary dict; travellers and split come from its
+        'travellers' and 'split' ({'mode', 'weights'}) fields.
+        Returns:
+            dict: The rendered breakdown, or None if the itinerary has no priced items.
+        """
+        split = itinerary.get('split') or {}
+        breakdown = CostBreakdown(
+            itinerary.get('id'),
+            travellers=itinerary.get('travellers') or (itinerary.get('preferences') or {}).get('travellers') or [],
+            mode=split.get('mode', EQUAL),
+            weights=split.get('weights'),
+            currency=itinerary.get('currency') or DEFAULT_CURRENCY,
+        )
+        for item in itinerary_line_items(itinerary):
+            breakdown.upsert(item)
+        with self._lock:
+            self._breakdowns[breakdown.itinerary_id] = (self.clock(), itinerary.get('version'), breakdown)
+            self._breakdowns.move_to_end(breakdown.itinerary_id)
+            while len(self._breakdowns) > self.max_entries:
+                self._breakdowns.popitem(last=False)
+            return _rendered(breakdown)
+
+    def breakdown(self, itinerary_id, loader=None, version=None):
+        """
+        Memoised breakdown; on a miss, a version mismatch or an entry older than the TTL,
+        the itinerary is read once with loader(itinerary_id).
+        Args:
+            version: The itinerary version the caller knows of, if any.
+        Returns:
+            dict: The rendered breakdown, or None if the itinerary is unknown or has no
+                priced items (callers then fall back to a stored breakdown).
+        """
+        with self._lock:
+            breakdown = self._fresh(itinerary_id, version)
+            if breakdown is not None:
+                return _rendered(breakdown)
+        itinerary = loader(itinerary_id) if loader is not None else None
+        if not itinerary:
+            return None
+        return self.track({'id': itinerary_id, **itinerary})
+
+    def is_tracked(self, itinerary_id):
+        with self._lock:
+            return self._fresh(itinerary_id) is not None
+
+    def update_item(self, itinerary_id, item):
+        """
+        Add or replace one line item (LineItem or dict with item_id, category, amount).
+        """
+        item = item if isinstance(item, LineItem) else LineItem.from_dict(item)
+        with self._lock:
+            breakdown = self._entry(itinerary_id)
+            breakdown.upsert(item)
+            return breakdown.to_dict()
+
+    def remove_item(self, itinerary_id, item_id):
+        with self._lock:
+            breakdown = self._entry(itinerary_id)
+            breakdown.remove(item_id)
+            return breakdown.to_dict()
+
+    def set_split(self, itinerary_id, travellers, mode=EQUAL, weights=None):
+        with self._lock:
+            breakdown = self._entry(itinerary_id)
+            breakdown.set_split(travellers, mode, weights)
+            return breakdown.to_dict()
+
+    def forget(self, itinerary_id):
+        with self._lock:
+            self._breakdowns.pop(itinerary_id, None)
+
+    def _fresh(self, itinerary_id, version=None):
+        entry = self._breakdowns.get(itinerary_id)
+        if entry is None:
+            return None
+        loaded_at, cached_version, breakdown = entry
+        if (version is not None and version != cached_version) or self.clock() - loaded_at >= self.ttl:
+            return None
+        self._breakdowns.move_to_end(itinerary_id)
+        return breakdown
+
+    def _entry(self, itinerary_id):
+        # Changes apply to the cached breakdown even if it is past its TTL: it is reloaded on the next read
+        return self._breakdowns[itinerary_id][2]
+
+
+def _rendered(breakdown):
+    # A breakdown without line items is not a cost estimate: report it as missing
+    return breakdown.to_dict() if breakdown.items else None
@@ -1,22 +1,114 @@
 """
 Personalized Trip Planner - Cost Breakdown & Sharing Service
 
-Provides cost breakdowns and sharing capabilities for itineraries.
+Provides cost breakdowns and sharing capabilities for itineraries. Breakdowns are
+computed by the cost engine (cost_engine.py) and served from memory; Firebase is
+read only for itineraries this process has not seen yet, or has not read within the
+engine's TTL. Item and split changes are written to the itinerary document, so every
+process sees them on its next reload. With a snapshot service
+configured, shared links point to pre-rendered static exports (share_snapshots.py).
 """
 
+from src.services.async_support import call
+from src.services.cost_engine import CostEngine, LineItem, override_key
+from src.services.tracing import traced
+
 
 class CostSharingService:
-    def __init__(self, firebase_client):
-        self.firebase = firebase_client
+    def __init__(self, firebase_client, engine=None, snapshots=None):
+        self.firebase = traced(firebase_client, "firebase")
+        self.engine = engine if engine is not None else CostEngine()
+        self.snapshots = snapshots
+
+    def track_itinerary(self, itinerary):
+        """
+        Compute and keep the cost breakdown of a newly generated or updated itinerary.
+        """
+        if self.snapshots is not None and itinerary.get('id'):
+            self.snapshots.invalidate(itinerary['id'])
+        return self.engine.track(itinerary)
 
     def get_cost_breakdown(self, itinerary_id):
         """
-        Retrieve cost breakdown for an itinerary from Firebase.
+        Cost breakdown for an itinerary: total, per-category subtotals and per-traveller split.
+        Falls back to the stored Firebase breakdown for itineraries without line items.
         """
-        return self.firebase.get_cost_breakdown(itinerary_id)
+        breakdown = self.engine.breakdown(itinerary_id, loader=self._load_itinerary)
+        if breakdown is None:
+            return self.firebase.get_cost_breakdown(itinerary_id)
+        return breakdown
+
+    def update_item(self, itinerary_id, item):
+        """
+        Change one line item (e.g. an activity's price) and return the updated breakdown.
+        """
+        item = item if isinstance(item, LineItem) else LineItem.from_dict(item)
+        self._load(itinerary_id)
+        breakdown = self.engine.update_item(itinerary_id, item)
+        self.firebase.update_itinerary(itinerary_id, {f"cost_overrides/{override_key(item.item_id)}": {
+            'item_id': item.item_id,
+            'category': item.category,
+            'amount': str(item.amount),
+            'quantity': item.quantity,
+            'shares': item.shares,
+        }})
+        return breakdown
+
+    def remove_item(self, itinerary_id, item_id):
+        self._load(itinerary_id)
+        breakdown = self.engine.remove_item(itinerary_id, item_id)
+        self.firebase.update_itinerary(itinerary_id, {f"cost_overrides/{override_key(item_id)}": {'item_id': item_id, 'removed': True}})
+        return breakdown
+
+    def set_split(self, itinerary_id, travellers, mode="equal", weights=None):
+        self._load(itinerary_id)
+        breakdown = self.engine.set_split(itinerary_id, travellers, mode, weights)
+        self.firebase.update_itinerary(itinerary_id, {'travellers': list(travellers), 'split': {'mode': mode, 'weights': weights}})
+        return breakdown
 
     def share_itinerary(self, itinerary_id):
         """
-        Generate shareable link for itinerary using Firebase.
+        Generate shareable link for itinerary: a static snapshot when a snapshot service
+        is configured and the itinerary can be loaded, a Firebase link otherwise.
         """
+        snapshot = self.share_snapshot(itinerary_id)
+        if snapshot is not None:
+            return snapshot['link']
         return self.firebase.generate_shareable_link(itinerary_id)
+
+    def share_snapshot(self, itinerary_id):
+        """
+        Publish (or reuse) the static snapshot of an itinerary with its cost breakdown.
+        A snapshot published within the snapshot service's TTL is returned without reading
+        the itinerary, unless the cached cost breakdown has changed since.
+        Returns:
+            dict: Snapshot link, hash and export URLs, or None without a snapshot service.
+        """
+        if self.snapshots is None:
+            return None
+        snapshot = self.snapshots.current(itinerary_id, self.engine.breakdown(itinerary_id))
+        if snapshot is not None:
+            return snapshot
+        itinerary = self._load_itinerary(itinerary_id)
+        if not itinerary:
+            return None
+        cost = self.engine.breakdown(itinerary_id, loader=lambda _: itinerary)
+        return self.snapshots.publish({**itinerary, 'id': itinerary_id}, cost)
+
+    async def aget_cost_breakdown(self, itinerary_id):
+        breakdown = self.engine.breakdown(itinerary_id)
+        if breakdown is not None:
+            return breakdown
+        return await call(self.get_cost_breakdown, itinerary_id)
+
+    async def ashare_itinerary(self, itinerary_id):
+        return await call(self.share_itinerary, itinerary_id)
+
+    def _load(self, itinerary_id):
+        # Changes apply to a breakdown built from the current itinerary; unknown ids raise KeyError
+        if not self.engine.is_tracked(itinerary_id):
+            self.engine.breakdown(itinerary_id, loader=self._load_itinerary)
+
+    def _load_itinerary(self, itinerary_id):
+        get_itinerary = getattr(self.firebase, 'get_itinerary', None)
+        return get_itinerary(itinerary_id) if get_itinerary is not None else None
@@ -2,27 +2,94 @@
 Personalized Trip Planner - Data Aggregation Service
 
 Aggregates data from accommodations, transport, events, attractions, local guides, and tourism boards using Maps API and other sources.
+Sources are queried concurrently, each with its own deadline and circuit breaker, and
+the aggregate contains whatever finished in time plus a per-source status.
 """
 
 
 import googlemaps
 
+from src.services.fanout import CircuitBreaker, Stage, fan_out, make_executor
+from src.services.places_index import PlacesService
+from src.services.tracing import traced
+
+# Default per-source deadlines (seconds)
+SOURCE_DEADLINES = {"locations": 3.0, "events": 2.0, "guides": 2.0}
+
+
+class Source:
+    """
+    A pluggable aggregation source: fetch(preferences) -> list.
+    """
+    __slots__ = ("breaker", "deadline", "fetch", "name")
+
+    def __init__(self, name, fetch, deadline=2.0, breaker=None):
+        self.name = name
+        self.fetch = fetch
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker()
+
+
 class DataAggregationService:
-    def __init__(self, maps_api_key, event_client, guide_client):
-        self.gmaps = googlemaps.Client(key=maps_api_key)
-        self.event = event_client
-        self.guide = guide_client
+    def __init__(self, maps_api_key, event_client, guide_client, places=None, sources=None, executor=None):
+        self.gmaps = traced(googlemaps.Client(key=maps_api_key), "maps")
+        self.places = places or PlacesService(self.gmaps)  # Cached text search + shared geo-index
+        self.event = traced(event_client, "events")
+        self.guide = traced(guide_client, "guides")
+        self.executor = executor or make_executor(max_workers=16, name="aggregation")
+        self.sources = [
+            Source("locations", self._fetch_locations, SOURCE_DEADLINES["locations"]),
+            Source("events", self.event.get_events, SOURCE_DEADLINES["events"]),  # Replace with actual event API integration
+            Source("guides", self.guide.get_guides, SOURCE_DEADLINES["guides"]),  # Replace with actual guide API integration
+        ]
+        for source in sources or []:
+            self.add_source(source)
+
+    def add_source(self, source):
+        """
+        Register another source (e.g. a tourism-board feed); its result appears under source.name.
+        """
+        if any(existing.name == source.name for existing in self.sources):
+            raise ValueError(f"Source '{source.name}' is already registered")
+        self.sources.append(source)
 
     def aggregate(self, preferences):
         """
-        Aggregate data for itinerary recommendations from Maps API, events, and guides.
+        Aggregate data for itinerary recommendations from Maps API, events, guides and any added sources.
+        All sources run concurrently; a source that errors, misses its deadline, or has an open
+        circuit contributes an empty list. result["sources"][name] holds its status
+        ("ok", "timeout", "error" or "circuit_open") and elapsed seconds.
         """
-        destination = preferences.get('destination', 'tourist attractions')
-        locations = self.gmaps.places(query=destination)
-        events = self.event.get_events(preferences)  # Replace with actual event API integration
-        guides = self.guide.get_guides(preferences)  # Replace with actual guide API integration
-        return {
-            "locations": locations.get('results', []),
-            "events": events,
-            "guides": guides
-        }
+        aggregated = {}
+        statuses = {}
+        stages = []
+        for source in self.sources:
+            aggregated[source.name] = []
+            if source.breaker.allow():
+                stages.append(Stage(source.name, source.fetch, preferences, timeout=source.deadline))
+            else:
+                statuses[source.name] = {"status": "circuit_open"}
+
+        result = fan_out(self.executor, stages)
+        for source in self.sources:
+            if source.name in statuses:
+                continue
+            elapsed = result.timings.get(source.name)
+            error = result.errors.get(source.name)
+            if error is None:
+                aggregated[source.name] = result.values[source.name]
+                source.breaker.record_success()
+                statuses[source.name] = {"status": "ok", "elapsed": elapsed}
+            else:
+                source.breaker.record_failure()
+                statuses[source.name] = {
+                    "status": "timeout" if isinstance(error, TimeoutError) else "error",
+                    "elapsed": elapsed,
+                    "error": repr(error),
+                }
+        aggregated["sources"] = {source.name: statuses[source.name] for source in self.sources}
+        return aggregated
+
+    def _fetch_locations(self, preferences):
+        # A list of its own: the cached results are shared
+        return list(self.places.search(preferences.get('destination', 'tourist attractions')))
@@ -0,0 +1,205 @@
+"""
+Personalized Trip Planner - Fan-out Helper
+
+Runs independent service calls concurrently on a thread pool (or, with afan_out(),
+on the event loop) with per-stage timeouts, and guards flaky dependencies with a
+circuit breaker.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from src.services.async_support import call
+from src.services.tracing import bind
+
+
+class Stage:
+    """
+    A single independent call to run as part of a fan-out.
+    """
+    __slots__ = ("args", "fn", "kwargs", "name", "required", "timeout")
+
+    def __init__(self, name, fn, *args, timeout=None, required=False, **kwargs):
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.timeout = timeout
+        self.required = required
+
+
+class StageError(Exception):
+    """
+    Raised when a required stage fails or misses its deadline.
+    """
+    def __init__(self, stage, cause):
+        super().__init__(f"Stage '{stage}' failed: {cause!r}")
+        self.stage = stage
+        self.cause = cause
+
+
+class FanOutResult:
+    """
+    Results of a fan-out: values of completed stages, errors of failed ones, and per-stage timings.
+    """
+    def __init__(self):
+        self.values = {}
+        self.errors = {}
+        self.timings = {}
+
+    @property
+    def degraded(self):
+        return sorted(self.errors)
+
+    def get(self, name, default=None):
+        return self.values.get(name, default)
+
+
+def fan_out(executor, stages):
+    """
+    Submit every stage to the executor at once and collect what finishes before its deadline.
+    Args:
+        executor (ThreadPoolExecutor): Pool to run the stages on.
+        stages (list[Stage]): Independent calls; each timeout is measured from submission.
+    Returns:
+        FanOutResult: Completed values plus errors (TimeoutError for late stages).
+    Raises:
+        StageError: If a stage marked as required fails or times out.
+    """
+    result = FanOutResult()
+    start = time.monotonic()
+    futures = {}
+    for stage in stages:
+        futures[stage.name] = (stage, executor.submit(bind(_timed), stage.fn, stage.args, stage.kwargs))
+
+    pending = {future for _, future in futures.values()}
+    for name, (stage, future) in sorted(futures.items(), key=lambda item: _deadline(item[1][0])):
+        if future in pending:
+            remaining = None if stage.timeout is None else max(0.0, start + stage.timeout - time.monotonic())
+            wait([future], timeout=remaining)
+        pending.discard(future)
+        if not future.done():
+            future.cancel()
+            result.errors[name] = TimeoutError(f"{name} exceeded {stage.timeout}s")
+            result.timings[name] = time.monotonic() - start
+        elif future.exception() is not None:
+            result.errors[name] = future.exception()
+            result.timings[name] = time.monotonic() - start
+        else:
+            value, elapsed = future.result()
+            result.values[name] = value
+            result.timings[name] = elapsed
+        if stage.required and name in result.errors:
+            raise StageError(name, result.errors[name])
+    return result
+
+
+async def afan_out(stages):
+    """
+    Async fan_out(): each stage is awaited through async_support.call(), so clients with
+    an async variant run on the event loop and the rest on the offload pool.
+    Args:
+        stages (list[Stage]): Independent calls; each timeout is measured from the start.
+    Returns:
+        FanOutResult: Completed values plus errors (TimeoutError for late stages).
+    Raises:
+        StageError: If a stage marked as required fails or times out; the other stages are cancelled.
+    """
+    result = FanOutResult()
+    start = time.monotonic()
+    tasks = {stage.name: (stage, asyncio.ensure_future(_atimed(stage.fn, stage.args, stage.kwargs))) for stage in stages}
+    try:
+        for name, (stage, task) in sorted(tasks.items(), key=lambda item: _deadline(item[1][0])):
+            remaining = None if stage.timeout is None else max(0.0, start + stage.timeout - time.monotonic())
+            done, _ = await asyncio.wait([task], timeout=remaining)
+            if not done:
+                task.cancel()
+                result.errors[name] = TimeoutError(f"{name} exceeded {stage.timeout}s")
+                result.timings[name] = time.monotonic() - start
+            elif task.exception() is not None:
+                result.errors[name] = task.exception()
+                result.timings[name] = time.monotonic() - start
+            else:
+                value, elapsed = task.result()
+                result.values[name] = value
+                result.timings[name] = elapsed
+            if stage.required and name in result.errors:
+                raise StageError(name, result.errors[name])
+    finally:
+        for _, task in tasks.values():
+            task.cancel()
+    return result
+
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency after repeated failures and probes it again after reset_timeout seconds.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        """
+        True if a call may go ahead; in the half-open state only one probe is let through.
+        """
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+def make_executor(max_workers=8, name="fanout"):
+    """
+    Create a bounded thread pool for fan-out calls.
+    """
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+
+def _deadline(stage):
+    return float("inf") if stage.timeout is None else stage.timeout
+
+
+def _timed(fn, args, kwargs):
+    start = time.monotonic()
+    value = fn(*args, **kwargs)
+    return value, time.monotonic() - start
+
+
+async def _atimed(fn, args, kwargs):
+    start = time.monotonic()
+    value = await call(fn, *args, **kwargs)
+    return value, time.monotonic() - start
@@ -0,0 +1,285 @@
+"""
+Personalized Trip Planner - Feedback Analytics
+
+Running aggregates over feedback as it is collected, so analytics never scan the
+feedback table. Every record() updates counts, a rating histogram, per-destination
+and per-feature rollups, and a HyperLogLog sketch of distinct users; snapshot()
+serves the current figures from memory. Rollups keep at most max_keys keys per
+dimension (the rest are counted under OTHER), so a snapshot has a bounded size.
+
+State is checkpointed to a local file on a schedule and restored on start, so a
+restart only loses the feedback received since the last checkpoint. Without a
+checkpoint the aggregates can be seeded once from the feedback table (seed()).
+
+The aggregates are per process: each worker counts the feedback it received
+itself, on top of the checkpoint or seed it started from. With several workers a
+snapshot covers only one of them; the BigQuery table (export_feedback) has it all.
+"""
+
+import hashlib
+import math
+import os
+import threading
+import time
+
+from src.services.codecs import blob_codec, decode_blob
+
+RATINGS = (1, 2, 3, 4, 5)
+# Rollup key for destinations/features beyond max_keys
+OTHER = "other"
+CHECKPOINT_VERSION = 1
+
+
+class HyperLogLog:
+    """
+    Approximate distinct counter: 2**precision one-byte registers,
+    standard error about 1.04 / sqrt(2**precision) (1.6% at the default 12).
+    """
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision=12, registers=None):
+        self.precision = precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(1 << precision)
+
+    def add(self, value):
+        digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest()
+        hashed = int.from_bytes(digest, "big")
+        index = hashed >> (64 - self.precision)
+        remaining = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            return round(m * math.log(m / zeros))
+        return round(estimate)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers, strict=True))
+
+
+class _Rollup:
+    __slots__ = ("count", "histogram", "rating_count", "rating_sum")
+
+    def __init__(self, count=0, rating_count=0, rating_sum=0.0, histogram=None):
+        self.count = count
+        self.rating_count = rating_count
+        self.rating_sum = rating_sum
+        self.histogram = histogram or [0] * len(RATINGS)
+
+    def add(self, rating, count=1):
+        self.count += count
+        if rating is not None:
+            self.rating_count += count
+            self.rating_sum += rating * count
+            self.histogram[rating - 1] += count
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "ratings": self.rating_count,
+            "average_rating": round(self.rating_sum / self.rating_count, 3) if self.rating_count else None,
+            "histogram": dict(zip(map(str, RATINGS), self.histogram, strict=True)),
+        }
+
+    def to_row(self):
+        return [self.count, self.rating_count, self.rating_sum, list(self.histogram)]
+
+
+class FeedbackAnalytics:
+    def __init__(self, checkpoint_path=None, checkpoint_interval=60.0, max_keys=1000, precision=12):
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.max_keys = max_keys
+        self.precision = precision
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._reset()
+        self._snapshot = None
+        self._snapshot_version = -1
+        self._checkpoint_version = 0
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            self.restore()
+
+    def record(self, user_id, feedback, when=None):
+        """
+        Fold one feedback entry into the aggregates.
+        Args:
+            user_id (str): Who sent the feedback.
+            feedback (dict | str): Feedback; 'rating' (1-5), 'destination' and
+                'feature'/'features' are aggregated when present.
+            when (float): Submission time (epoch seconds); defaults to now.
+        """
+        feedback = feedback if isinstance(feedback, dict) else {}
+        rating = _rating(feedback.get('rating'))
+        destination = feedback.get('destination')
+        features = feedback.get('features') or ([feedback['feature']] if feedback.get('feature') else [])
+        with self._lock:
+            self._version += 1
+            self._total.add(rating)
+            self._last_at = max(self._last_at or 0.0, when or time.time())
+            if user_id is not None:
+                self._users.add(user_id)
+            if destination:
+                self._rollup(self._destinations, str(destination).strip().lower()).add(rating)
+            for feature in features:
+                self._rollup(self._features, str(feature).strip().lower()).add(rating)
+
+    def seed(self, rows):
+        """
+        Fold pre-aggregated rows (see testing_feedback.ANALYTICS_SEED_SQL) into the aggregates.
+        Args:
+            rows: Dicts with 'dimension' ('total', 'destination', 'feature' or 'user'),
+                'key', 'rating', 'count' and 'last_at'.
+        """
+        with self._lock:
+            for row in rows:
+                dimension, key, count = row['dimension'], row.get('key'), row['count']
+                rating = _rating(row.get('rating'))
+                if dimension == "total":
+                    self._total.add(rating, count)
+                elif dimension == "destination":
+                    self._rollup(self._destinations, str(key).strip().lower()).add(rating, count)
+                elif dimension == "feature":
+                    self._rollup(self._features, str(key).strip().lower()).add(rating, count)
+                elif dimension == "user":
+                    self._users.add(key)
+                last_at = _epoch(row.get('last_at'))
+                if last_at is not None:
+                    self._last_at = max(self._last_at or 0.0, last_at)
+            self._version += 1
+
+    def is_empty(self):
+        """
+        True until feedback is recorded, seeded or restored from a checkpoint.
+        """
+        with self._lock:
+            return self._version == 0
+
+    def snapshot(self):
+        """
+        Current aggregates of this process; rebuilt only when feedback arrived since the last call.
+        """
+        with self._lock:
+            if self._snapshot_version != self._version:
+                self._snapshot = {
+                    **self._total.to_dict(),
+                    "distinct_users": self._users.count(),
+                    "last_feedback_at": self._last_at,
+                    "destinations": {key: rollup.to_dict() for key, rollup in self._destinations.items()},
+                    "features": {key: rollup.to_dict() for key, rollup in self._features.items()},
+                }
+                self._snapshot_version = self._version
+            return self._snapshot
+
+    # --- Checkpoints ---
+    def checkpoint(self):
+        """
+        Write the aggregates to checkpoint_path (atomically) if they changed since the last checkpoint.
+        """
+        if not self.checkpoint_path:
+            return False
+        with self._lock:
+            if self._version == self._checkpoint_version:
+                return False
+            version = self._version
+            state = [
+                CHECKPOINT_VERSION,
+                self._total.to_row(),
+                {key: rollup.to_row() for key, rollup in self._destinations.items()},
+                {key: rollup.to_row() for key, rollup in self._features.items()},
+                self._users.precision,
+                self._users.registers.hex(),
+                self._last_at,
+            ]
+        payload = blob_codec.encode(state)
+        directory = os.path.dirname(os.path.abspath(self.checkpoint_path))
+        os.makedirs(directory, exist_ok=True)
+        partial = f"{self.checkpoint_path}.tmp"
+        with open(partial, "wb") as handle:
+            handle.write(payload)
+        os.replace(partial, self.checkpoint_path)
+        with self._lock:
+            self._checkpoint_version = max(self._checkpoint_version, version)
+        return True
+
+    def restore(self):
+        """
+        Replace the aggregates with those in checkpoint_path.
+        """
+        with open(self.checkpoint_path, "rb") as handle:
+            state = decode_blob(handle.read())
+        if state[0] != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported feedback checkpoint version {state[0]}")
+        _, total, destinations, features, precision, registers, last_at = state
+        with self._lock:
+            self._total = _Rollup(*total)
+            self._destinations = {key: _Rollup(*row) for key, row in destinations.items()}
+            self._features = {key: _Rollup(*row) for key, row in features.items()}
+            self._users = HyperLogLog(precision, bytes.fromhex(registers))
+            self._last_at = last_at
+            self._version += 1
+            self._checkpoint_version = self._version
+
+    def start(self):
+        """
+        Start checkpointing every checkpoint_interval seconds.
+        """
+        if self._thread is not None or not self.checkpoint_path:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._checkpoint_loop, name="feedback-checkpoint", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the checkpoint thread and write a final checkpoint.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.checkpoint()
+
+    def _checkpoint_loop(self):
+        while not self._stop.wait(self.checkpoint_interval):
+            self.checkpoint()
+
+    def _reset(self):
+        self._version = 0
+        self._total = _Rollup()
+        self._destinations = {}
+        self._features = {}
+        self._users = HyperLogLog(self.precision)
+        self._last_at = None
+
+    def _rollup(self, rollups, key):
+        rollup = rollups.get(key)
+        if rollup is None:
+            if len(rollups) >= self.max_keys and key != OTHER:
+                return self._rollup(rollups, OTHER)
+            rollup = rollups[key] = _Rollup()
+        return rollup
+
+
+def _epoch(value):
+    if value is None:
+        return None
+    return value.timestamp() if hasattr(value, "timestamp") else float(value)
+
+
+def _rating(value):
+    try:
+        rating = round(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return min(max(rating, RATINGS[0]), RATINGS[-1])
@@ -0,0 +1,390 @@
+"""
+Personalized Trip Planner - Feedback Ingestion
+
+One buffered pipeline for incoming feedback. submit() appends the item to a local
+journal, puts it on a bounded queue and returns at once; when the queue is full
+it raises Backpressure rather than letting memory grow. A background thread
+drains the queue in micro-batches (max_batch items or flush_interval seconds)
+and hands each batch to every sink: BigQuery streaming inserts, Cloud Logging
+batch writes, and the feedback service (Firebase + running analytics).
+
+The journal makes accepted feedback survive a crash: items are fsynced to disk
+(group commit, so concurrent submits share one fsync) before submit() returns, the committed position is recorded once every sink has
+taken a batch (or, after max_retries, the batch has been parked in the
+dead-letter journal for that sink), and on start any items after that position
+are replayed and parked batches are offered to their sink again.
+"""
+
+import datetime
+import os
+import queue
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from src.services.codecs import blob_codec, decode_blob, dumps_json
+from src.services.tracing import annotate, span, traced
+
+FEEDBACK_ROWS_TABLE = "trip_planner_dataset.user_feedback"
+# Record header in the journal: payload length
+_RECORD = struct.Struct(">I")
+
+
+class Backpressure(Exception):
+    """
+    Raised by submit() when the ingestion queue is full.
+    """
+
+
+# --- Sinks: each takes a list of items ({'id', 'user_id', 'feedback', 'received_at', ...}) ---
+class BigQuerySink:
+    """
+    Streaming inserts of feedback rows; insert ids let BigQuery drop rows of a retried batch.
+    """
+    def __init__(self, bigquery_client, table=FEEDBACK_ROWS_TABLE):
+        self.bigquery = traced(bigquery_client, "bigquery")
+        self.table = table
+
+    def write(self, items):
+        rows = [{
+            'feedback_id': item['id'],
+            'user_id': item.get('user_id'),
+            'feedback': _feedback_text(item.get('feedback')),
+            'submitted_at': datetime.datetime.fromtimestamp(item['received_at'], datetime.timezone.utc).isoformat(),
+        } for item in items]
+        errors = self.bigquery.insert_rows_json(self.table, rows, row_ids=[row['feedback_id'] for row in rows])
+        if errors:
+            raise RuntimeError(f"BigQuery rejected {len(errors)} feedback rows: {errors[:3]}")
+
+
+class CloudLoggingSink:
+    """
+    Writes a batch as one Cloud Logging request (logger.batch()), or entry by entry
+    for loggers without batch support.
+    """
+    def __init__(self, logger, severity="INFO"):
+        self.logger = traced(logger, "cloud_logging")
+        self.severity = severity
+
+    def write(self, items):
+        batch = getattr(self.logger, 'batch', None)
+        if batch is None:
+            for item in items:
+                self.logger.log_struct(item.get('payload', item), severity=self.severity)
+            return
+        with batch() as entries:
+            for item in items:
+                entries.log_struct(item.get('payload', item), severity=self.severity)
+
+
+class FeedbackServiceSink:
+    """
+    Hands feedback to TestingFeedbackService.collect_feedback (Firebase write + analytics).
+    collect_feedback is not idempotent, so the ids of the last max_applied items are
+    remembered and a retried batch skips the items it already applied.
+    """
+    def __init__(self, feedback_service, max_applied=100_000):
+        self.feedback_service = feedback_service
+        self.max_applied = max_applied
+        self._applied = OrderedDict()
+        self._lock = threading.Lock()
+
+    def write(self, items):
+        for item in items:
+            with self._lock:
+                if item['id'] in self._applied:
+                    continue
+            self.feedback_service.collect_feedback(item.get('user_id'), item.get('feedback'))
+            with self._lock:
+                self._applied[item['id']] = None
+                if len(self._applied) > self.max_applied:
+                    self._applied.popitem(last=False)
+
+
+class Journal:
+    """
+    Append-only local log of submitted items plus the sequence number committed so far.
+    The log is truncated once everything in it has been committed and it exceeds max_bytes.
+    With fsync, sync() makes appended items durable with group commit: one fsync covers
+    every record written before it started, so concurrent writers share it.
+    """
+    def __init__(self, path, fsync=True, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.offset_path = f"{path}.committed"
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.committed = self._read_committed()
+        self.last_seq = max([self.committed] + [seq for seq, _ in self._records()])
+        self.synced = self.last_seq
+        self.syncs = 0
+        self._file = open(path, "ab")
+
+    def append(self, item):
+        """
+        Write item to the log (not yet fsynced; see sync()).
+        Returns:
+            int: Its sequence number.
+        """
+        with self._lock:
+            self.last_seq += 1
+            payload = blob_codec.encode([self.last_seq, item])
+            self._file.write(_RECORD.pack(len(payload)) + payload)
+            self._file.flush()
+            return self.last_seq
+
+    def sync(self, seq):
+        """
+        Block until the item with sequence number seq is on disk.
+        """
+        if not self.fsync:
+            return
+        with self._sync_lock:
+            # A writer that waited here usually finds its record synced by the one before
+            if self.synced >= seq:
+                return
+            with self._lock:
+                upto = self.last_seq
+                fileno = self._file.fileno()
+            os.fsync(fileno)
+            self.synced = upto
+            self.syncs += 1
+
+    def commit(self, seq):
+        """
+        Record that every item up to seq has been written; called by one thread at a time.
+        """
+        partial = f"{self.offset_path}.tmp"
+        with open(partial, "w") as handle:
+            handle.write(str(seq))
+            if self.fsync:
+                handle.flush()
+                os.fsync(handle.fileno())
+        os.replace(partial, self.offset_path)
+        with self._lock:
+            self.committed = max(self.committed, seq)
+            if self.committed == self.last_seq and self._file.tell() > self.max_bytes:
+                self._file.truncate(0)
+                self._file.seek(0)
+
+    def pending(self):
+        """
+        Items appended but not committed, in order, as (seq, item).
+        """
+        with self._lock:
+            self._file.flush()
+            committed = self.committed
+        return [(seq, item) for seq, item in self._records() if seq > committed]
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def _records(self):
+        try:
+            with open(self.path, "rb") as handle:
+                data = handle.read()
+        except FileNotFoundError:
+            return []
+        records, position = [], 0
+        while position + _RECORD.size <= len(data):
+            (length,) = _RECORD.unpack_from(data, position)
+            payload = data[position + _RECORD.size:position + _RECORD.size + length]
+            if len(payload) < length:
+                break  # Torn write at the end of the log
+            position += _RECORD.size + length
+            records.append(tuple(decode_blob(payload)))
+        return records
+
+    def _read_committed(self):
+        try:
+            with open(self.offset_path) as handle:
+                return int(handle.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+
+class FeedbackIngestion:
+    def __init__(self, sinks, max_queue=10_000, max_batch=500, flush_interval=0.2, journal=None,
+                 put_timeout=0.0, max_retries=3, retry_backoff=0.1, dead_letter_journal=None, max_dead_letters=1000):
+        self.sinks = list(sinks)
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.journal = journal
+        # Journal of [sink index, items] for batches a sink never accepted
+        self.dead_letter_journal = dead_letter_journal
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue = queue.Queue()
+        self._queued = 0  # Items accepted and not yet taken into a batch
+        self._lock = threading.Lock()
+        self._space = threading.Condition(self._lock)
+        self._append_lock = threading.Lock()  # Keeps queue order equal to journal order
+        self._drain_lock = threading.Lock()  # One batch in flight, so commits stay in order
+        self._stop = threading.Event()
+        self._thread = None
+        self.dead_letters = deque(maxlen=max_dead_letters)  # Most recent (sink, items, error) for inspection
+        self.stats = {"submitted": 0, "rejected": 0, "written": 0, "batches": 0, "retries": 0, "failed": 0, "replayed": 0}
+
+    def submit(self, user_id, feedback, payload=None):
+        """
+        Queue one feedback entry.
+        Args:
+            user_id (str): Who sent the feedback.
+            feedback (dict | str): The feedback itself.
+            payload (dict): Full request body, for the Cloud Logging entry.
+        Returns:
+            str: Feedback id (also the BigQuery insert id).
+        Raises:
+            Backpressure: If the queue stays full for put_timeout seconds.
+        """
+        item = {'id': uuid.uuid4().hex, 'user_id': user_id, 'feedback': feedback, 'received_at': time.time()}
+        if payload is not None:
+            item['payload'] = payload
+        with self._space:
+            # Space is reserved before journaling, so a rejected item is never replayed
+            if not self._space.wait_for(lambda: self._queued < self.max_queue, timeout=self.put_timeout):
+                self.stats["rejected"] += 1
+                raise Backpressure(f"Feedback queue is full ({self.max_queue} items)")
+            self._queued += 1
+            self.stats["submitted"] += 1
+        with self._append_lock:
+            seq = self.journal.append(item) if self.journal is not None else 0
+            self._queue.put((seq, item))
+        if self.journal is not None:
+            # Outside the append lock, so submitters waiting here share one fsync
+            self.journal.sync(seq)
+        return item['id']
+
+    def backlog(self):
+        with self._lock:
+            return self._queued
+
+    def start(self):
+        """
+        Replay journaled items that were never committed and retry parked dead letters,
+        then start the batching thread.
+        """
+        if self._thread is not None:
+            return
+        self.retry_dead_letters()
+        if self.journal is not None:
+            for seq, item in self.journal.pending():
+                self._queue.put((seq, item))
+                with self._lock:
+                    self._queued += 1
+                    self.stats["replayed"] += 1
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="feedback-ingestion", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop after writing everything still queued.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def retry_dead_letters(self):
+        """
+        Offer batches parked in the dead-letter journal to the sink that rejected them,
+        oldest first, stopping at the first one that fails again.
+        Returns:
+            int: Number of batches delivered.
+        """
+        if self.dead_letter_journal is None:
+            return 0
+        delivered = 0
+        for seq, (index, items) in self.dead_letter_journal.pending():
+            if index < len(self.sinks):
+                try:
+                    self.sinks[index].write(items)
+                except Exception:
+                    break
+                delivered += 1
+            self.dead_letter_journal.commit(seq)
+        return delivered
+
+    def flush(self):
+        """
+        Write everything queued so far on the calling thread.
+        """
+        while self._drain(block=False):
+            pass
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._drain(block=True)
+
+    def _drain(self, block):
+        with self._drain_lock:
+            batch = self._take(block)
+            if batch:
+                self._write(batch)
+            return bool(batch)
+
+    def _take(self, block):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval) if block else self._queue.get_nowait())
+        except queue.Empty:
+            return batch
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if block and remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        with self._space:
+            self._queued -= len(batch)
+            self._space.notify(len(batch))
+        return batch
+
+    def _write(self, batch):
+        items = [item for _, item in batch]
+        with span("feedback_ingestion.write", batch_size=len(items)):
+            retries = 0
+            for index, sink in enumerate(self.sinks):
+                delay = self.retry_backoff
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        sink.write(items)
+                        break
+                    except Exception as exc:
+                        if attempt == self.max_retries:
+                            with self._lock:
+                                self.stats["failed"] += len(items)
+                            self.dead_letters.append((sink, items, exc))
+                            if self.dead_letter_journal is not None:
+                                # Parked on disk before the batch is committed below, so it survives a restart
+                                self.dead_letter_journal.sync(self.dead_letter_journal.append([index, items]))
+                            annotate(error_type=type(exc).__name__)
+                            break
+                        retries += 1
+                        with self._lock:
+                            self.stats["retries"] += 1
+                        time.sleep(delay)
+                        delay *= 2
+            annotate(retry_count=retries)
+        with self._lock:
+            self.stats["written"] += len(items)
+            self.stats["batches"] += 1
+        if self.journal is not None:
+            self.journal.commit(max(seq for seq, _ in batch))
+
+
+def _feedback_text(value):
+    # Feedback column is a string; structured feedback is stored as compact JSON
+    if isinstance(value, str):
+        return value
+    return dumps_json(value).decode("utf-8")
@@ -0,0 +1,363 @@
+"""
+Personalized Trip Planner - Firebase Persistence Gateway
+
+Write-behind layer between the services and Firebase. Writes are queued and a
+background thread commits them in batches (one atomic Realtime Database
+multi-path update), flushing when max_batch writes are waiting or flush_interval
+seconds have passed. Every write has a deterministic path (appends get their key
+when queued), so a failed batch is put back at the head of the queue and retried
+after a backoff; the commit lock is not held while waiting, so other threads can
+still queue writes and read. Bookings and payments are durable: the call returns
+only once the batch holding them is committed. Reads of a path with a queued or
+in-flight write wait for it to commit (read-your-writes).
+
+The gateway exposes the same save_* methods as the Firebase client, so it can be
+passed to services in place of the client; reads pass straight through.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future
+
+from src.services.tracing import annotate, span
+
+try:
+    from firebase_admin import db as firebase_db
+except ImportError:
+    firebase_db = None
+
+
+class Write:
+    """
+    One queued write: set (replace), update (merge fields) or a keyed append.
+    method/args/kwargs let ClientMethodBackend replay it through the original client call.
+    """
+    __slots__ = ("applied", "args", "attempts", "data", "future", "kwargs", "method", "op", "path")
+
+    def __init__(self, path, op, data, method=None, args=(), kwargs=None):
+        self.path = path.strip("/")
+        self.op = op
+        self.data = data
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.future = Future()
+        self.attempts = 0
+        self.applied = False  # Already committed by a batch that failed later on
+
+    def updates(self):
+        """
+        Multi-path update entries for this write.
+        """
+        if self.op == "update":
+            return {f"{self.path}/{key}": value for key, value in self.data.items()}
+        return {self.path: self.data}
+
+
+class RealtimeDatabaseBackend:
+    """
+    Commits a batch as one atomic Realtime Database multi-path update.
+    """
+    def __init__(self, reference=None):
+        if reference is None:
+            if firebase_db is None:
+                raise ImportError("firebase_admin is required for RealtimeDatabaseBackend")
+            reference = firebase_db.reference("/")
+        self.reference = reference
+
+    def supports(self, write):
+        return True
+
+    def commit(self, writes):
+        updates = {}
+        for write in writes:
+            updates.update(write.updates())
+        self.reference.update(updates)
+
+
+class ClientMethodBackend:
+    """
+    Replays each write through the original client method, for clients without batch support.
+    Writes are applied one at a time, so a retried batch skips the writes it already
+    applied; appends pass the key chosen at queue time (e.g. save_feedback(..., key=...)),
+    so a client that writes under that key stays idempotent even when a call fails after
+    the server applied it. Raw set/update/push writes need RealtimeDatabaseBackend.
+    """
+    def __init__(self, client):
+        self.client = client
+
+    def commit(self, writes):
+        for write in writes:
+            if write.applied:
+                continue
+            getattr(self.client, write.method)(*write.args, **write.kwargs)
+            write.applied = True
+
+    def supports(self, write):
+        return write.method is not None
+
+
+class FirebaseGateway:
+    def __init__(self, firebase_client, backend=None, max_batch=500, flush_interval=0.05,
+                 max_retries=5, retry_backoff=0.1, durable_timeout=10.0, max_dead_letters=1000):
+        self.firebase = firebase_client
+        self.backend = backend or ClientMethodBackend(firebase_client)
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.durable_timeout = durable_timeout
+        self._queue = deque()
+        self._inflight = ()  # Batch being committed, no longer in the queue
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._commit_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._flush_now = False
+        self._retry_at = 0.0  # No commit before this time (monotonic) after a failed batch
+        self._delay = retry_backoff
+        self.dead_letters = deque(maxlen=max_dead_letters)  # Most recent writes that still failed after max_retries
+        self.stats = {"writes": 0, "batches": 0, "retries": 0, "failed": 0}
+
+    def __getattr__(self, name):
+        # Reads and anything not batched go straight to the client
+        if name == "firebase":
+            raise AttributeError(name)
+        return getattr(self.firebase, name)
+
+    # --- Client-compatible writes ---
+    def save_itinerary(self, user_id, itinerary, durable=False):
+        path = f"itineraries/{itinerary.get('id') or uuid.uuid4().hex}"
+        return self._submit(Write(path, "set", {**itinerary, 'user_id': user_id}, "save_itinerary", (user_id, itinerary)), durable)
+
+    def update_itinerary(self, itinerary_id, updates, durable=False):
+        return self._submit(Write(f"itineraries/{itinerary_id}", "update", updates, "update_itinerary", (itinerary_id, updates)), durable)
+
+    def get_itinerary(self, itinerary_id):
+        # Read-your-writes: commit anything queued for this itinerary first
+        if self._pending(f"itineraries/{itinerary_id}"):
+            self.flush()
+        return self.firebase.get_itinerary(itinerary_id)
+
+    def save_feedback(self, user_id, feedback, durable=False):
+        key = uuid.uuid4().hex
+        path = f"feedback/{user_id}/{key}"
+        return self._submit(Write(path, "set", feedback, "save_feedback", (user_id, feedback), {'key': key}), durable)
+
+    def save_user_profile(self, *args, durable=False):
+        # Called as (user_data) or (user_id, user_data)
+        user_data = args[-1]
+        user_id = args[0] if len(args) > 1 else user_data.get('user_id')
+        return self._submit(Write(f"users/{user_id}/profile", "set", user_data, "save_user_profile", args), durable)
+
+    def update_user_profile(self, user_id, updates, durable=False):
+        return self._submit(Write(f"users/{user_id}/profile", "update", updates, "update_user_profile", (user_id, updates)), durable)
+
+    def get_user_profile(self, user_id):
+        if self._pending(f"users/{user_id}/profile"):
+            self.flush()
+        return self.firebase.get_user_profile(user_id)
+
+    def save_booking_confirmation(self, itinerary_id, booking_confirmation, durable=True):
+        path = f"bookings/{itinerary_id}"
+        return self._submit(Write(path, "set", booking_confirmation, "save_booking_confirmation", (itinerary_id, booking_confirmation)), durable)
+
+    def save_booking_request(self, user_id, booking_details, durable=True):
+        """
+        Append a booking request under the user, keyed now so a retried batch cannot duplicate it.
+        Returns:
+            str: The new child key.
+        """
+        key = uuid.uuid4().hex
+        self._submit(Write(f"users/{user_id}/bookings/{key}", "set", booking_details, "save_booking_request", (user_id, key, booking_details)), durable)
+        return key
+
+    def save_payment_confirmation(self, user_id, payment_details, durable=True):
+        key = uuid.uuid4().hex
+        self._submit(Write(f"users/{user_id}/payments/{key}", "set", payment_details, "save_payment_confirmation", (user_id, key, payment_details)), durable)
+        return key
+
+    async def asave_booking_confirmation(self, itinerary_id, booking_confirmation, durable=True):
+        path = f"bookings/{itinerary_id}"
+        write = Write(path, "set", booking_confirmation, "save_booking_confirmation", (itinerary_id, booking_confirmation))
+        self._submit(write, durable=False)
+        if durable:
+            self._kick()
+            await asyncio.wait_for(asyncio.wrap_future(write.future), self.durable_timeout)
+        return True
+
+    # --- Generic writes ---
+    def set(self, path, data, durable=False):
+        return self._submit(Write(path, "set", data), durable)
+
+    def update(self, path, data, durable=False):
+        return self._submit(Write(path, "update", data), durable)
+
+    def push(self, path, data, durable=False):
+        """
+        Append under path with a key generated now, so a retried batch cannot duplicate it.
+        Returns:
+            str: The new child key.
+        """
+        key = uuid.uuid4().hex
+        self._submit(Write(f"{path.strip('/')}/{key}", "set", data), durable)
+        return key
+
+    # --- Lifecycle ---
+    def start(self):
+        """
+        Start the background flusher.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._flush_loop, name="firebase-write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the flusher after committing everything still queued.
+        """
+        self._stop.set()
+        with self._lock:
+            self._wakeup.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def flush(self):
+        """
+        Commit everything queued so far on the calling thread, waiting out retry backoffs.
+        """
+        while True:
+            wait = self._commit_next()
+            if wait is None:
+                return
+            if wait > 0:
+                # Outside the commit lock: a backoff does not block other writers or readers
+                time.sleep(wait)
+
+    def backlog(self):
+        with self._lock:
+            return len(self._queue)
+
+    def _submit(self, write, durable):
+        if not self.backend.supports(write):
+            raise TypeError(f"{type(self.backend).__name__} cannot replay a raw write to '{write.path}'")
+        with self._lock:
+            self._queue.append(write)
+            self.stats["writes"] += 1
+            if len(self._queue) >= self.max_batch:
+                self._wakeup.notify_all()
+        if self._thread is None:
+            # No flusher running: behave like a synchronous client
+            self.flush()
+        if durable:
+            # Commit now rather than waiting for the next flush tick
+            self.flush()
+            write.future.result(timeout=self.durable_timeout)
+        return True
+
+    def _pending(self, path):
+        # Queued or being committed: flush() takes the commit lock, so it also waits for an in-flight batch
+        with self._lock:
+            return any(
+                write.path == path or write.path.startswith(path + "/")
+                for writes in (self._queue, self._inflight) for write in writes
+            )
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            with self._lock:
+                if len(self._queue) < self.max_batch and not self._flush_now:
+                    self._wakeup.wait(self.flush_interval)
+                self._flush_now = False
+            self.flush()
+
+    def _kick(self):
+        # Ask the flusher to commit without waiting for the interval
+        with self._lock:
+            self._flush_now = True
+            self._wakeup.notify_all()
+
+    def _commit_next(self):
+        # Returns None when the queue is empty, else the seconds to wait before the next attempt
+        with self._commit_lock:
+            wait = self._retry_at - time.monotonic()
+            if wait > 0:
+                return wait
+            batch = self._take_batch()
+            if not batch:
+                return None
+            try:
+                with span("firebase.commit", batch_size=len(batch)):
+                    self._commit(batch)
+            finally:
+                with self._lock:
+                    self._inflight = ()
+            return 0
+
+    def _commit(self, batch):
+        # One attempt; a failed batch goes back to the head of the queue, so order is kept
+        try:
+            self.backend.commit(batch)
+        except Exception as exc:
+            for write in batch:
+                write.attempts += 1
+            attempts = max(write.attempts for write in batch)
+            annotate(retry_count=attempts)
+            if attempts > self.max_retries:
+                annotate(error_type=type(exc).__name__)
+                self.stats["failed"] += len(batch)
+                self.dead_letters.extend(batch)
+                self._retry_at, self._delay = 0.0, self.retry_backoff
+                for write in batch:
+                    write.future.set_exception(exc)
+                return
+            self.stats["retries"] += 1
+            with self._lock:
+                self._queue.extendleft(reversed(batch))
+            self._retry_at = time.monotonic() + self._delay
+            self._delay *= 2
+            return
+        self._retry_at, self._delay = 0.0, self.retry_backoff
+        self.stats["batches"] += 1
+        for write in batch:
+            write.future.set_result(True)
+
+    def _take_batch(self):
+        # A batch may not write both a path and one of its descendants, so it ends at the
+        # first conflicting write; a repeated set of the same path supersedes the queued one.
+        batch, paths, ancestors = [], {}, set()
+        with self._lock:
+            while self._queue and len(batch) < self.max_batch:
+                write = self._queue[0]
+                index = paths.get(write.path)
+                if index is not None and write.op == "set" and batch[index].op == "set":
+                    self._queue.popleft()
+                    superseded = batch[index]
+                    batch[index] = write
+                    write.future.add_done_callback(lambda done, old=superseded: _settle(old, done))
+                    continue
+                parts = write.path.split("/")
+                prefixes = ["/".join(parts[:i]) for i in range(1, len(parts))]
+                if index is not None or write.path in ancestors or any(prefix in paths for prefix in prefixes):
+                    break
+                self._queue.popleft()
+                paths[write.path] = len(batch)
+                ancestors.update(prefixes)
+                batch.append(write)
+            self._inflight = batch
+        return batch
+
+
+def _settle(write, done):
+    if done.exception() is not None:
+        write.future.set_exception(done.exception())
+    else:
+        write.future.set_result(True)
@@ -0,0 +1,27 @@
+from abc import ABC, abstractmethod
+
+
+class ArtifactStoreInterface(ABC):
+    """
+    Interface for static artifact storage (local directory, GCS bucket) served without the app.
+    """
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str, cache_control: str, etag: str) -> None:
+        """
+        Store data under key with the headers it should be served with.
+        """
+        pass
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """
+        Whether an artifact is stored under key.
+        """
+        pass
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """
+        Public URL of the artifact stored under key.
+        """
+        pass
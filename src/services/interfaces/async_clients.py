@@ -0,0 +1,104 @@
+
+from abc import ABC, abstractmethod
+
+
+class AsyncAIClient(ABC):
+    """
+    Async interface for Gemini/Vertex AI clients.
+    """
+    @abstractmethod
+    async def agenerate_itinerary(self, preferences: dict) -> dict:
+        """
+        Generate an itinerary for the given preferences.
+        """
+        pass
+
+    @abstractmethod
+    async def atranslate(self, text: str, target_language: str) -> str:
+        """
+        Translate the given text to the target language.
+        """
+        pass
+
+class AsyncMapsClient(ABC):
+    """
+    Async interface for Google Maps clients.
+    """
+    @abstractmethod
+    async def aplaces(self, query: str) -> dict:
+        """
+        Text search for places; returns the Places API response.
+        """
+        pass
+
+class AsyncBigQueryClient(ABC):
+    """
+    Async interface for BigQuery clients.
+    """
+    @abstractmethod
+    async def aquery(self, query: str, job_config=None) -> list:
+        """
+        Run a query and return its rows.
+        """
+        pass
+
+class AsyncFirebaseClient(ABC):
+    """
+    Async interface for the Firebase persistence client.
+    """
+    @abstractmethod
+    async def asave_itinerary(self, user_id: str, itinerary: dict) -> None:
+        """
+        Store an itinerary for a user.
+        """
+        pass
+
+    @abstractmethod
+    async def aget_cost_breakdown(self, itinerary_id: str) -> dict:
+        """
+        Retrieve the cost breakdown for an itinerary.
+        """
+        pass
+
+    @abstractmethod
+    async def agenerate_shareable_link(self, itinerary_id: str) -> str:
+        """
+        Create a shareable link for an itinerary.
+        """
+        pass
+
+    @abstractmethod
+    async def asave_feedback(self, user_id: str, feedback: dict) -> None:
+        """
+        Store user feedback.
+        """
+        pass
+
+    @abstractmethod
+    async def asave_booking_confirmation(self, itinerary_id: str, booking_confirmation: dict) -> None:
+        """
+        Store a booking confirmation.
+        """
+        pass
+
+class AsyncEMTClient(ABC):
+    """
+    Async interface for the EMT inventory client.
+    """
+    @abstractmethod
+    async def abook(self, itinerary_id: str, payment_info: dict) -> dict:
+        """
+        Book an itinerary against EMT inventory.
+        """
+        pass
+
+class AsyncPaymentClient(ABC):
+    """
+    Async interface for payment clients.
+    """
+    @abstractmethod
+    async def aprocess(self, payment_info: dict) -> dict:
+        """
+        Process a payment.
+        """
+        pass
@@ -0,0 +1,16 @@
+
+from abc import ABC, abstractmethod
+
+
+class ConditionsProviderInterface(ABC):
+    """
+    Interface for upstream weather/traffic providers behind the conditions cache.
+    """
+    @abstractmethod
+    def fetch(self, cell: str, point, hour: int) -> dict:
+        """
+        Conditions for a region cell during the hour starting at epoch seconds `hour`.
+        point is a (lat, lng) inside the cell, or None for a named region.
+        Returns {"weather": ..., "traffic": ..., "events": [...]}.
+        """
+        pass
@@ -11,3 +11,17 @@ class MultilingualSupportInterface(ABC):
         Translate the given text to the target language.
         """
         pass
+
+    @abstractmethod
+    def translate_many(self, texts: list, target_languages: list) -> dict:
+        """
+        Translate every text into every target language; returns language -> translations aligned with texts.
+        """
+        pass
+
+    @abstractmethod
+    async def atranslate(self, text: str, target_language: str) -> str:
+        """
+        Async variant of translate().
+        """
+        pass
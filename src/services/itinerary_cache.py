@@ -0,0 +1,263 @@
+"""
+Personalized Trip Planner - Itinerary Cache
+
+Caches base itineraries keyed on a canonical form of the trip preferences
+(destination, theme, budget bucket, duration) so near-identical requests skip the
+Gemini/Vertex AI call. Per-user details are applied afterwards by personalize().
+"""
+
+import decimal
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict
+
+from src.services.codecs import blob_codec, decode_blob
+
+# Upper bounds (INR) of the budget buckets; budgets above the last edge share one bucket
+BUDGET_BUCKETS = [2000, 5000, 10000, 15000, 20000, 30000, 50000, 75000, 100000, 150000, 250000]
+
+
+def budget_bucket(budget) -> int:
+    """
+    Round a budget up to the nearest bucket edge.
+    Args:
+        budget: Budget in INR (number or numeric string); missing/invalid counts as 0.
+    Returns:
+        int: The bucket's upper bound, or -1 for budgets above the largest bucket.
+    """
+    try:
+        amount = float(budget or 0)
+    except (TypeError, ValueError):
+        amount = 0.0
+    index = bisect_left(BUDGET_BUCKETS, amount)
+    return BUDGET_BUCKETS[index] if index < len(BUDGET_BUCKETS) else -1
+
+
+def row_budget(row):
+    """
+    Budget of a recommendations row.
+    BigQuery NUMERIC columns arrive as Decimal, and cached rows carry them as the
+    strings the blob codec wrote, so numbers and numeric strings both count.
+    Args:
+        row (dict): Recommendations row.
+    Returns:
+        Decimal: The row's budget, or None if it has none.
+    """
+    value = row.get('budget')
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        amount = decimal.Decimal(str(value).strip())
+    except decimal.InvalidOperation:
+        return None
+    return amount if amount.is_finite() else None
+
+
+def _normalize_text(value) -> str:
+    if isinstance(value, (list, tuple, set)):
+        return ",".join(sorted(_normalize_text(v) for v in value))
+    return " ".join(str(value or "").lower().split())
+
+
+def cache_key(preferences: dict) -> str:
+    """
+    Canonical cache key for a preferences dict.
+    Args:
+        preferences (dict): Trip preferences (destination, theme, budget, duration/days).
+    Returns:
+        str: Key such as "jaipur|heritage|20000|3".
+    """
+    duration = preferences.get('duration', preferences.get('days', 0))
+    try:
+        duration = int(duration or 0)
+    except (TypeError, ValueError):
+        duration = 0
+    return "|".join([
+        _normalize_text(preferences.get('destination')),
+        _normalize_text(preferences.get('theme')),
+        str(budget_bucket(preferences.get('budget'))),
+        str(duration),
+    ])
+
+
+def personalize(base: dict, user_id, preferences: dict) -> dict:
+    """
+    Apply per-user details to a cached base itinerary without another model call.
+    Args:
+        base (dict): Base itinerary from the cache (not modified).
+        user_id: The requesting user's ID.
+        preferences (dict): The user's exact preferences.
+    Returns:
+        dict: A new itinerary with its own id, the user's preferences, and
+        recommendations trimmed to the user's exact budget.
+    """
+    itinerary = dict(base)
+    itinerary['id'] = uuid.uuid4().hex
+    itinerary['user_id'] = user_id
+    itinerary['preferences'] = preferences
+    limit = row_budget(preferences)
+    if limit is not None and itinerary.get('analytics'):
+        itinerary['analytics'] = [
+            row for row in itinerary['analytics']
+            if (budget := row_budget(row)) is None or budget <= limit
+        ]
+    return itinerary
+
+
+class DiskBackend:
+    """
+    SQLite-backed store for cached itineraries that survives restarts.
+    """
+    def __init__(self, path, max_bytes=512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS itineraries ("
+            "key TEXT PRIMARY KEY, expires REAL, accessed REAL, size INTEGER, value BLOB)"
+        )
+        self._db.commit()
+
+    def get(self, key):
+        """
+        Return (expires, value) for a live entry, or None.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT expires, value FROM itineraries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[0] <= now:
+                self._db.execute("DELETE FROM itineraries WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE itineraries SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return row[0], bytes(row[1])
+
+    def put(self, key, expires, value):
+        """
+        Store an entry, evicting least recently used rows beyond max_bytes.
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO itineraries VALUES (?, ?, ?, ?, ?)",
+                (key, expires, time.time(), len(value), value),
+            )
+            self._db.execute("DELETE FROM itineraries WHERE expires <= ?", (time.time(),))
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM itineraries").fetchone()[0]
+            if total > self.max_bytes:
+                rows = self._db.execute(
+                    "SELECT key, size FROM itineraries ORDER BY accessed"
+                ).fetchall()
+                for old_key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    self._db.execute("DELETE FROM itineraries WHERE key = ?", (old_key,))
+                    total -= size
+            self._db.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM itineraries WHERE key = ?", (key,))
+            self._db.commit()
+
+
+class ItineraryCache:
+    """
+    In-memory LRU cache with TTL and a byte budget, optionally backed by a DiskBackend.
+    Entries are stored serialized, so every get() returns a fresh copy.
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=6 * 3600, backend=None, codec=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.backend = backend
+        self.codec = codec or blob_codec  # Compressed msgpack; JSON entries from older versions still decode
+        self._entries = OrderedDict()  # key -> (expires, value bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Return the cached itinerary for key, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return decode_blob(entry[1])
+        if self.backend is not None:
+            stored = self.backend.get(key)
+            if stored is not None:
+                with self._lock:
+                    self._insert(key, *stored)
+                    self.hits += 1
+                return decode_blob(stored[1])
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, itinerary):
+        """
+        Cache an itinerary under key.
+        """
+        value = self.codec.encode(itinerary)
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._insert(key, expires, value)
+        if self.backend is not None:
+            self.backend.put(key, expires, value)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._remove(key)
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def stats(self):
+        """
+        Hit/miss counters and current memory usage.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _insert(self, key, expires, value):
+        if len(value) > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (expires, value)
+        self._bytes += len(value)
+        while self._bytes > self.max_bytes:
+            old_key, _ = next(iter(self._entries.items()))
+            self._remove(old_key)
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
@@ -1,13 +1,6 @@
 """
 Personalized Trip Planner - Itinerary Generator
 
-Use Gemini/Vertex AI for itinerary generation and recommendations. Store itineraries in Firebase. Use BigQuery for analytics. Remove references to other engines or external sources.
-"""
-
-
-"""
-Personalized Trip Planner - Itinerary Generator
-
 Use Gemini/Vertex AI for itinerary generation and recommendations. Store itineraries in Firebase. Use BigQuery for analytics. Remove references to other engines or external sources.
 
 Solution Structure:
@@ -45,57 +38,289 @@ Solution Structure:
 """
 
 
+import time
+from concurrent.futures import wait
+
 import googlemaps
-from google.cloud import bigquery
+
+from src.services.async_support import call
+from src.services.fanout import Stage, afan_out, fan_out, make_executor
+from src.services.itinerary_cache import budget_bucket, cache_key, personalize
+from src.services.itinerary_model import compact_places
+from src.services.places_index import PlacesService
+from src.services.realtime_adjustments import (
+	apply_patch,
+	fetch_conditions_from_maps_api,
+	firebase_updates,
+	is_indoor,
+	replan_for_conditions,
+)
+from src.services.recommendations_repository import RecommendationsRepository
+from src.services.route_optimizer import DistanceMatrixCache, plan_day
+from src.services.tracing import annotate, bind, instrument, traced
+
+# Per-stage deadlines (seconds) for the concurrent generation path
+STAGE_TIMEOUTS = {"ai": 30.0, "maps": 5.0, "analytics": 5.0}
+# Itinerary field -> stage that fills it
+ENRICHMENT_STAGES = {"locations": "maps", "analytics": "analytics"}
 
 class ItineraryGenerator:
-	def __init__(self, ai_client, maps_api_key, bigquery_client, firebase_client):
-		self.ai = ai_client  # Gemini/Vertex AI client
-		self.gmaps = googlemaps.Client(key=maps_api_key)
-		self.bigquery = bigquery_client
-		self.firebase = firebase_client
+	def __init__(self, ai_client, maps_api_key, bigquery_client, firebase_client, maps_client=None, executor=None, stage_timeouts=None, cache=None, recommendations=None, places=None, distances=None, monitor=None, on_update=None):
+		self.ai = traced(ai_client, "gemini")  # Gemini/Vertex AI client
+		self.gmaps = traced(maps_client or googlemaps.Client(key=maps_api_key), "maps")
+		self.places = places or PlacesService(self.gmaps)  # Cached text search + shared geo-index
+		# Travel times for route planning; Haversine estimates unless given a Maps-backed cache
+		self.distances = distances or DistanceMatrixCache()
+		self.bigquery = traced(bigquery_client, "bigquery")
+		self.recommendations = recommendations or RecommendationsRepository(bigquery_client)
+		self.firebase = traced(firebase_client, "firebase")
+		self.executor = executor or make_executor(name="itinerary")
+		self.stage_timeouts = {**STAGE_TIMEOUTS, **(stage_timeouts or {})}
+		self.cache = cache  # Optional ItineraryCache keyed on normalized preferences
+		self.monitor = monitor  # Optional ConditionMonitor that keeps saved itineraries up to date
+		self.on_update = on_update  # Optional callback(itinerary) after an itinerary is saved or adjusted
 
-	def generate(self, user_id, preferences):
+	@instrument("itinerary.generate")
+	def generate(self, user_id, preferences, parallel=True):
 		"""
 		Generate a personalized itinerary:
 		- Use Gemini/Vertex AI to analyze preferences and suggest activities/accommodations.
 		- Use Google Maps API for location, routes, and attractions.
 		- Use BigQuery for analytics and optimization.
 		- Store itinerary in Firebase.
+		With parallel=True the AI, Maps and BigQuery stages run concurrently; a Maps or
+		BigQuery stage that fails or times out degrades to an empty list and is listed
+		under itinerary['degraded'].
+		If a cache is configured, a base itinerary for the same destination, theme,
+		budget bucket and duration is reused and only personalized for this user.
+		"""
+		if self.cache is None:
+			itinerary = self._build(preferences, parallel)
+		else:
+			key = cache_key(preferences)
+			base = self.cache.get(key)
+			annotate(cache_hit=base is not None)
+			if base is None:
+				base = self._build(self._base_preferences(preferences), parallel)
+				if not base.get('degraded'):
+					self.cache.put(key, base)
+			itinerary = personalize(base, user_id, preferences)
+
+		self.firebase.save_itinerary(user_id, itinerary)
+		self._track(itinerary)
+		return itinerary
+
+	@instrument("itinerary.generate")
+	async def agenerate(self, user_id, preferences):
+		"""
+		Async variant of generate() for the event loop: the AI, Maps and BigQuery stages
+		run concurrently as coroutines with the same deadlines and degradation. Each client
+		is awaited natively when it implements the async interfaces
+		(interfaces/async_clients.py), and on the offload pool otherwise.
+		"""
+		if self.cache is None:
+			itinerary = await self._abuild(preferences)
+		else:
+			key = cache_key(preferences)
+			base = self.cache.get(key)
+			annotate(cache_hit=base is not None)
+			if base is None:
+				base = await self._abuild(self._base_preferences(preferences))
+				if not base.get('degraded'):
+					self.cache.put(key, base)
+			itinerary = personalize(base, user_id, preferences)
+
+		await call(self.firebase.save_itinerary, user_id, itinerary)
+		self._track(itinerary)
+		return itinerary
+
+	def generate_stream(self, user_id, preferences):
+		"""
+		Generate an itinerary as a stream of events, for clients that render it progressively:
+		- {"event": "day", "index": i, "day": {...}} for each day as the AI produces it.
+		- {"event": "patch", "op": "add", "path": "/locations" | "/analytics", "value": [...]}
+			as Maps and BigQuery enrichment complete.
+		- {"event": "degraded", "stages": [...]} if an enrichment stage failed or timed out.
+		- {"event": "done", "itinerary": {...}} once the itinerary is stored in Firebase.
+		- {"event": "error", "stage": "ai", "error": "..."} instead of "done" if the AI stage
+			fails mid-stream; the days sent so far are then void and nothing is stored.
+		The AI client may provide stream_itinerary(preferences), yielding {"day": ...} chunks
+		and top-level fields (e.g. summary), as AgentClient (agent_client.py) does for the
+		trip planner agent; otherwise generate_itinerary() is used, and the first day is only
+		sent once the whole itinerary has been generated.
 		"""
+		start = time.monotonic()
+		key = cache_key(preferences) if self.cache is not None else None
+		base = self.cache.get(key) if key is not None else None
+		if base is not None:
+			itinerary = personalize(base, user_id, preferences)
+			for index, day in enumerate(itinerary.get('details', [])):
+				yield {"event": "day", "index": index, "day": day}
+			for field in ('locations', 'analytics', 'route'):
+				yield {"event": "patch", "op": "add", "path": f"/{field}", "value": itinerary.get(field, [])}
+		else:
+			build_preferences = self._base_preferences(preferences) if key is not None else preferences
+			enrichment = {
+				'locations': (self.executor.submit(bind(self._fetch_locations), build_preferences), self.stage_timeouts["maps"]),
+				'analytics': (self.executor.submit(bind(self._fetch_analytics), build_preferences), self.stage_timeouts["analytics"]),
+			}
+			itinerary = {'details': []}
+			try:
+				for chunk in self._stream_ai(build_preferences):
+					if 'day' in chunk:
+						itinerary['details'].append(chunk['day'])
+						yield {"event": "day", "index": len(itinerary['details']) - 1, "day": chunk['day']}
+					else:
+						itinerary.update(chunk)
+					yield from self._ready_patches(enrichment, itinerary)
+			except Exception as exc:
+				# The response has started, so the failure is reported in-band rather than as a status code
+				for future, _ in enrichment.values():
+					future.cancel()
+				annotate(error_type=type(exc).__name__)
+				yield {"event": "error", "stage": "ai", "error": f"Itinerary generation failed: {type(exc).__name__}"}
+				return
+			for future, timeout in list(enrichment.values()):
+				wait([future], timeout=max(0.0, start + timeout - time.monotonic()))
+			yield from self._ready_patches(enrichment, itinerary)
+			for field, (future, _) in enrichment.items():
+				# Still running past its deadline
+				future.cancel()
+				itinerary[field] = []
+				itinerary.setdefault('degraded', []).append(ENRICHMENT_STAGES[field])
+			if itinerary.get('degraded'):
+				itinerary['degraded'].sort()
+				yield {"event": "degraded", "stages": itinerary['degraded']}
+			itinerary['route'] = self._plan_route(itinerary['locations'])
+			yield {"event": "patch", "op": "add", "path": "/route", "value": itinerary['route']}
+			if key is not None:
+				if not itinerary.get('degraded'):
+					self.cache.put(key, itinerary)
+				itinerary = personalize(itinerary, user_id, preferences)
+
+		self.firebase.save_itinerary(user_id, itinerary)
+		self._track(itinerary)
+		yield {"event": "done", "itinerary": {k: v for k, v in itinerary.items() if k not in ('details', 'locations', 'analytics', 'route')}}
+
+	def _track(self, itinerary):
+		if self.monitor is not None and itinerary.get('id'):
+			self.monitor.track(itinerary['id'], itinerary)
+		if self.on_update is not None:
+			self.on_update(itinerary)
+
+	def _stream_ai(self, preferences):
+		stream = getattr(self.ai, 'stream_itinerary', None)
+		if stream is not None:
+			yield from stream(preferences)
+			return
+		itinerary = self.ai.generate_itinerary(preferences)
+		yield {k: v for k, v in itinerary.items() if k != 'details'}
+		for day in itinerary.get('details', []):
+			yield {'day': day}
+
+	def _ready_patches(self, enrichment, itinerary):
+		for field, (future, _) in list(enrichment.items()):
+			if not future.done():
+				continue
+			del enrichment[field]
+			if future.exception() is None:
+				itinerary[field] = future.result()
+				yield {"event": "patch", "op": "add", "path": f"/{field}", "value": itinerary[field]}
+			else:
+				itinerary[field] = []
+				itinerary.setdefault('degraded', []).append(ENRICHMENT_STAGES[field])
+
+	def _base_preferences(self, preferences):
+		# Build the shared base at the bucket's upper bound; personalize() trims to the exact budget
+		bucket = budget_bucket(preferences.get('budget'))
+		return {**preferences, 'budget': bucket} if bucket > 0 else preferences
+
+	def _build(self, preferences, parallel):
+		if not parallel:
+			return self._build_sequential(preferences)
+
+		result = fan_out(self.executor, [
+			Stage("ai", self.ai.generate_itinerary, preferences, timeout=self.stage_timeouts["ai"], required=True),
+			Stage("maps", self._fetch_locations, preferences, timeout=self.stage_timeouts["maps"]),
+			Stage("analytics", self._fetch_analytics, preferences, timeout=self.stage_timeouts["analytics"]),
+		])
+		return self._assemble(result)
+
+	async def _abuild(self, preferences):
+		result = await afan_out([
+			Stage("ai", self.ai.generate_itinerary, preferences, timeout=self.stage_timeouts["ai"], required=True),
+			Stage("maps", self._afetch_locations, preferences, timeout=self.stage_timeouts["maps"]),
+			Stage("analytics", self._afetch_analytics, preferences, timeout=self.stage_timeouts["analytics"]),
+		])
+		return self._assemble(result)
+
+	def _assemble(self, result):
+		itinerary = result.values["ai"]
+		itinerary['locations'] = result.get("maps", [])
+		itinerary['analytics'] = result.get("analytics", [])
+		if result.degraded:
+			itinerary['degraded'] = result.degraded
+		itinerary['route'] = self._plan_route(itinerary['locations'])
+		return itinerary
+
+	def _build_sequential(self, preferences):
 		# 1. AI recommendation
 		itinerary = self.ai.generate_itinerary(preferences)  # Placeholder for Gemini/Vertex AI call
 
 		# 2. Enrich with Maps API
-		locations = self.gmaps.places(query=preferences.get('destination', 'tourist attractions'))
-		itinerary['locations'] = locations.get('results', [])
+		itinerary['locations'] = self._fetch_locations(preferences)
 
 		# 3. Optimize with BigQuery
-		query = f"""
-			SELECT * FROM `your_project.your_dataset.recommendations`
-			WHERE budget <= {preferences.get('budget', 0)}
-			AND theme = '{preferences.get('theme', '')}'
-			LIMIT 10
-		"""
-		results = self.bigquery.query(query)
-		itinerary['analytics'] = [dict(row) for row in results]
+		itinerary['analytics'] = self._fetch_analytics(preferences)
 
-		# 4. Store in Firebase
-		self.firebase.save_itinerary(user_id, itinerary)
+		# 4. Order the stops to minimise travel within opening hours
+		itinerary['route'] = self._plan_route(itinerary['locations'])
 
 		return itinerary
 
-	def adjust_realtime(self, itinerary_id):
+	def _fetch_locations(self, preferences):
+		# Keep only the Maps fields the itinerary uses (id, name, location, types, hours, rating, address)
+		return compact_places(self.places.search(preferences.get('destination', 'tourist attractions')))
+
+	async def _afetch_locations(self, preferences):
+		return compact_places(await call(self.places.search, preferences.get('destination', 'tourist attractions')))
+
+	def _plan_route(self, locations):
+		plan = plan_day(locations, distance_cache=self.distances)
+		return {
+			'stops': [
+				{
+					'place_id': stop.get('place_id'), 'name': stop.get('name'), 'indoor': is_indoor(stop),
+					'arrival': stop['arrival'], 'departure': stop['departure'],
+					'travel': stop['travel'], 'closes': stop['closes'],
+				}
+				for stop in plan['stops']
+			],
+			'dropped': [stop.get('place_id') or stop.get('name') for stop in plan['dropped']],
+			'travel_minutes': plan['travel_minutes'],
+		}
+
+	def _fetch_analytics(self, preferences):
+		return self.recommendations.lookup(preferences.get('theme', ''), preferences.get('budget', 0))
+
+	async def _afetch_analytics(self, preferences):
+		return await call(self.recommendations.lookup, preferences.get('theme', ''), preferences.get('budget', 0))
+
+	def adjust_realtime(self, itinerary_id, conditions=None):
 		"""
 		Adjust itinerary in real time using weather, traffic, and events.
+		Only the time slots affected by a change in conditions are re-planned, and only
+		the changed paths (and a bumped 'version') are written back to Firebase;
+		unchanged conditions write nothing.
 		"""
 		itinerary = self.firebase.get_itinerary(itinerary_id)
-		# Example: Check weather and update activities
-		destination = itinerary.get('destination')
-		# Placeholder for weather API integration
-		weather = {}  # Replace with actual weather API call
-		if weather.get('main') == 'Rain':
-			itinerary['activities'] = [a for a in itinerary['activities'] if a.get('type') == 'indoor']
-		self.firebase.update_itinerary(itinerary_id, itinerary)
+		if conditions is None:
+			conditions = fetch_conditions_from_maps_api(itinerary)
+		patch = replan_for_conditions(itinerary, conditions)
+		if patch:
+			apply_patch(itinerary, patch)
+			itinerary['version'] = (itinerary.get('version') or 0) + 1
+			self.firebase.update_itinerary(itinerary_id, {**firebase_updates(patch, itinerary), 'version': itinerary['version']})
+			if self.on_update is not None:
+				self.on_update({**itinerary, 'id': itinerary_id})
 		return itinerary
-
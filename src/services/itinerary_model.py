@@ -0,0 +1,290 @@
+"""
+Personalized Trip Planner - Itinerary Model
+
+Typed, compact form of an itinerary: slotted dataclasses for Itinerary, Day,
+Activity, Place and the planned Route. Maps and AI payloads are converted here,
+in one place, keeping only the fields the services use. Models serialise to a
+dict / JSON for APIs and to a positional row (no field names) written as an
+uncompressed blob (msgpack when it is installed, compact JSON otherwise) by the
+codec layer, which also encodes values such as the Decimal budgets of BigQuery rows.
+"""
+
+from dataclasses import dataclass
+from typing import ClassVar
+
+from src.services.codecs import BlobCodec, decode_blob, dumps_json
+
+# Rows are small and read often, so they are not compressed
+ROW_CODEC = BlobCodec(compression="none")
+
+
+class _Model:
+    """
+    Shared (de)serialisation for the model dataclasses. NESTED maps a field to the
+    model class of its value; the value is a tuple of models unless the field is in SINGLE.
+    """
+    __slots__ = ()
+    NESTED: ClassVar[dict] = {}
+    SINGLE: ClassVar[frozenset] = frozenset()
+
+    def to_dict(self):
+        """
+        Plain dict with unset (None / empty) fields left out.
+        """
+        data = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if value is None or value == ():
+                continue
+            if isinstance(value, _Model):
+                value = value.to_dict()
+            elif isinstance(value, tuple):
+                value = [item.to_dict() if isinstance(item, _Model) else item for item in value]
+            data[name] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        kwargs = {}
+        for name in cls.__slots__:
+            if name not in data:
+                continue
+            value = data[name]
+            nested = cls.NESTED.get(name)
+            if nested is not None and value is not None:
+                value = nested.from_dict(value) if isinstance(value, dict) else tuple(nested.from_dict(item) for item in value)
+            elif isinstance(value, list):
+                value = tuple(value)
+            kwargs[name] = value
+        return cls(**kwargs)
+
+    def to_row(self):
+        """
+        Positional form: field values in declaration order, nested models as rows.
+        """
+        row = []
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if isinstance(value, _Model):
+                value = value.to_row()
+            elif isinstance(value, tuple):
+                value = [item.to_row() if isinstance(item, _Model) else item for item in value]
+            row.append(value)
+        return row
+
+    @classmethod
+    def from_row(cls, row):
+        kwargs = {}
+        # A row written before a field was added is shorter: the missing fields keep their defaults
+        for name, value in zip(cls.__slots__, row, strict=False):
+            nested = cls.NESTED.get(name)
+            if nested is not None and value is not None:
+                value = nested.from_row(value) if name in cls.SINGLE else tuple(nested.from_row(item) for item in value)
+            elif isinstance(value, list):
+                value = tuple(value)
+            kwargs[name] = value
+        return cls(**kwargs)
+
+    def to_json(self):
+        return dumps_json(self.to_dict()).decode("utf-8")
+
+    def to_bytes(self):
+        """
+        Binary encoding of the positional form (msgpack, or compact JSON without it).
+        """
+        return ROW_CODEC.encode(self.to_row())
+
+    @classmethod
+    def from_bytes(cls, payload):
+        return cls.from_row(decode_blob(payload))
+
+
+@dataclass(slots=True)
+class Place(_Model):
+    """
+    A Maps place, reduced to the fields used for routing, display and weather checks.
+    """
+    place_id: str = None
+    name: str = None
+    lat: float = None
+    lng: float = None
+    address: str = None
+    rating: float = None
+    price_level: int = None
+    types: tuple = ()
+    window: tuple = None  # (open, close) minutes after midnight
+
+    @classmethod
+    def from_maps(cls, result):
+        """
+        Convert a Places API result.
+        """
+        location = (result.get('geometry') or {}).get('location') or {}
+        periods = (result.get('opening_hours') or {}).get('periods') or []
+        window = result.get('window')
+        if window is None and periods and 'open' in periods[0] and 'close' in periods[0]:
+            opens = _hhmm(periods[0]['open'].get('time', '0000'))
+            closes = _hhmm(periods[0]['close'].get('time', '2359'))
+            window = (opens, closes if closes > opens else 24 * 60)
+        return cls(
+            place_id=result.get('place_id'),
+            name=result.get('name'),
+            lat=location.get('lat'),
+            lng=location.get('lng'),
+            address=result.get('address') or result.get('formatted_address') or result.get('vicinity'),
+            rating=result.get('rating'),
+            price_level=result.get('price_level'),
+            types=tuple(result.get('types') or ()),
+            window=tuple(window) if window else None,
+        )
+
+    def to_maps(self):
+        """
+        Maps-shaped dict (geometry.location, types, window) for code that reads Places results.
+        """
+        place = {'place_id': self.place_id, 'name': self.name, 'types': list(self.types)}
+        if self.lat is not None and self.lng is not None:
+            place['geometry'] = {'location': {'lat': self.lat, 'lng': self.lng}}
+        for field in ('address', 'rating', 'price_level', 'window'):
+            value = getattr(self, field)
+            if value is not None:
+                place[field] = list(value) if field == 'window' else value
+        return place
+
+
+@dataclass(slots=True)
+class Activity(_Model):
+    name: str = None
+    place_id: str = None
+    start: float = None  # minutes after midnight
+    end: float = None
+    type: str = None  # 'indoor' / 'outdoor'
+    cost: float = None
+    description: str = None
+
+    @classmethod
+    def from_ai(cls, data):
+        """
+        Convert an AI activity; times may be minutes or "HH:MM".
+        """
+        return cls(
+            name=data.get('name') or data.get('title'),
+            place_id=data.get('place_id'),
+            start=_clock(data.get('start', data.get('start_time'))),
+            end=_clock(data.get('end', data.get('end_time'))),
+            type=data.get('type'),
+            cost=data.get('cost'),
+            description=data.get('description'),
+        )
+
+
+@dataclass(slots=True)
+class Day(_Model):
+    index: int = 0
+    date: str = None
+    title: str = None
+    activities: tuple = ()
+
+    @classmethod
+    def from_ai(cls, index, data):
+        return cls(
+            index=index,
+            date=data.get('date'),
+            title=data.get('title') or data.get('theme'),
+            activities=tuple(Activity.from_ai(activity) for activity in data.get('activities') or ()),
+        )
+
+
+@dataclass(slots=True)
+class RouteStop(_Model):
+    place_id: str = None
+    name: str = None
+    indoor: bool = False
+    arrival: float = None
+    departure: float = None
+    travel: float = None
+    closes: float = None
+    replaces: str = None
+
+
+@dataclass(slots=True)
+class Route(_Model):
+    stops: tuple = ()
+    dropped: tuple = ()
+    travel_minutes: float = 0.0
+
+
+@dataclass(slots=True)
+class Itinerary(_Model):
+    id: str = None
+    user_id: str = None
+    destination: str = None
+    summary: str = None
+    days: tuple = ()
+    locations: tuple = ()
+    analytics: tuple = ()  # BigQuery recommendation rows
+    route: Route = None
+    preferences: dict = None
+    degraded: tuple = ()
+    conditions: dict = None
+    adjusted: bool = None
+
+    @classmethod
+    def from_payload(cls, itinerary):
+        """
+        Convert the dict built by ItineraryGenerator: AI output ('summary', 'details'
+        days), Maps 'locations', BigQuery 'analytics' and the planned 'route'.
+        """
+        route = itinerary.get('route')
+        return cls(
+            id=itinerary.get('id'),
+            user_id=itinerary.get('user_id'),
+            destination=itinerary.get('destination') or (itinerary.get('preferences') or {}).get('destination'),
+            summary=itinerary.get('summary'),
+            days=tuple(Day.from_ai(index, day) for index, day in enumerate(itinerary.get('details') or ())),
+            locations=tuple(Place.from_maps(place) for place in itinerary.get('locations') or ()),
+            analytics=tuple(itinerary.get('analytics') or ()),
+            route=Route.from_dict(route) if route else None,
+            preferences=itinerary.get('preferences'),
+            degraded=tuple(itinerary.get('degraded') or ()),
+            conditions=itinerary.get('conditions'),
+            adjusted=itinerary.get('adjusted'),
+        )
+
+    def to_payload(self):
+        """
+        Back to the dict shape ItineraryGenerator and Firebase use ('details', Maps-shaped 'locations').
+        """
+        payload = self.to_dict()
+        payload.pop('days', None)
+        payload['details'] = [day.to_dict() for day in self.days]
+        payload['locations'] = [place.to_maps() for place in self.locations]
+        payload['analytics'] = list(self.analytics)
+        return payload
+
+
+Day.NESTED = {"activities": Activity}
+Route.NESTED = {"stops": RouteStop}
+Itinerary.NESTED = {"days": Day, "locations": Place, "route": Route}
+Itinerary.SINGLE = frozenset({"route"})
+
+
+def compact_places(results):
+    """
+    Reduce Places API results to the fields the services use, as Maps-shaped dicts.
+    """
+    return [Place.from_maps(result).to_maps() for result in results]
+
+
+def _hhmm(value):
+    value = str(value).zfill(4)
+    return int(value[:2]) * 60 + int(value[2:])
+
+
+def _clock(value):
+    if value is None:
+        return None
+    if isinstance(value, str) and ':' in value:
+        hours, minutes = value.split(':', 1)
+        return int(hours) * 60 + int(minutes)
+    return value
@@ -6,6 +6,11 @@ Integration logic for Google Maps API, Firebase, BigQuery, Gemini, and Vertex AI
 """
 
 import os
+
+from src.services.feedback_ingestion import FeedbackIngestion
+from src.services.places_index import shared_index
+from src.services.user_profile import ProfileCache
+
 # Placeholder imports for actual SDKs
 # from googlemaps import Client as GoogleMapsClient
 # import firebase_admin
@@ -33,11 +38,16 @@ def get_location_details(location: str) -> dict:
 
 def get_nearby_attractions(lat: float, lng: float, radius: int = 2000) -> list:
     """
-    Get nearby attractions using Google Maps Places API.
+    Get nearby attractions, answered from the shared places index (filled by every
+    Places API search) before falling back to the Google Maps Places API.
     """
+    places = shared_index.nearby(lat, lng, radius)
+    if places:
+        return places
     # result = maps_client.places_nearby(location=(lat, lng), radius=radius)
+    # shared_index.add(result.get('results', []))
     # return result.get('results', [])
-    return ["Museum", "Park", "Cafe"]
+    return []
 
 # --- Firebase Integration ---
 def save_itinerary_to_firebase(user_id: str, itinerary: dict) -> bool:
@@ -49,17 +59,34 @@ def save_itinerary_to_firebase(user_id: str, itinerary: dict) -> bool:
 
 def get_user_profile(user_id: str) -> dict:
     """
-    Retrieve user profile from Firebase.
+    Retrieve user profile from Firebase, through this module's profile cache.
     """
-    # profile = firebase_admin.db.reference(f"users/{user_id}/profile").get()
-    # return profile or {}
+    profile = _profiles.get(user_id)
+    return profile.to_dict() if profile is not None else None
+
+def _fetch_user_profile(user_id: str) -> dict:
+    # return firebase_admin.db.reference(f"users/{user_id}/profile").get()
     return {"user_id": user_id, "preferences": {}, "history": []}
 
+# Filled only by _fetch_user_profile; UserProfileService keeps its own cache over the Firebase client
+_profiles = ProfileCache(_fetch_user_profile)
+
 # --- BigQuery Integration ---
-def log_user_feedback_to_bigquery(user_id: str, feedback: str) -> bool:
+def log_user_feedback_to_bigquery(user_id: str, feedback: str, ingestion: FeedbackIngestion = None) -> bool:
     """
     Log user feedback to BigQuery for analytics.
+    Args:
+        user_id (str): The user's ID.
+        feedback (str): The feedback text.
+        ingestion (FeedbackIngestion): Buffered pipeline; the row is batched into a streaming insert.
+    Returns:
+        bool: Success status.
+    Raises:
+        Backpressure: If the ingestion queue is full.
     """
+    if ingestion is not None:
+        ingestion.submit(user_id, feedback)
+        return True
     # client = bigquery.Client()
     # table = f"{BIGQUERY_DATASET}.user_feedback"
     # row = {"user_id": user_id, "feedback": feedback}
@@ -2,18 +2,214 @@
 Personalized Trip Planner - Multilingual Support Service
 
 Provides translation and localization using Gemini/Vertex AI.
+Strings are deduplicated, looked up in a translation memory, and only the
+misses are sent to the model, several strings per call: clients with
+translate_batch() get a list, others get one text with each string behind a
+numbered [[n]] marker, which is split back up by marker. A reply that does not
+carry every marker, in order, is never guessed at: that batch is translated one
+string per call instead.
 """
 
+import re
+from concurrent.futures import ThreadPoolExecutor
 
-from src.interfaces.multilingual_support import MultilingualSupportInterface
+from google.cloud import bigquery
+
+from config.settings import SUPPORTED_LANGUAGES
+from src.services.async_support import call
+from src.services.interfaces.multilingual_support import MultilingualSupportInterface
+from src.services.tracing import annotate, bind, traced
+from src.services.translation_memory import TranslationMemory, source_key
+
+# Maximum number of strings packed into one batch translation call
+TRANSLATION_BATCH_SIZE = 50
+# Marker in front of each string of a packed translation request
+# One worker per supported language, so a request's languages are translated concurrently
+TRANSLATION_WORKERS = len(SUPPORTED_LANGUAGES)
+SEGMENT_MARKER = re.compile(r"\[\[(\d+)\]\]")
+
+TOP_PLACE_NAMES_SQL = """
+    SELECT name FROM `your_project.your_dataset.recommendations`
+    GROUP BY name
+    ORDER BY COUNT(*) DESC
+    LIMIT @limit
+"""
 
 class MultilingualSupportService(MultilingualSupportInterface):
-    def __init__(self, ai_client):
-        self.ai = ai_client
+    def __init__(self, ai_client, memory=None, batch_size=TRANSLATION_BATCH_SIZE, max_workers=TRANSLATION_WORKERS):
+        self.ai = traced(ai_client, "gemini")
+        self.memory = memory if memory is not None else TranslationMemory()
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translate")
 
     def translate(self, text: str, target_language: str) -> str:
         """
         Translate text using Gemini/Vertex AI (actual API integration).
+        Raises:
+            ValueError: If text or target_language is not a string.
+        """
+        return self.translate_many([text], [target_language])[target_language][0]
+
+    async def atranslate(self, text: str, target_language: str) -> str:
+        return (await self.atranslate_many([text], [target_language]))[target_language][0]
+
+    def translate_many(self, texts, target_languages):
+        """
+        Translate every text into every target language.
+        Duplicate strings are translated once, known translations come from the
+        translation memory, and each language's misses are sent in batches of up
+        to batch_size strings, with the languages handled concurrently.
+        Returns:
+            dict: language -> list of translations, aligned with texts.
+        Raises:
+            ValueError: If a text or language is not a string.
         """
+        _validate(texts, target_languages)
+        unique = list(dict.fromkeys(texts))
+        known, misses = self._lookup(unique, target_languages)
+        futures = [
+            self.executor.submit(bind(self._translate_batches), pending, language)
+            for language, pending in misses.items()
+        ]
+        for future in futures:
+            translated = future.result()
+            self.memory.put_many(translated)
+            known.update(translated)
+        return self._assemble(texts, target_languages, known)
+
+    async def atranslate_many(self, texts, target_languages):
+        """
+        Async variant of translate_many().
+        """
+        _validate(texts, target_languages)
+        unique = list(dict.fromkeys(texts))
+        known, misses = self._lookup(unique, target_languages)
+        for language, pending in misses.items():
+            translated = {}
+            for start in range(0, len(pending), self.batch_size):
+                chunk = pending[start:start + self.batch_size]
+                translated.update(zip(
+                    (source_key(text, language) for text in chunk),
+                    await self._acall_batch(chunk, language),
+                    strict=True,
+                ))
+            self.memory.put_many(translated)
+            known.update(translated)
+        return self._assemble(texts, target_languages, known)
+
+    def prewarm(self, texts, target_languages=SUPPORTED_LANGUAGES):
+        """
+        Translate texts ahead of time so user requests hit the translation memory.
+        Returns:
+            int: Number of new (text, language) translations.
+        """
+        unique = list(dict.fromkeys(texts))
+        before = self.memory.misses
+        self.translate_many(unique, target_languages)
+        return self.memory.misses - before
+
+    def _lookup(self, unique, target_languages):
+        keys = [source_key(text, language) for language in target_languages for text in unique]
+        known = self.memory.get_many(keys)
+        misses = {}
+        for language in target_languages:
+            pending = [text for text in unique if source_key(text, language) not in known]
+            if pending:
+                misses[language] = pending
+        annotate(cache_hits=len(known), cache_misses=len(keys) - len(known))
+        return known, misses
+
+    def _translate_batches(self, texts, language):
+        translated = {}
+        for start in range(0, len(texts), self.batch_size):
+            chunk = texts[start:start + self.batch_size]
+            translated.update(zip((source_key(text, language) for text in chunk), self._call_batch(chunk, language), strict=True))
+        return translated
+
+    def _call_batch(self, texts, language):
         # Replace with actual Gemini/Vertex AI translation API call
-        return self.ai.translate(text, target_language)
+        translate_batch = getattr(self.ai, 'translate_batch', None)
+        if translate_batch is not None:
+            return translate_batch(texts, language)
+        if _packable(texts):
+            translations = unpack_segments(self.ai.translate(pack_segments(texts), language), len(texts))
+            if translations is not None:
+                return translations
+            annotate(batch_fallback=True)
+        return [self.ai.translate(text, language) for text in texts]
+
+    async def _acall_batch(self, texts, language):
+        if getattr(self.ai, 'translate_batch', None) is not None:
+            return await call(self.ai.translate_batch, texts, language)
+        if _packable(texts):
+            translations = unpack_segments(await call(self.ai.translate, pack_segments(texts), language), len(texts))
+            if translations is not None:
+                return translations
+            annotate(batch_fallback=True)
+        return [await call(self.ai.translate, text, language) for text in texts]
+
+    def _assemble(self, texts, target_languages, known):
+        return {
+            language: [known[source_key(text, language)] for text in texts]
+            for language in target_languages
+        }
+
+
+def pack_segments(texts):
+    """
+    Pack strings into one translation request, each behind its [[n]] marker.
+    """
+    return "\n".join(f"[[{index}]] {text}" for index, text in enumerate(texts))
+
+
+def unpack_segments(reply, count):
+    """
+    Split a translated packed request back into its strings.
+    Args:
+        reply (str): The model's translation of pack_segments() output.
+        count (int): Number of strings that were packed.
+    Returns:
+        list: The translations in order, or None unless the reply has exactly the markers 0..count-1 in order.
+    """
+    parts = SEGMENT_MARKER.split(reply or "")
+    # [text before the first marker, "0", translation 0, "1", translation 1, ...]
+    if [int(index) for index in parts[1::2]] != list(range(count)):
+        return None
+    return [translation.strip() for translation in parts[2::2]]
+
+
+def _packable(texts):
+    # A string that already contains a marker would split wrongly
+    return len(texts) > 1 and not any(SEGMENT_MARKER.search(text) for text in texts)
+
+
+def _validate(texts, target_languages):
+    if isinstance(texts, str) or isinstance(target_languages, str):
+        raise ValueError("texts and target_languages must be lists of strings")
+    for value in (*texts, *target_languages):
+        if not isinstance(value, str):
+            raise ValueError(f"Expected a string to translate or a language code, got {type(value).__name__}")
+
+
+def top_place_names(bigquery_client, limit=1000):
+    """
+    Most frequently recommended place names, for prewarming the translation memory.
+    """
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ScalarQueryParameter("limit", "INT64", limit),
+    ])
+    return [row['name'] for row in bigquery_client.query(TOP_PLACE_NAMES_SQL, job_config=job_config)]
+
+
+def prewarm_translations(service, bigquery_client, top_n=1000, target_languages=SUPPORTED_LANGUAGES):
+    """
+    Pre-warming job: translate the top N place names into every supported language.
+    Args:
+        service (MultilingualSupportService): Service whose translation memory is warmed.
+        bigquery_client: BigQuery client used to find the most recommended places.
+        top_n (int): Number of place names to translate.
+        target_languages (list): Languages to translate into.
+    Returns:
+        int: Number of new translations.
+    """
+    return service.prewarm(top_place_names(bigquery_client, top_n), target_languages)
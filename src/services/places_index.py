@@ -0,0 +1,222 @@
+"""
+Personalized Trip Planner - Places Cache & Geo-Index
+
+Shared Places layer for DataAggregationService, ItineraryGenerator and
+maps_integration. Text searches are cached per normalized query with a TTL,
+and every place fetched is added to a local grid index so nearby-attraction
+lookups can be answered without calling the Places API. Both are bounded: the
+query cache keeps max_queries searches and the index max_places places, least
+recently added or refreshed evicted first. Cached results are shared between
+callers, so they are returned as tuples; the place dicts in them are read-only.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from src.services.async_support import call
+from src.services.tracing import annotate, traced
+
+EARTH_RADIUS_M = 6371000.0
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance in metres between two points.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def geohash(lat, lng, precision=5):
+    """
+    Encode a point as a geohash (precision 5 is a cell of roughly 5 km x 5 km).
+    """
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def normalize_query(query):
+    return " ".join(str(query or "").lower().split())
+
+
+def place_location(place):
+    """
+    (lat, lng) of a Places API result, or None if it has no geometry.
+    """
+    location = (place.get('geometry') or {}).get('location') or {}
+    lat, lng = location.get('lat'), location.get('lng')
+    if lat is None or lng is None:
+        return None
+    return float(lat), float(lng)
+
+
+class GeoGridIndex:
+    """
+    Uniform lat/lng grid over known places. Radius queries scan only the cells
+    overlapping the query's bounding box.
+    """
+    def __init__(self, cell_degrees=0.01, max_places=200_000):
+        self.cell_degrees = cell_degrees  # ~1.1 km of latitude
+        self.max_places = max_places
+        self._cells = {}  # (row, col) -> {place_id: (lat, lng, place)}
+        self._places = OrderedDict()  # place_id -> cell, least recently added first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._places)
+
+    def add(self, places):
+        """
+        Index places (Places API results); places without geometry are ignored.
+        """
+        with self._lock:
+            for place in places:
+                point = place_location(place)
+                if point is None:
+                    continue
+                place_id = place.get('place_id') or f"{point[0]:.6f},{point[1]:.6f}:{place.get('name', '')}"
+                old_cell = self._places.pop(place_id, None)
+                if old_cell is not None:
+                    self._discard(old_cell, place_id)
+                cell = self._cell(*point)
+                self._cells.setdefault(cell, {})[place_id] = (point[0], point[1], place)
+                self._places[place_id] = cell
+            while len(self._places) > self.max_places:
+                place_id, cell = self._places.popitem(last=False)
+                self._discard(cell, place_id)
+
+    def nearby(self, lat, lng, radius, limit=None):
+        """
+        Places within radius metres of (lat, lng), nearest first.
+        """
+        dlat = math.degrees(radius / EARTH_RADIUS_M)
+        dlng = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        row_min, col_min = self._cell(lat - dlat, lng - dlng)
+        row_max, col_max = self._cell(lat + dlat, lng + dlng)
+        found = []
+        with self._lock:
+            for row in range(row_min, row_max + 1):
+                for col in range(col_min, col_max + 1):
+                    for place_lat, place_lng, place in self._cells.get((row, col), {}).values():
+                        distance = haversine_m(lat, lng, place_lat, place_lng)
+                        if distance <= radius:
+                            found.append((distance, place))
+        found.sort(key=lambda item: item[0])
+        places = [place for _, place in found]
+        return places if limit is None else places[:limit]
+
+    def _cell(self, lat, lng):
+        return math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees)
+
+    def _discard(self, cell, place_id):
+        places = self._cells[cell]
+        places.pop(place_id, None)
+        if not places:
+            del self._cells[cell]
+
+
+class PlacesService:
+    """
+    Places API access through a TTL cache for text searches and a shared geo-index for nearby lookups.
+    """
+    def __init__(self, maps_client, index=None, ttl=24 * 3600, max_queries=50_000):
+        self.gmaps = traced(maps_client, "maps")
+        self.index = index if index is not None else shared_index
+        self.ttl = ttl
+        self.max_queries = max_queries
+        self._queries = OrderedDict()  # normalized query -> (expires, results)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def search(self, query):
+        """
+        Cached equivalent of gmaps.places(query=query).get('results', []), as a tuple
+        shared with other callers (copy a place before changing it).
+        """
+        key, now = normalize_query(query), time.time()
+        results = self._cached(key, now)
+        if results is None:
+            results = self._store(key, now, self.gmaps.places(query=query))
+        return results
+
+    async def asearch(self, query):
+        """
+        Async variant of search(); awaits the Maps client natively when it implements AsyncMapsClient.
+        """
+        key, now = normalize_query(query), time.time()
+        results = self._cached(key, now)
+        if results is None:
+            results = self._store(key, now, await call(self.gmaps.places, query=query))
+        return results
+
+    def nearby(self, lat, lng, radius=2000, min_results=1, allow_remote=True):
+        """
+        Places near (lat, lng), from the local index when it has at least min_results,
+        otherwise from the Places API (whose results are then indexed).
+        """
+        places = self.index.nearby(lat, lng, radius)
+        if len(places) >= min_results or not allow_remote or self.gmaps is None:
+            return places
+        results = self.gmaps.places_nearby(location=(lat, lng), radius=radius).get('results', [])
+        self.index.add(results)
+        return self.index.nearby(lat, lng, radius)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "queries": len(self._queries), "places": len(self.index)}
+
+    def _cached(self, key, now):
+        with self._lock:
+            entry = self._queries.get(key)
+            if entry is not None and entry[0] > now:
+                self._queries.move_to_end(key)
+                self.hits += 1
+                annotate(places_cache_hit=True)
+                return entry[1]
+            self.misses += 1
+        annotate(places_cache_hit=False)
+        return None
+
+    def _store(self, key, now, response):
+        results = tuple(response.get('results', []))
+        self.index.add(results)
+        with self._lock:
+            self._queries[key] = (now + self.ttl, results)
+            self._queries.move_to_end(key)
+            while len(self._queries) > self.max_queries:
+                self._queries.popitem(last=False)
+        return results
+
+
+# Process-wide index shared by every PlacesService and maps_integration
+shared_index = GeoGridIndex()
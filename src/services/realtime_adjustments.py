@@ -2,8 +2,29 @@
 Real-Time Adjustments Service for Personalized Trip Planner
 
 Compliant with codebase: Uses Google Maps API, Firebase, and Gemini/Vertex AI for real-time itinerary updates.
+
+Re-planning is incremental: only the time slots touched by a condition change
+(rain over part of the day, a delayed train) are recomputed, the rest of the
+schedule is reused, and the result is a JSON patch (RFC 6902) that is written
+to Firebase as a multi-path partial update.
 """
 
+from src.services.conditions_cache import ConditionsCache, StaticConditionsProvider
+from src.services.places_index import haversine_m, normalize_query, place_location
+from src.services.route_optimizer import time_window
+
+# Places API types that stay usable in bad weather
+INDOOR_PLACE_TYPES = frozenset({
+	"museum", "art_gallery", "aquarium", "library", "shopping_mall", "movie_theater",
+	"bowling_alley", "casino", "spa", "restaurant", "cafe", "bar", "church",
+	"hindu_temple", "mosque", "synagogue", "department_store", "book_store",
+})
+WHOLE_DAY = (0.0, 24 * 60.0)
+_MISSING = object()
+
+# Process-wide conditions cache, keyed by (geohash cell, hour); swap the provider for a real weather/traffic API
+shared_conditions = ConditionsCache(StaticConditionsProvider())
+
 # --- Real-Time Adjustment Logic ---
 def adjust_itinerary_for_conditions(itinerary: dict, conditions: dict) -> dict:
 	"""
@@ -14,10 +35,45 @@ def adjust_itinerary_for_conditions(itinerary: dict, conditions: dict) -> dict:
 	Returns:
 		dict: Updated itinerary.
 	"""
-	# Use Maps API and AI to update itinerary
-	itinerary["adjusted"] = True
-	itinerary["conditions"] = conditions
-	return itinerary
+	return apply_patch(itinerary, replan_for_conditions(itinerary, conditions))
+
+def replan_for_conditions(itinerary: dict, conditions: dict) -> list:
+	"""
+	Compute the minimal JSON patch that adapts an itinerary to new conditions.
+	Outdoor stops whose slot overlaps a rain window are swapped for the nearest
+	indoor place not yet on the route (or dropped if there is none); a delay
+	shifts the following stops only until waiting time absorbs it, dropping
+	stops that would run past their closing time. Untouched slots produce no ops.
+	Args:
+		itinerary (dict): The current itinerary (with 'route' and/or 'activities').
+		conditions (dict): 'weather' as a string or {"main", "start", "end"}, and
+			optional 'delays' as [{"at": minutes, "minutes": minutes}].
+	Returns:
+		list: JSON patch operations; empty if the conditions have not changed.
+	"""
+	previous = itinerary.get('conditions') or {}
+	if conditions == previous:
+		return []
+	rain = rain_windows(conditions)
+	# Delays already applied by an earlier adjustment are not applied again
+	delays = [delay for delay in conditions.get('delays', []) if delay not in previous.get('delays', [])]
+
+	patch = []
+	route = itinerary.get('route') or {}
+	if route.get('stops'):
+		patch.extend(_replan_route(route, rain, delays, itinerary.get('locations') or []))
+	activities = itinerary.get('activities') or []
+	if rain and activities:
+		# Highest index first so each remove leaves the earlier paths valid
+		for index in reversed(range(len(activities))):
+			activity = activities[index]
+			slot = (_minutes(activity.get('start'), WHOLE_DAY[0]), _minutes(activity.get('end'), WHOLE_DAY[1]))
+			if not is_indoor(activity) and _overlaps(slot, rain):
+				patch.append({"op": "remove", "path": f"/activities/{index}"})
+	patch.append({"op": "replace" if 'conditions' in itinerary else "add", "path": "/conditions", "value": conditions})
+	if not itinerary.get('adjusted'):
+		patch.append({"op": "add", "path": "/adjusted", "value": True})
+	return patch
 
 def monitor_conditions_and_update(user_id: str, itinerary: dict) -> dict:
 	"""
@@ -29,19 +85,256 @@ def monitor_conditions_and_update(user_id: str, itinerary: dict) -> dict:
 		dict: Updated itinerary.
 	"""
 	# conditions = fetch_conditions_from_maps_api(itinerary)
-	# updated_itinerary = adjust_itinerary_for_conditions(itinerary, conditions)
-	# firebase_admin.db.reference(f"users/{user_id}/itineraries/current").set(updated_itinerary)
+	# patch = replan_for_conditions(itinerary, conditions)
+	# apply_patch(itinerary, patch)
+	# firebase_admin.db.reference(f"users/{user_id}/itineraries/current").update(firebase_updates(patch, itinerary))
 	return itinerary
 
-def fetch_conditions_from_maps_api(itinerary: dict) -> dict:
+def fetch_conditions_from_maps_api(itinerary: dict, when: float | None = None, cache: ConditionsCache | None = None) -> dict:
 	"""
 	Fetch real-time conditions from Google Maps API for the itinerary.
+	Goes through the conditions cache, so itineraries in the same area and hour share one upstream fetch.
 	Args:
 		itinerary (dict): The current itinerary.
+		when (float): Epoch seconds the conditions are needed for (default now).
+		cache (ConditionsCache): Cache to use instead of shared_conditions.
 	Returns:
 		dict: Real-time conditions (weather, traffic, events).
 	"""
-	# Placeholder for actual Maps API integration
-	return {"weather": "Sunny", "traffic": "Moderate", "events": []}
+	cache = cache if cache is not None else shared_conditions
+	point = itinerary_point(itinerary)
+	if point is None:
+		return cache.lookup(normalize_query(itinerary.get('destination')), None, when)
+	return cache.get(point[0], point[1], when)
+
+# --- Helpers ---
+def itinerary_point(itinerary: dict):
+	"""
+	(lat, lng) of the itinerary's first located route stop or location, or None.
+	"""
+	by_id = {place.get('place_id'): place for place in itinerary.get('locations') or []}
+	stops = (itinerary.get('route') or {}).get('stops') or []
+	for place in [by_id.get(stop.get('place_id')) for stop in stops] + list(by_id.values()):
+		point = place_location(place) if place is not None else None
+		if point is not None:
+			return point
+	return None
+
+def is_indoor(stop: dict) -> bool:
+	"""
+	Whether a stop or activity can go ahead in the rain.
+	"""
+	if 'indoor' in stop:
+		return bool(stop['indoor'])
+	if stop.get('type') is not None:
+		return stop.get('type') == 'indoor'
+	return bool(INDOOR_PLACE_TYPES.intersection(stop.get('types') or ()))
+
+def rain_windows(conditions: dict) -> list:
+	"""
+	(start, end) minute windows during which it rains; a bare "Rain" covers the whole day.
+	"""
+	weather = conditions.get('weather')
+	if weather is None:
+		return []
+	forecasts = weather if isinstance(weather, list) else [weather]
+	windows = []
+	for forecast in forecasts:
+		if isinstance(forecast, str):
+			forecast = {"main": forecast}
+		if forecast.get('main') == 'Rain':
+			windows.append((_minutes(forecast.get('start'), WHOLE_DAY[0]), _minutes(forecast.get('end'), WHOLE_DAY[1])))
+	return windows
+
+def apply_patch(document: dict, patch: list) -> dict:
+	"""
+	Apply JSON patch operations (add, replace, remove) in place.
+	Args:
+		document (dict): The document to modify.
+		patch (list): Operations as produced by replan_for_conditions().
+	Returns:
+		dict: The modified document.
+	"""
+	for operation in patch:
+		parent, key = _resolve_parent(document, operation['path'])
+		if operation['op'] == 'remove':
+			del parent[key]
+		elif isinstance(parent, list) and operation['op'] == 'add':
+			parent.insert(len(parent) if key == '-' else key, operation['value'])
+		else:
+			parent[key] = operation['value']
+	return document
+
+def firebase_updates(patch: list, document: dict) -> dict:
+	"""
+	Turn a JSON patch into a Firebase multi-path update (reference.update()).
+	Arrays cannot be spliced in place in Firebase, so a list with an insert or removal
+	is rewritten whole; everything else becomes a write to its own path. Values are
+	read from the patched document: once a list has been rewritten, earlier paths into
+	it (e.g. a replace at an index that a later remove shifted) are covered by that write.
+	Args:
+		patch (list): Operations already applied to document.
+		document (dict): The patched document.
+	Returns:
+		dict: Slash-separated path -> new value (None deletes the path).
+	"""
+	paths = [_tokens(operation['path']) for operation in patch]
+	# Lists spliced by the patch, shallowest first so nested splices inside them are covered
+	spliced = []
+	for operation, tokens in sorted(zip(patch, paths, strict=True), key=lambda entry: len(entry[1])):
+		parent_tokens = tokens[:-1]
+		if operation['op'] == 'replace' or _covered(parent_tokens, spliced):
+			continue
+		parent = _lookup(document, parent_tokens, default=None)
+		if isinstance(parent, list):
+			spliced.append(parent_tokens)
+
+	updates = {"/".join(tokens): _lookup(document, tokens) for tokens in spliced}
+	for tokens in paths:
+		if not _covered(tokens, spliced):
+			# Missing from the patched document means removed (or replaced by a later remove)
+			updates["/".join(tokens)] = _lookup(document, tokens, default=None)
+	# Firebase rejects an update that writes both a path and one of its descendants
+	return {
+		path: value for path, value in updates.items()
+		if not any(path.startswith(other + "/") for other in updates)
+	}
+
+def _replan_route(route, rain, delays, locations):
+	stops = route['stops']
+	# Aligned with stops; an entry is replaced when its slot changes and set to None when dropped
+	planned = list(stops)
+	dropped = []
+	for delay in delays:
+		dropped.extend(_apply_delay(planned, float(delay.get('at', 0)), float(delay.get('minutes', 0))))
+	if rain:
+		dropped.extend(_avoid_rain(planned, rain, locations))
+
+	patch = []
+	for index, (before, after) in enumerate(zip(stops, planned, strict=True)):
+		if after is None or after is before:
+			continue
+		if after.get('place_id') != before.get('place_id'):
+			patch.append({"op": "replace", "path": f"/route/stops/{index}", "value": after})
+			continue
+		for field, value in after.items():
+			if before.get(field) != value:
+				patch.append({"op": "replace", "path": f"/route/stops/{index}/{field}", "value": value})
+	# Removals last and from the highest index, so the paths above stay valid
+	for index in reversed(range(len(stops))):
+		if planned[index] is None:
+			patch.append({"op": "remove", "path": f"/route/stops/{index}"})
+	if dropped:
+		ids = [stop.get('place_id') or stop.get('name') for stop in dropped]
+		if 'dropped' in route:
+			patch.extend({"op": "add", "path": "/route/dropped/-", "value": place_id} for place_id in ids)
+		else:
+			patch.append({"op": "add", "path": "/route/dropped", "value": ids})
+	return patch
+
+def _apply_delay(planned, at, minutes):
+	# Shift the stops after the delay until waiting time (a stop not yet open) absorbs it
+	dropped = []
+	previous = None
+	ready = None  # When the traveller can leave for the next stop, once the delay has hit
+	for index, stop in enumerate(planned):
+		if stop is None:
+			continue
+		if stop['arrival'] < at:
+			previous = stop
+			continue
+		if ready is None:
+			earliest = (stop['arrival'] if previous is None else previous['departure'] + stop.get('travel', 0.0)) + minutes
+		else:
+			earliest = ready + stop.get('travel', 0.0)
+		begin = max(earliest, stop['arrival'])
+		if begin == stop['arrival']:
+			break
+		departure = begin + stop['departure'] - stop['arrival']
+		if departure > stop.get('closes', WHOLE_DAY[1]):
+			# Skipped; the next stop is reached from here
+			planned[index] = None
+			dropped.append(stop)
+			ready = earliest
+			continue
+		planned[index] = {**stop, 'arrival': begin, 'departure': departure}
+		ready = departure
+	return dropped
+
+def _avoid_rain(planned, rain, locations):
+	# Swap each rained-out outdoor stop for the nearest open indoor place not already on the route
+	dropped = []
+	by_id = {place.get('place_id'): place for place in locations}
+	on_route = {stop.get('place_id') for stop in planned if stop is not None}
+	candidates = [
+		place for place in locations
+		if is_indoor(place) and place.get('place_id') not in on_route and place_location(place) is not None
+	]
+	for index, stop in enumerate(planned):
+		if stop is None or is_indoor(stop) or not _overlaps((stop['arrival'], stop['departure']), rain):
+			continue
+		substitute = _nearest_open(by_id.get(stop.get('place_id')), stop, candidates)
+		if substitute is None:
+			planned[index] = None
+			dropped.append(stop)
+			continue
+		candidates.remove(substitute)
+		planned[index] = {
+			**stop,
+			'place_id': substitute.get('place_id'),
+			'name': substitute.get('name'),
+			'indoor': True,
+			'closes': time_window(substitute)[1],
+			'replaces': stop.get('place_id'),
+		}
+	return dropped
+
+def _nearest_open(original, stop, candidates):
+	origin = place_location(original) if original is not None else None
+	best, best_distance = None, float("inf")
+	for place in candidates:
+		opens, closes = time_window(place)
+		if stop['arrival'] < opens or stop['departure'] > closes:
+			continue
+		distance = 0.0 if origin is None else haversine_m(*origin, *place_location(place))
+		if distance < best_distance:
+			best, best_distance = place, distance
+	return best
+
+def _overlaps(slot, windows):
+	return any(slot[0] < end and start < slot[1] for start, end in windows)
+
+def _minutes(value, default):
+	# Minutes after midnight from a number or an "HH:MM" string
+	if value is None:
+		return float(default)
+	if isinstance(value, str) and ':' in value:
+		hours, minutes = value.split(':', 1)
+		return float(int(hours) * 60 + int(minutes))
+	return float(value)
+
+def _tokens(path):
+	return [token.replace('~1', '/').replace('~0', '~') for token in path.lstrip('/').split('/')]
+
+def _lookup(document, tokens, default=_MISSING):
+	try:
+		for token in tokens:
+			document = document[int(token)] if isinstance(document, list) else document[token]
+	except (KeyError, IndexError, ValueError, TypeError):
+		if default is _MISSING:
+			raise
+		return default
+	return document
+
+def _covered(tokens, prefixes):
+	return any(tokens[:len(prefix)] == prefix for prefix in prefixes)
+
+def _resolve_parent(document, path):
+	tokens = _tokens(path)
+	parent = _lookup(document, tokens[:-1])
+	key = tokens[-1]
+	if isinstance(parent, list) and key != '-':
+		key = int(key)
+	return parent, key
 
 ### 9. Deployment and Maintenance
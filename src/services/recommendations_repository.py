@@ -0,0 +1,197 @@
+"""
+Personalized Trip Planner - Recommendations Repository
+
+Parameterized, cached access to the BigQuery `recommendations` table. Lookups are
+keyed on (theme, budget bucket) so results are shared between users, and a local
+copy of the table can be refreshed in the background so most lookups never reach BigQuery.
+The local copy is either an in-process index or, with a SnapshotLoader, a
+memory-mapped Arrow snapshot (see recommendations_snapshot.py).
+"""
+
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+
+from google.cloud import bigquery
+
+from src.services.async_support import call
+from src.services.itinerary_cache import budget_bucket, row_budget
+from src.services.tracing import traced
+
+RECOMMENDATIONS_TABLE = "your_project.your_dataset.recommendations"
+# Budget used for the open-ended top bucket
+UNBOUNDED_BUDGET = 2 ** 53
+
+LOOKUP_SQL = f"""
+    SELECT * FROM `{RECOMMENDATIONS_TABLE}`
+    WHERE budget <= @budget
+    AND LOWER(theme) = @theme
+    ORDER BY budget
+    LIMIT @limit
+"""
+TABLE_SQL = f"SELECT * FROM `{RECOMMENDATIONS_TABLE}`"
+
+
+class RecommendationsRepository:
+    def __init__(self, bigquery_client, limit=10, ttl=900, refresh_interval=900, snapshot=None, max_lookups=10_000):
+        self.bigquery = traced(bigquery_client, "bigquery")
+        self.snapshot = snapshot  # Optional SnapshotLoader used instead of the in-process index
+        self.limit = limit
+        self.ttl = ttl  # Lifetime of per-(theme, bucket) query results
+        self.refresh_interval = refresh_interval
+        self.max_lookups = max_lookups
+        self._lookups = OrderedDict()  # (theme, bucket) -> (expires, rows), least recently used first
+        self._table = None  # theme -> (sorted budgets, rows), once refresh() has run
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.queries = 0
+
+    def lookup(self, theme, budget):
+        """
+        Recommendations for a theme within budget, cheapest first.
+        Served from the local table snapshot when loaded, otherwise from a
+        parameterized query cached per (theme, budget bucket).
+        """
+        theme = str(theme or "").strip().lower()
+        bucket = budget_bucket(budget)
+        rows = self._from_table(theme, bucket)
+        if rows is None:
+            rows = self._from_query(theme, bucket)
+        return _within_budget(rows, budget)
+
+    async def alookup(self, theme, budget):
+        """
+        Async variant of lookup(); a query awaits the BigQuery client natively when it
+        implements AsyncBigQueryClient.
+        """
+        theme = str(theme or "").strip().lower()
+        bucket = budget_bucket(budget)
+        rows = self._from_table(theme, bucket)
+        if rows is None:
+            key, now = (theme, bucket), time.time()
+            rows = self._cached_lookup(key, now)
+            if rows is None:
+                rows = self._store_lookup(key, now, await call(self.bigquery.query, LOOKUP_SQL, job_config=self._job_config(theme, bucket)))
+        return _within_budget(rows, budget)
+
+    def refresh(self):
+        """
+        Reload the whole recommendations table into the local index or snapshot.
+        """
+        if self.snapshot is not None:
+            self.snapshot.refresh_from(self.bigquery)
+            with self._lock:
+                self._loaded_at = time.time()
+                self._lookups.clear()
+                self.queries += 1
+            return
+        by_theme = {}
+        for row in self.bigquery.query(TABLE_SQL):
+            row = dict(row)
+            by_theme.setdefault(str(row.get('theme') or "").lower(), []).append(row)
+        table = {}
+        for theme, rows in by_theme.items():
+            rows.sort(key=_budget_of)
+            table[theme] = ([_budget_of(row) for row in rows], rows)
+        with self._lock:
+            self._table = table
+            self._loaded_at = time.time()
+            self._lookups.clear()
+            self.queries += 1
+
+    def start(self):
+        """
+        Load the table now and keep refreshing it on a background thread.
+        """
+        if self._thread is not None:
+            return
+        try:
+            self.refresh()
+        except Exception:
+            # The last exported snapshot on disk can be served until the loop refreshes it
+            if self.snapshot is None:
+                raise
+            self.snapshot.reload()
+            if self.snapshot.snapshot is None:
+                raise
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="recommendations-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def loaded_at(self):
+        return self._loaded_at
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the previous snapshot; the next tick retries.
+                pass
+
+    def _from_table(self, theme, bucket):
+        if self.snapshot is not None:
+            return self.snapshot.lookup(theme, bucket, self.limit)
+        with self._lock:
+            table = self._table
+        if table is None:
+            return None
+        budgets, rows = table.get(theme, ((), ()))
+        end = len(budgets) if bucket < 0 else bisect_right(budgets, bucket)
+        return rows[:min(end, self.limit)]
+
+    def _from_query(self, theme, bucket):
+        key, now = (theme, bucket), time.time()
+        rows = self._cached_lookup(key, now)
+        if rows is None:
+            rows = self._store_lookup(key, now, self.bigquery.query(LOOKUP_SQL, job_config=self._job_config(theme, bucket)))
+        return rows
+
+    def _job_config(self, theme, bucket):
+        return bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("budget", "INT64", bucket if bucket > 0 else UNBOUNDED_BUDGET),
+            bigquery.ScalarQueryParameter("theme", "STRING", theme),
+            bigquery.ScalarQueryParameter("limit", "INT64", self.limit),
+        ])
+
+    def _cached_lookup(self, key, now):
+        with self._lock:
+            cached = self._lookups.get(key)
+            if cached is not None and cached[0] > now:
+                self._lookups.move_to_end(key)
+                return cached[1]
+        return None
+
+    def _store_lookup(self, key, now, result):
+        rows = [dict(row) for row in result]
+        with self._lock:
+            self.queries += 1
+            self._lookups[key] = (now + self.ttl, rows)
+            self._lookups.move_to_end(key)
+            while len(self._lookups) > self.max_lookups:
+                self._lookups.popitem(last=False)
+        return rows
+
+
+def _budget_of(row):
+    budget = row_budget(row)
+    return budget if budget is not None else 0
+
+
+def _within_budget(rows, budget):
+    try:
+        limit = float(budget)
+    except (TypeError, ValueError):
+        return list(rows)
+    # Rows are sorted by budget, so this keeps exactly the cheapest rows under the real budget
+    return [row for row in rows if _budget_of(row) <= limit]
@@ -0,0 +1,207 @@
+"""
+Personalized Trip Planner - Recommendations Snapshot
+
+Exports the BigQuery `recommendations` table to a local Arrow IPC file and serves
+theme/budget lookups from a memory-mapped copy with NumPy, so itinerary requests
+do not need a BigQuery round trip. New exports replace the file atomically and
+readers swap to the new snapshot without blocking in-flight lookups.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+from src.services.itinerary_cache import row_budget
+from src.services.recommendations_repository import TABLE_SQL
+
+# Columns added to the export for lookups; not part of the returned rows
+KEY_COLUMNS = ["theme_key", "budget_key"]
+
+
+def export_snapshot(bigquery_client, path, query=TABLE_SQL):
+    """
+    Export the recommendations table to an Arrow IPC file at path.
+    The file is written next to the target and renamed into place, so readers
+    never see a partial snapshot.
+    Args:
+        bigquery_client: BigQuery client; results are read with to_arrow() when the
+            query job supports it, row by row otherwise.
+        path (str): Destination file.
+        query (str): Export query.
+    Returns:
+        int: Number of exported rows.
+    """
+    _require_pyarrow()
+    result = bigquery_client.query(query)
+    table = result.to_arrow() if hasattr(result, "to_arrow") else _table_from_rows(result)
+    return write_snapshot(table, path)
+
+
+def write_snapshot(table, path):
+    """
+    Atomically write an Arrow table to path in IPC file format, pre-sorted by (theme, budget).
+    """
+    _require_pyarrow()
+    table = table.append_column("theme_key", pc.utf8_lower(table.column("theme").cast(pa.string())))
+    table = table.append_column("budget_key", _budget_keys(table.column("budget")))
+    table = table.sort_by([("theme_key", "ascending"), ("budget_key", "ascending")])
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    with open(tmp_path, "rb") as written:
+        os.fsync(written.fileno())
+    os.replace(tmp_path, path)
+    return table.num_rows
+
+
+class RecommendationsSnapshot:
+    """
+    Immutable, memory-mapped view of one snapshot file.
+    """
+    def __init__(self, path):
+        _require_pyarrow()
+        self.path = path
+        stat = os.stat(path)
+        self.version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        source = pa.memory_map(path, "r")
+        self.table = pa.ipc.open_file(source).read_all()
+        self.budgets = self.table.column("budget_key").to_numpy()
+        # The file is sorted by (theme_key, budget): index each theme's row range once
+        themes = self.table.column("theme_key").combine_chunks().dictionary_encode()
+        codes = themes.indices.to_numpy(zero_copy_only=False)
+        boundaries = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.concatenate(([0], boundaries)) if len(codes) else np.array([], dtype=np.int64)
+        ends = np.concatenate((boundaries, [len(codes)])) if len(codes) else np.array([], dtype=np.int64)
+        dictionary = themes.dictionary.to_pylist()
+        self._ranges = {dictionary[codes[start]]: (int(start), int(end)) for start, end in zip(starts, ends, strict=True)}
+
+    @property
+    def num_rows(self):
+        return self.table.num_rows
+
+    def lookup(self, theme, bucket, limit):
+        """
+        Cheapest rows for theme with budget <= bucket (bucket < 0 means unbounded).
+        """
+        start, end = self._ranges.get(theme, (0, 0))
+        if bucket >= 0:
+            end = start + int(np.searchsorted(self.budgets[start:end], bucket, side="right"))
+        indices = np.arange(start, min(end, start + limit))
+        if not len(indices):
+            return []
+        return self.table.take(pa.array(indices)).drop_columns(KEY_COLUMNS).to_pylist()
+
+
+class SnapshotLoader:
+    """
+    Holds the current RecommendationsSnapshot and swaps in new ones as the file changes.
+    """
+    def __init__(self, path, poll_interval=60):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def reload(self):
+        """
+        Load the file if it changed since the current snapshot.
+        Returns:
+            bool: True if a new snapshot was swapped in.
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return False
+            current = self._snapshot
+            if current is not None and current.version == (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+                return False
+            self._snapshot = RecommendationsSnapshot(self.path)
+            return True
+
+    def refresh_from(self, bigquery_client):
+        """
+        Export a fresh snapshot from BigQuery and swap it in.
+        """
+        export_snapshot(bigquery_client, self.path)
+        self.reload()
+
+    def lookup(self, theme, bucket, limit):
+        """
+        Rows from the current snapshot, or None if no snapshot is loaded yet.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        return snapshot.lookup(theme, bucket, limit)
+
+    def start(self):
+        """
+        Load the current file and poll it for new exports on a background thread.
+        """
+        if self._thread is not None:
+            return
+        self.reload()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll, name="recommendations-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception:
+                # A bad export leaves the previous snapshot in place.
+                pass
+
+
+def snapshots_available():
+    """
+    Whether recommendation snapshots can be used (pyarrow is installed).
+    """
+    return pa is not None
+
+
+def _table_from_rows(rows):
+    rows = [dict(row) for row in rows]
+    if not rows:
+        return pa.table({"theme": pa.array([], pa.string()), "budget": pa.array([], pa.float64())})
+    return pa.Table.from_pylist(rows)
+
+
+def _budget_keys(column):
+    # Same order as the in-process index (recommendations_repository._budget_of): budgets
+    # as numbers, with missing or unparseable ones (null, NaN, odd strings) as 0
+    if pa.types.is_integer(column.type) or pa.types.is_floating(column.type) or pa.types.is_decimal(column.type):
+        keys = pc.cast(column, pa.float64())
+        return pc.fill_null(pc.if_else(pc.is_finite(keys), keys, 0.0), 0.0)
+    budgets = (row_budget({'budget': value}) for value in column.to_pylist())
+    return pa.array([float(budget) if budget is not None else 0.0 for budget in budgets], pa.float64())
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is required for recommendation snapshots. Please install the required package.")
@@ -0,0 +1,425 @@
+"""
+Personalized Trip Planner - Route Optimizer
+
+Orders an itinerary's stops to minimise travel time while respecting opening hours.
+Travel times come from a distance matrix: cached Google Maps Distance Matrix results
+when a Maps client is available, vectorized Haversine estimates otherwise. A day plan
+is built by time-window-aware nearest neighbour under a few selection rules, keeping
+the one that fits the most stops (then the least travel). Stops that do not fit are dropped
+(orienteering) and re-inserted greedily wherever their push-forward fits the slack of
+the route, alternating with 2-opt and Or-opt moves that shorten it, until nothing
+changes or the time budget is spent.
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.services.places_index import EARTH_RADIUS_M, place_location
+from src.services.tracing import traced
+
+# Average door-to-door speed used to turn Haversine distances into travel minutes
+OFFLINE_SPEED_KMH = 20.0
+DEFAULT_VISIT_MINUTES = 60
+DAY_START_MINUTES = 9 * 60
+DAY_END_MINUTES = 21 * 60
+# Google Distance Matrix allows at most 25 origins/destinations per request
+MAPS_MATRIX_CHUNK = 25
+# Nearest-neighbour rules tried for the first route, as (visit weight, urgency weight):
+# next stop = lowest start + visit weight * visit + urgency weight * time left to its latest start.
+# Earliest start keeps travel low, earliest finish fits more short visits when the day is
+# over-subscribed, and urgency saves stops whose windows close soon.
+CONSTRUCTION_RULES = ((0.0, 0.0), (1.0, 0.0), (1.0, 0.1))
+# Share of plan_day's time budget kept for turning the route into the result
+FINISH_RESERVE = 0.1
+
+
+def haversine_matrix(lats, lngs):
+    """
+    Pairwise great-circle distances in metres.
+    Args:
+        lats, lngs (array-like): Coordinates in degrees, length n.
+    Returns:
+        np.ndarray: n x n distance matrix.
+    """
+    phi = np.radians(np.asarray(lats, dtype=np.float64))
+    lmb = np.radians(np.asarray(lngs, dtype=np.float64))
+    # Chord between unit vectors: the trigonometry is per point, not per pair, and the
+    # differences keep short distances exact (same result as the haversine formula)
+    cos_phi = np.cos(phi)
+    x, y, z = cos_phi * np.cos(lmb), cos_phi * np.sin(lmb), np.sin(phi)
+    half_chord = (x[:, None] - x) ** 2
+    half_chord += (y[:, None] - y) ** 2
+    half_chord += (z[:, None] - z) ** 2
+    np.sqrt(half_chord, out=half_chord)
+    half_chord *= 0.5
+    np.minimum(half_chord, 1.0, out=half_chord)
+    return 2 * EARTH_RADIUS_M * np.arcsin(half_chord, out=half_chord)
+
+
+def haversine_minutes(points, speed_kmh=OFFLINE_SPEED_KMH):
+    """
+    Travel-time matrix (minutes) estimated from straight-line distance.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return haversine_matrix(points[:, 0], points[:, 1]) / (speed_kmh * 1000.0 / 60.0)
+
+
+class DistanceMatrixCache:
+    """
+    Travel-time matrices from the Google Maps Distance Matrix API, cached per
+    (origin, destination) pair, with Haversine estimates for anything the API
+    could not answer. At most max_pairs pairs are kept, least recently used first out.
+    """
+    def __init__(self, maps_client=None, ttl=6 * 3600, mode="driving", max_pairs=500_000):
+        self.gmaps = traced(maps_client, "maps")
+        self.ttl = ttl
+        self.mode = mode
+        self.max_pairs = max_pairs
+        self._pairs = OrderedDict()  # (origin key, destination key) -> (expires, minutes)
+        self._lock = threading.Lock()
+
+    def minutes(self, points, keys=None):
+        """
+        Travel-time matrix in minutes for points [(lat, lng), ...].
+        Args:
+            points (list): Coordinates.
+            keys (list): Stable ids for the cache (e.g. place_id); defaults to rounded coordinates.
+        """
+        matrix = haversine_minutes(points)
+        if self.gmaps is None or len(points) < 2:
+            return matrix
+        keys = keys or [f"{lat:.5f},{lng:.5f}" for lat, lng in points]
+        now = time.time()
+        missing_rows = set()
+        with self._lock:
+            for i, origin in enumerate(keys):
+                for j, destination in enumerate(keys):
+                    if i == j:
+                        continue
+                    entry = self._pairs.get((origin, destination))
+                    if entry is not None and entry[0] > now:
+                        self._pairs.move_to_end((origin, destination))
+                        matrix[i, j] = entry[1]
+                    else:
+                        missing_rows.add(i)
+        if missing_rows:
+            self._fetch(points, keys, sorted(missing_rows), matrix, now)
+        return matrix
+
+    def _fetch(self, points, keys, rows, matrix, now):
+        columns = list(range(len(points)))
+        fetched = {}
+        for row_start in range(0, len(rows), MAPS_MATRIX_CHUNK):
+            origins = rows[row_start:row_start + MAPS_MATRIX_CHUNK]
+            for col_start in range(0, len(columns), MAPS_MATRIX_CHUNK):
+                destinations = columns[col_start:col_start + MAPS_MATRIX_CHUNK]
+                try:
+                    response = self.gmaps.distance_matrix(
+                        [points[i] for i in origins], [points[j] for j in destinations], mode=self.mode
+                    )
+                except Exception:
+                    # Offline or quota exhausted: keep the Haversine estimates
+                    return
+                # A short response leaves the remaining pairs at their estimates
+                for i, row in zip(origins, response.get('rows', []), strict=False):
+                    for j, element in zip(destinations, row.get('elements', []), strict=False):
+                        if element.get('status') == 'OK' and i != j:
+                            minutes = element['duration']['value'] / 60.0
+                            matrix[i, j] = minutes
+                            fetched[(keys[i], keys[j])] = (now + self.ttl, minutes)
+        with self._lock:
+            self._pairs.update(fetched)
+            for pair in fetched:
+                self._pairs.move_to_end(pair)
+            while len(self._pairs) > self.max_pairs:
+                self._pairs.popitem(last=False)
+
+
+def time_window(place, day_start=DAY_START_MINUTES, day_end=DAY_END_MINUTES):
+    """
+    (open, close) in minutes after midnight for a stop. Uses place['window'] if set,
+    otherwise the first period of opening_hours, otherwise the whole day.
+    """
+    window = place.get('window')
+    if window:
+        return float(window[0]), float(window[1])
+    periods = (place.get('opening_hours') or {}).get('periods') or []
+    if periods and 'open' in periods[0] and 'close' in periods[0]:
+        opens = _hhmm_to_minutes(periods[0]['open'].get('time', '0000'))
+        closes = _hhmm_to_minutes(periods[0]['close'].get('time', '2359'))
+        if closes <= opens:
+            closes = 24 * 60
+        return float(opens), float(closes)
+    return float(day_start), float(day_end)
+
+
+def _hhmm_to_minutes(value):
+    value = str(value).zfill(4)
+    return int(value[:2]) * 60 + int(value[2:])
+
+
+class _Problem:
+    """
+    Stops plus a virtual start and end node: index 0 is the start (hotel, or a
+    zero-cost virtual depot), index n+1 is a zero-cost virtual end so the day is an open path.
+    """
+    def __init__(self, travel, opens, closes, visits, day_start, day_end):
+        self.travel = travel
+        self.opens = opens
+        self.closes = closes
+        self.visits = visits
+        self.day_start = day_start
+        self.day_end = day_end
+        self.end = len(travel) - 1
+        # Latest start of each visit that still ends within its window and the day
+        self.latest = np.minimum(closes, day_end) - visits
+        # Per-stop values as Python floats for the sequential scans below
+        self._opens = opens.tolist()
+        self._visits = visits.tolist()
+        self._latest = self.latest.tolist()
+
+    def schedule(self, route):
+        """
+        Start times for each stop of route (excluding depot/end), or None if a window is violated.
+        """
+        t = self.day_start
+        starts = []
+        for node, leg in zip(route[1:], self.legs(route), strict=True):
+            t += leg
+            if node == self.end:
+                break
+            t = max(t, self._opens[node])
+            if t > self._latest[node]:
+                return None
+            starts.append(t)
+            t += self._visits[node]
+        return starts
+
+    def cost(self, route):
+        route = np.asarray(route)
+        return float(self.travel[route[:-1], route[1:]].sum())
+
+    def slack(self, route):
+        """
+        Start time of every position of a feasible route (depot and end included), and
+        how far each position's start can be pushed back without breaking a later window.
+        """
+        begin = [self.day_start]
+        wait = [0.0]
+        t = self.day_start
+        for (previous, node), leg in zip(itertools.pairwise(route), self.legs(route), strict=True):
+            arrival = t + self._visits[previous] + leg
+            t = max(arrival, self._opens[node]) if node != self.end else arrival
+            begin.append(t)
+            wait.append(t - arrival)
+        max_shift = [np.inf] * len(route)
+        for k in range(len(route) - 2, 0, -1):
+            max_shift[k] = min(self._latest[route[k]] - begin[k], wait[k + 1] + max_shift[k + 1])
+        return np.array(begin), np.array(max_shift)
+
+    def legs(self, route):
+        """
+        Travel minutes of each leg of route, as Python floats.
+        """
+        route = np.asarray(route)
+        return self.travel[route[:-1], route[1:]].tolist()
+
+
+def plan_day(stops, start=None, day_start=DAY_START_MINUTES, day_end=DAY_END_MINUTES,
+             matrix=None, distance_cache=None, time_budget_ms=5.0, construction_rules=CONSTRUCTION_RULES):
+    """
+    Order one day's stops to minimise travel time within opening hours.
+    Args:
+        stops (list[dict]): Places API results (geometry.location required); optional
+            'window' (open, close) minutes, 'opening_hours.periods', 'visit_minutes'.
+        start (tuple): Optional (lat, lng) the day starts from, e.g. the hotel.
+        day_start, day_end (int): Day bounds in minutes after midnight.
+        matrix (np.ndarray): Optional precomputed travel minutes between stops (n x n).
+        distance_cache (DistanceMatrixCache): Source of travel times when matrix is not given.
+        time_budget_ms (float): Wall-clock budget for the whole plan, counted from the call
+            (a Haversine matrix built here included; Maps fetches are not bounded by it).
+        construction_rules (tuple): Nearest-neighbour rules for the first route (see
+            CONSTRUCTION_RULES); the first always runs, each other one if the budget left
+            covers the time the previous one took.
+    Returns:
+        dict: "stops" in visiting order with "arrival"/"departure" minutes, "travel" from
+        the previous stop and "closes" (latest departure), "dropped" stops that could not
+        be fitted, and total "travel_minutes".
+    """
+    deadline = time.perf_counter() + time_budget_ms * (1.0 - FINISH_RESERVE) / 1000.0
+    located = [(stop, place_location(stop)) for stop in stops]
+    dropped = [stop for stop, point in located if point is None]
+    located = [(stop, point) for stop, point in located if point is not None]
+    if not located:
+        return {"stops": [], "dropped": dropped, "travel_minutes": 0.0}
+    places = [stop for stop, _ in located]
+    points = [point for _, point in located]
+    n = len(points)
+
+    if matrix is None:
+        if distance_cache is not None:
+            keys = [stop.get('place_id') for stop in places]
+            matrix = distance_cache.minutes(points, keys if all(keys) else None)
+        else:
+            matrix = haversine_minutes(points)
+    travel = np.zeros((n + 2, n + 2))
+    travel[1:n + 1, 1:n + 1] = matrix
+    if start is not None:
+        from_start = haversine_minutes([start, *points])[0, 1:]
+        travel[0, 1:n + 1] = from_start
+    windows = [time_window(stop, day_start, day_end) for stop in places]
+    opens = np.array([day_start] + [w[0] for w in windows] + [day_start], dtype=np.float64)
+    closes = np.array([day_end] + [w[1] for w in windows] + [day_end], dtype=np.float64)
+    visits = np.array([0.0] + [float(stop.get('visit_minutes', DEFAULT_VISIT_MINUTES)) for stop in places] + [0.0])
+    problem = _Problem(travel, opens, closes, visits, day_start, day_end)
+
+    candidates, elapsed = [], 0.0
+    for rule in construction_rules:
+        began = time.perf_counter()
+        # Another rule only if the budget left covers what the last one took
+        if candidates and deadline - began < elapsed:
+            break
+        candidates.append(_insert_dropped(problem, *_nearest_neighbour(problem, *rule), deadline)[:2])
+        elapsed = time.perf_counter() - began
+    route, unvisited = min(candidates, key=lambda plan: (len(plan[1]), problem.cost(plan[0])))
+    # A shorter route leaves room for more stops, and each insertion opens new moves
+    while time.perf_counter() < deadline:
+        route = _improve(problem, route, deadline)
+        route, unvisited, inserted = _insert_dropped(problem, route, unvisited, deadline)
+        if not inserted:
+            break
+
+    starts = problem.schedule(route)
+    visit_minutes = visits.tolist()
+    latest_departure = np.minimum(closes, day_end).tolist()
+    ordered = []
+    # The leg into the end node is left over: zip stops with the starts
+    for node, begin, leg in zip(route[1:-1], starts, problem.legs(route), strict=False):
+        stop = dict(places[node - 1])
+        stop['arrival'] = begin
+        stop['departure'] = begin + visit_minutes[node]
+        stop['travel'] = leg
+        stop['closes'] = latest_departure[node]
+        ordered.append(stop)
+    dropped.extend(places[node - 1] for node in unvisited)
+    return {"stops": ordered, "dropped": dropped, "travel_minutes": problem.cost(route)}
+
+
+def _nearest_neighbour(problem, visit_weight=0.0, urgency=0.0):
+    end = problem.end
+    latest, opens, travel = problem.latest, problem.opens, problem.travel
+    # score = (1 - urgency) * start + offset; offset holds the per-stop terms and is
+    # +inf for the depot, the end and every stop already on the route
+    offset = visit_weight * problem.visits + urgency * latest
+    offset[0] = offset[end] = np.inf
+    weight = 1.0 - urgency
+    begin = np.empty(end + 1)
+    score = np.empty(end + 1)
+    route = [0]
+    current, t = 0, float(problem.day_start)
+    while True:
+        # Earliest possible start: travel plus waiting for the stop to open
+        np.add(travel[current], t, out=begin)
+        np.maximum(begin, opens, out=begin)
+        if weight == 1.0:
+            np.add(begin, offset, out=score)
+        else:
+            np.multiply(begin, weight, out=score)
+            score += offset
+        np.putmask(score, begin > latest, np.inf)
+        node = int(score.argmin())
+        if score[node] == np.inf:
+            break
+        route.append(node)
+        offset[node] = np.inf
+        t = begin[node] + problem.visits[node]
+        current = node
+    route.append(end)
+    return route, [int(node) for node in np.flatnonzero(offset[1:end] != np.inf) + 1]
+
+
+def _improve(problem, route, deadline):
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = _two_opt_pass(problem, route, deadline) or _or_opt_pass(problem, route, deadline)
+    return route
+
+
+def _two_opt_pass(problem, route, deadline):
+    d = problem.travel
+    nodes = np.asarray(route)
+    size = len(route)
+    for i in range(0, size - 3):
+        if time.perf_counter() >= deadline:
+            return False
+        a, b = nodes[i], nodes[i + 1]
+        js = np.arange(i + 2, size - 1)
+        c, e = nodes[js], nodes[js + 1]
+        # Reversing route[i+1..j]; exact for symmetric matrices, verified below otherwise
+        delta = d[a, c] + d[b, e] - d[a, b] - d[c, e]
+        for k in np.argsort(delta)[:3]:
+            if delta[k] >= -1e-9:
+                break
+            j = int(js[k])
+            candidate = [*route[:i + 1], *route[i + 1:j + 1][::-1], *route[j + 1:]]
+            if problem.cost(candidate) < problem.cost(route) - 1e-9 and problem.schedule(candidate) is not None:
+                route[:] = candidate
+                return True
+    return False
+
+
+def _or_opt_pass(problem, route, deadline):
+    d = problem.travel
+    size = len(route)
+    for length in (1, 2, 3):
+        for i in range(1, size - 1 - length):
+            if time.perf_counter() >= deadline:
+                return False
+            segment = route[i:i + length]
+            prev, nxt = route[i - 1], route[i + length]
+            removal_gain = d[prev, segment[0]] + d[segment[-1], nxt] - d[prev, nxt]
+            rest = np.asarray([*route[:i], *route[i + length:]])
+            u, v = rest[:-1], rest[1:]
+            insertion_cost = d[u, segment[0]] + d[segment[-1], v] - d[u, v]
+            delta = insertion_cost - removal_gain
+            for k in np.argsort(delta)[:3]:
+                if delta[k] >= -1e-9:
+                    break
+                position = int(k) + 1
+                rest_list = rest.tolist()
+                candidate = [*rest_list[:position], *segment, *rest_list[position:]]
+                if problem.cost(candidate) < problem.cost(route) - 1e-9 and problem.schedule(candidate) is not None:
+                    route[:] = candidate
+                    return True
+    return False
+
+
+def _insert_dropped(problem, route, unvisited, deadline):
+    # Greedy insertion: while any dropped stop fits somewhere, insert the (stop, position)
+    # that pushes the rest of the day back the least. All candidates are checked at once
+    # against the route's slack, so each insertion costs O(dropped x route) vector work.
+    d = problem.travel
+    unvisited = list(unvisited)
+    inserted = False
+    while unvisited and time.perf_counter() < deadline:
+        begin, max_shift = problem.slack(route)
+        nodes = np.asarray(route)
+        u, v = nodes[:-1], nodes[1:]
+        x = np.asarray(unvisited)[:, None]
+        begin_x = np.maximum(begin[:-1] + problem.visits[u] + d[x, u], problem.opens[x])
+        arrival_v = begin_x + problem.visits[x] + d[x, v]
+        # The end node has no window: its "start" is the arrival
+        shift = np.where(v == problem.end, arrival_v, np.maximum(arrival_v, problem.opens[v])) - begin[1:]
+        fits = (begin_x <= problem.latest[x]) & (shift <= max_shift[1:])
+        cost = np.where(fits, shift, np.inf)
+        best = int(np.argmin(cost))
+        if cost.flat[best] == np.inf:
+            break
+        row, position = divmod(best, cost.shape[1])
+        route = [*route[:position + 1], unvisited.pop(row), *route[position + 1:]]
+        inserted = True
+    return route, unvisited, inserted
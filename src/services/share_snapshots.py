@@ -0,0 +1,353 @@
+"""
+Personalized Trip Planner - Share Snapshots
+
+Pre-rendered, immutable exports of an itinerary for shareable links. When a link
+is created the itinerary is rendered once as HTML, JSON and an ICS calendar and
+written to an artifact store (local directory or GCS bucket) under a path
+containing its content hash:
+
+    share/<itinerary_id>/<hash>/index.html | itinerary.json | itinerary.ics
+
+Those files never change, so they are served with a year-long immutable
+Cache-Control and a hash-based ETag, and repeat views are answered by the CDN or
+bucket, never by the app. share/<itinerary_id>/index.html is a small pointer to
+the current snapshot with a short max-age, so a shared link follows later
+versions. Snapshots are re-rendered only when the itinerary version (or, without
+one, its content hash) or its cost breakdown changes.
+
+The headers above are set on the objects by GCSArtifactStore. LocalArtifactStore
+can only record them in sidecar files; applying them is left to whatever serves
+its directory (a CDN origin rule or web server config in the deployment), since
+the app itself does not serve snapshots.
+"""
+
+import datetime
+import hashlib
+import html
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from src.services.codecs import dumps_json
+from src.services.interfaces.artifact_store import ArtifactStoreInterface
+from src.services.itinerary_model import Itinerary
+from src.services.tracing import span
+
+try:
+    from google.cloud import storage as gcs
+except ImportError:
+    gcs = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# The pointer to the current snapshot is re-checked by caches every minute
+POINTER_MAX_AGE = "public, max-age=60"
+HASH_LENGTH = 16
+# DTSTAMP for itineraries without 'updated_at', keeping ICS output deterministic
+ICS_EPOCH = "20000101T000000Z"
+
+
+class LocalArtifactStore(ArtifactStoreInterface):
+    """
+    Artifacts as files under root, each with a <file>.headers.json sidecar holding the
+    Content-Type, Cache-Control and ETag a static server or CDN origin should send.
+    The sidecars are not served or applied by anything here: the origin serving root
+    must be configured to send them (and to not serve the sidecars themselves).
+    """
+    def __init__(self, root, base_url="/"):
+        self.root = root
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+
+    def put(self, key, data, content_type, cache_control, etag):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        headers = {"Content-Type": content_type, "Cache-Control": cache_control, "ETag": etag}
+        for target, payload in ((f"{path}.headers.json", json.dumps(headers).encode("utf-8")), (path, data)):
+            partial = f"{target}.tmp"
+            with open(partial, "wb") as handle:
+                handle.write(payload)
+            os.replace(partial, target)
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def url(self, key):
+        return self.base_url + key
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+
+class GCSArtifactStore(ArtifactStoreInterface):
+    """
+    Artifacts as objects in a Cloud Storage bucket; Cache-Control is set on the object
+    (GCS computes its own ETag from the content, the hash ETag is kept as metadata).
+    """
+    def __init__(self, bucket_name, client=None, base_url=None):
+        if client is None:
+            if gcs is None:
+                raise ImportError("google-cloud-storage is required for GCSArtifactStore")
+            client = gcs.Client()
+        self.bucket = client.bucket(bucket_name)
+        self.base_url = base_url or f"https://storage.googleapis.com/{bucket_name}/"
+
+    def put(self, key, data, content_type, cache_control, etag):
+        blob = self.bucket.blob(key)
+        blob.cache_control = cache_control
+        blob.metadata = {"content-hash": etag.strip('"')}
+        with span("gcs.upload", object_bytes=len(data)):
+            blob.upload_from_string(data, content_type=content_type)
+
+    def exists(self, key):
+        with span("gcs.exists"):
+            return self.bucket.blob(key).exists()
+
+    def url(self, key):
+        return self.base_url + key
+
+
+class ShareSnapshotService:
+    def __init__(self, store, max_entries=10_000, ttl=60.0, clock=time.monotonic):
+        self.store = store
+        self.max_entries = max_entries
+        self.ttl = ttl  # Seconds a published snapshot is reused without re-reading its itinerary
+        self.clock = clock
+        self._published = OrderedDict()  # itinerary_id -> (checked_at, version or hash, cost, snapshot)
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.reused = 0
+
+    def publish(self, itinerary, cost=None):
+        """
+        Snapshot an itinerary, rendering and uploading only if this version has not been published.
+        Args:
+            itinerary (dict): Itinerary payload with 'id' (and optionally 'version').
+            cost (dict): Cost breakdown to include.
+        Returns:
+            dict: 'link' (stable pointer URL), 'hash', 'version' and the URL of each export.
+        """
+        itinerary_id = itinerary['id']
+        version = itinerary.get('version')
+        with self._lock:
+            published = self._published.get(itinerary_id)
+        if published is not None and version is not None and published[1] == version and published[2] == cost:
+            self.reused += 1
+            snapshot = published[3]
+        else:
+            content = _snapshot_content(itinerary, cost)
+            digest = hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:HASH_LENGTH]
+            if published is not None and published[3]['hash'] == digest:
+                self.reused += 1
+                snapshot = published[3]
+            else:
+                snapshot = self._render(itinerary_id, digest, content)
+            version = version if version is not None else digest
+        with self._lock:
+            self._published[itinerary_id] = (self.clock(), version, cost, snapshot)
+            self._published.move_to_end(itinerary_id)
+            while len(self._published) > self.max_entries:
+                self._published.popitem(last=False)
+        return snapshot
+
+    def current(self, itinerary_id, cost=None):
+        """
+        Snapshot published within the TTL with this cost breakdown, so a repeat share
+        needs no itinerary read; None if the itinerary must be read and published.
+        """
+        with self._lock:
+            published = self._published.get(itinerary_id)
+            if published is None or self.clock() - published[0] >= self.ttl or published[2] != cost:
+                return None
+            self._published.move_to_end(itinerary_id)
+            self.reused += 1
+            return published[3]
+
+    def invalidate(self, itinerary_id):
+        """
+        Make the next share re-read the itinerary (after it changed in this process).
+        """
+        with self._lock:
+            published = self._published.get(itinerary_id)
+            if published is not None:
+                # Kept for the version/hash comparison in publish(), so unchanged content is not re-rendered
+                self._published[itinerary_id] = (float("-inf"), *published[1:])
+
+    def _render(self, itinerary_id, digest, content):
+        prefix = f"share/{itinerary_id}/{digest}"
+        artifacts = {
+            "html": (f"{prefix}/index.html", "text/html; charset=utf-8", render_html),
+            "json": (f"{prefix}/itinerary.json", "application/json", lambda data: dumps_json(data)),
+            "ics": (f"{prefix}/itinerary.ics", "text/calendar; charset=utf-8", render_ics),
+        }
+        snapshot = {"hash": digest, "version": content.get('version')}
+        # Another instance may already have rendered this hash: the content is identical
+        if not self.store.exists(artifacts["json"][0]):
+            self.renders += 1
+            for name, (key, content_type, render) in artifacts.items():
+                body = render(content)
+                self.store.put(key, body if isinstance(body, bytes) else body.encode("utf-8"), content_type, IMMUTABLE, f'"{digest}-{name}"')
+        else:
+            self.reused += 1
+        for name, (key, _, _) in artifacts.items():
+            snapshot[name] = self.store.url(key)
+        pointer = f"share/{itinerary_id}/index.html"
+        self.store.put(pointer, _pointer_html(snapshot["html"]).encode("utf-8"), "text/html; charset=utf-8", POINTER_MAX_AGE, f'"{digest}-pointer"')
+        snapshot["link"] = self.store.url(pointer)
+        return snapshot
+
+
+def render_html(content):
+    """
+    Standalone HTML page (no scripts, inline styles) for a snapshot.
+    """
+    escape = html.escape
+    parts = [
+        "<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\">",
+        "<meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">",
+        f"<title>{escape(content.get('destination') or 'Trip itinerary')}</title>",
+        "<style>body{font-family:system-ui,sans-serif;max-width:48rem;margin:2rem auto;padding:0 1rem;color:#222}"
+        "h2{border-bottom:1px solid #ddd;padding-bottom:.25rem}li{margin:.25rem 0}.time{color:#666;margin-right:.5rem}"
+        "table{border-collapse:collapse}td{padding:.2rem .8rem .2rem 0}</style></head><body>",
+        f"<h1>{escape(content.get('destination') or 'Trip itinerary')}</h1>",
+    ]
+    if content.get('summary'):
+        parts.append(f"<p>{escape(str(content['summary']))}</p>")
+    for day in content['days']:
+        title = day.get('title') or f"Day {day['index'] + 1}"
+        parts.append(f"<h2>{escape(str(title))}{' - ' + escape(day['date']) if day.get('date') else ''}</h2><ul>")
+        for activity in day['activities']:
+            time_range = _time_range(activity)
+            parts.append(
+                "<li>"
+                + (f"<span class=\"time\">{time_range}</span>" if time_range else "")
+                + escape(str(activity.get('name') or 'Activity'))
+                + (f" - {escape(str(activity['description']))}" if activity.get('description') else "")
+                + "</li>"
+            )
+        parts.append("</ul>")
+    if content['places']:
+        parts.append("<h2>Places</h2><ul>")
+        for place in content['places']:
+            address = f" - {escape(place['address'])}" if place.get('address') else ""
+            parts.append(f"<li>{escape(str(place.get('name') or ''))}{address}</li>")
+        parts.append("</ul>")
+    cost = content.get('cost')
+    if cost:
+        currency = escape(cost.get('currency', ''))
+        parts.append(f"<h2>Cost</h2><p>Total: {currency} {escape(str(cost.get('total')))}</p><table>")
+        for category, subtotal in (cost.get('categories') or {}).items():
+            parts.append(f"<tr><td>{escape(category)}</td><td>{currency} {escape(str(subtotal))}</td></tr>")
+        parts.append("</table>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def render_ics(content):
+    """
+    iCalendar export: one event per activity on a dated day (timed when it has a start time).
+    """
+    stamp = _ics_stamp(content.get('updated_at'))
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Personalized Trip Planner//Share Snapshot//EN", "CALSCALE:GREGORIAN"]
+    for day in content['days']:
+        date = _day_date(content.get('start_date'), day)
+        if date is None:
+            continue
+        for index, activity in enumerate(day['activities']):
+            lines += ["BEGIN:VEVENT", f"UID:{content['id']}-{day['index']}-{index}@trip-planner", f"DTSTAMP:{stamp}"]
+            start, end = activity.get('start'), activity.get('end')
+            if start is None:
+                lines += [f"DTSTART;VALUE=DATE:{date:%Y%m%d}", f"DTEND;VALUE=DATE:{date + datetime.timedelta(days=1):%Y%m%d}"]
+            else:
+                begins = datetime.datetime.combine(date, datetime.time()) + datetime.timedelta(minutes=start)
+                ends = datetime.datetime.combine(date, datetime.time()) + datetime.timedelta(minutes=end if end is not None else start + 60)
+                lines += [f"DTSTART:{begins:%Y%m%dT%H%M%S}", f"DTEND:{ends:%Y%m%dT%H%M%S}"]
+            lines.append(f"SUMMARY:{_ics_text(activity.get('name') or 'Activity')}")
+            if activity.get('description'):
+                lines.append(f"DESCRIPTION:{_ics_text(activity['description'])}")
+            lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
+
+
+def _snapshot_content(itinerary, cost):
+    # Only what the exports show, so unrelated fields (analytics, conditions) do not change the hash
+    model = Itinerary.from_payload(itinerary)
+    preferences = itinerary.get('preferences') or {}
+    return {
+        'id': itinerary['id'],
+        'version': itinerary.get('version'),
+        'updated_at': itinerary.get('updated_at'),
+        'destination': model.destination,
+        'summary': model.summary,
+        'start_date': itinerary.get('start_date') or preferences.get('start_date'),
+        'days': [{'activities': [], **day.to_dict()} for day in model.days],
+        'places': [{'name': place.name, 'address': place.address} for place in model.locations],
+        'cost': cost,
+    }
+
+
+def _pointer_html(target):
+    target = html.escape(target, quote=True)
+    return (
+        f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><link rel=\"canonical\" href=\"{target}\">"
+        f"<meta http-equiv=\"refresh\" content=\"0; url={target}\"></head>"
+        f"<body><a href=\"{target}\">View itinerary</a></body></html>"
+    )
+
+
+def _time_range(activity):
+    if activity.get('start') is None:
+        return ""
+    start = _hhmm(activity['start'])
+    return f"{start}-{_hhmm(activity['end'])}" if activity.get('end') is not None else start
+
+
+def _hhmm(minutes):
+    minutes = int(minutes)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _day_date(start_date, day):
+    try:
+        if day.get('date'):
+            return datetime.date.fromisoformat(str(day['date'])[:10])
+        if start_date:
+            return datetime.date.fromisoformat(str(start_date)[:10]) + datetime.timedelta(days=day['index'])
+    except ValueError:
+        return None
+    return None
+
+
+def _ics_stamp(value):
+    # 'updated_at' as epoch seconds or ISO 8601, in UTC
+    try:
+        if isinstance(value, (int, float)):
+            when = datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
+        elif value:
+            when = datetime.datetime.fromisoformat(str(value))
+            when = when.astimezone(datetime.timezone.utc) if when.tzinfo else when
+        else:
+            return ICS_EPOCH
+    except ValueError:
+        return ICS_EPOCH
+    return f"{when:%Y%m%dT%H%M%S}Z"
+
+
+def _ics_text(value):
+    return str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fold(line):
+    # RFC 5545: lines longer than 75 octets continue on the next line after a space
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    parts, start = [], 0
+    while start < len(encoded):
+        end = min(start + (75 if not parts else 74), len(encoded))
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1  # Do not split a UTF-8 sequence
+        parts.append(encoded[start:end].decode("utf-8"))
+        start = end
+    return "\r\n ".join(parts)
@@ -2,24 +2,146 @@
 Personalized Trip Planner - Testing & Feedback Service
 
 Handles user testing, feedback collection, and iteration using Firebase and BigQuery.
+Analytics are served from running aggregates (feedback_analytics.py) updated as
+feedback is collected; the raw feedback table is read by the paginated export and,
+once at startup when there is no analytics checkpoint, by one aggregate query that
+seeds the aggregates. The table is the one BigQuerySink streams feedback rows into.
 """
 
+import base64
+
+from google.cloud import bigquery
+
+from src.services.async_support import call
+from src.services.codecs import dumps_json, loads_json
+from src.services.feedback_analytics import FeedbackAnalytics
+from src.services.feedback_ingestion import FEEDBACK_ROWS_TABLE
+from src.services.tracing import traced
+
+# Rows written by feedback_ingestion.BigQuerySink: feedback_id, user_id, feedback (JSON text), submitted_at
+FEEDBACK_TABLE = FEEDBACK_ROWS_TABLE
+# Keyset pagination: rows are exported in (submitted_at, feedback_id) order
+EXPORT_SQL = f"""
+    SELECT feedback_id, user_id, feedback, submitted_at FROM `{FEEDBACK_TABLE}`
+    WHERE submitted_at > @after_at OR (submitted_at = @after_at AND feedback_id > @after_id)
+    ORDER BY submitted_at, feedback_id
+    LIMIT @limit
+"""
+# The aggregates FeedbackAnalytics.seed() folds in, one row per (dimension, key, rating);
+# 'user' rows list the distinct users for the distinct-user sketch
+ANALYTICS_SEED_SQL = f"""
+    WITH parsed AS (
+        SELECT
+            user_id,
+            submitted_at,
+            LEAST(GREATEST(CAST(ROUND(SAFE_CAST(JSON_VALUE(feedback, '$.rating') AS FLOAT64)) AS INT64), 1), 5) AS rating,
+            LOWER(TRIM(JSON_VALUE(feedback, '$.destination'))) AS destination,
+            ARRAY_CONCAT(
+                IFNULL(JSON_VALUE_ARRAY(feedback, '$.features'), []),
+                IF(JSON_VALUE(feedback, '$.feature') IS NULL, [], [JSON_VALUE(feedback, '$.feature')])
+            ) AS features
+        FROM `{FEEDBACK_TABLE}`
+    )
+    SELECT 'total' AS dimension, CAST(NULL AS STRING) AS key, rating, COUNT(*) AS count, MAX(submitted_at) AS last_at
+    FROM parsed GROUP BY rating
+    UNION ALL
+    SELECT 'destination', destination, rating, COUNT(*), MAX(submitted_at)
+    FROM parsed WHERE destination IS NOT NULL AND destination != '' GROUP BY destination, rating
+    UNION ALL
+    SELECT 'feature', LOWER(TRIM(feature)), rating, COUNT(*), MAX(submitted_at)
+    FROM parsed, UNNEST(features) AS feature WHERE TRIM(feature) != '' GROUP BY 2, rating
+    UNION ALL
+    SELECT 'user', user_id, NULL, COUNT(*), MAX(submitted_at)
+    FROM parsed WHERE user_id IS NOT NULL GROUP BY user_id
+"""
+EXPORT_START = ("1970-01-01T00:00:00", "")
+MAX_PAGE_SIZE = 5000
+
 
 class TestingFeedbackService:
-    def __init__(self, firebase_client, bigquery_client):
-        self.firebase = firebase_client
-        self.bigquery = bigquery_client
+    def __init__(self, firebase_client, bigquery_client, analytics=None):
+        self.firebase = traced(firebase_client, "firebase")
+        self.bigquery = traced(bigquery_client, "bigquery")
+        self.analytics = analytics if analytics is not None else FeedbackAnalytics()
 
     def collect_feedback(self, user_id, feedback):
         """
-        Store user feedback in Firebase.
+        Store user feedback in Firebase and fold it into the running analytics.
         """
         self.firebase.save_feedback(user_id, feedback)
+        self.analytics.record(user_id, feedback)
+
+    def seed_analytics(self):
+        """
+        Seed empty analytics (no checkpoint restored, nothing recorded yet) with one
+        aggregate query over the feedback table; call once at startup.
+        Returns:
+            bool: Whether the aggregates were seeded.
+        """
+        if not self.analytics.is_empty():
+            return False
+        self.analytics.seed(dict(row) for row in self.bigquery.query(ANALYTICS_SEED_SQL))
+        return True
 
     def analyze_feedback(self):
         """
-        Analyze feedback using BigQuery (actual query integration).
+        Feedback analytics (counts, rating histograms, per-destination and per-feature
+        rollups, distinct users) from this process's in-memory aggregates.
+        """
+        return self.analytics.snapshot()
+
+    def export_feedback(self, page_size=1000, page_token=None):
+        """
+        One page of raw feedback rows from BigQuery.
+        Args:
+            page_size (int): Rows per page (at most MAX_PAGE_SIZE).
+            page_token (str): Token from the previous page; None for the first page.
+        Returns:
+            dict: 'rows' and 'next_page_token' (None on the last page).
         """
-        query = "SELECT * FROM `your_project.your_dataset.feedback`"
-        results = self.bigquery.query(query)
-        return [dict(row) for row in results]
+        query, job_config, limit = self._export_query(page_size, page_token)
+        rows = [dict(row) for row in self.bigquery.query(query, job_config=job_config)]
+        return _export_page(rows, limit)
+
+    async def acollect_feedback(self, user_id, feedback):
+        await call(self.firebase.save_feedback, user_id, feedback)
+        self.analytics.record(user_id, feedback)
+
+    async def aanalyze_feedback(self):
+        return self.analytics.snapshot()
+
+    async def aexport_feedback(self, page_size=1000, page_token=None):
+        query, job_config, limit = self._export_query(page_size, page_token)
+        rows = [dict(row) for row in await call(self.bigquery.query, query, job_config=job_config)]
+        return _export_page(rows, limit)
+
+    def _export_query(self, page_size, page_token):
+        limit = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        after_at, after_id = _decode_token(page_token) if page_token else EXPORT_START
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("after_at", "TIMESTAMP", after_at),
+            bigquery.ScalarQueryParameter("after_id", "STRING", after_id),
+            bigquery.ScalarQueryParameter("limit", "INT64", limit),
+        ])
+        return EXPORT_SQL, job_config, limit
+
+
+def _export_page(rows, limit):
+    next_page_token = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_page_token = _encode_token(last.get('submitted_at'), last.get('feedback_id'))
+    return {"rows": rows, "next_page_token": next_page_token}
+
+
+def _encode_token(submitted_at, feedback_id):
+    value = submitted_at.isoformat() if hasattr(submitted_at, "isoformat") else submitted_at
+    return base64.urlsafe_b64encode(dumps_json([value, feedback_id])).decode("ascii")
+
+
+def _decode_token(token):
+    try:
+        after_at, after_id = loads_json(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid page token") from exc
+    return after_at, after_id
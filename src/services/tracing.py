@@ -0,0 +1,274 @@
+"""
+Personalized Trip Planner - Tracing
+
+OpenTelemetry spans for every external call the services make. traced(client, name)
+wraps a client (Gemini, Maps, BigQuery, Firebase, EMT, payments, ...) in a proxy
+that opens a "<name>.<method>" span per call, sync or async, recording errors,
+request/response payload sizes and any attributes the service adds with
+annotate() (cache hits, retry counts). span() and instrument() cover service
+operations and agent steps; bind() carries the current span into thread pools.
+
+configure_tracing() installs the provider: OTLP or a local JSON-lines file, behind
+a parent-based ratio sampler so a sampled request is traced end to end. Under an
+unsampled request no child spans are created at all, and payload sizes are only
+computed for sampled spans. Without the OpenTelemetry packages everything here is a no-op.
+"""
+
+import contextlib
+import contextvars
+import functools
+import inspect
+import threading
+import types
+
+from src.services.codecs import dumps_json
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+try:
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        BatchSpanProcessor,
+        SpanExporter,
+        SpanExportResult,
+    )
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+except ImportError:
+    TracerProvider = None
+    SpanExporter = object
+
+SERVICE_NAME = "trip-planner"
+# Fraction of new traces recorded; child spans follow their parent's decision
+DEFAULT_SAMPLE_RATE = 0.01
+
+_tracer = trace.get_tracer("src.services") if trace is not None else None
+
+
+def span(name, **attributes):
+    """
+    Context manager for a span around a block of service code; attribute names
+    use underscores for dots (cache_hit -> cache.hit).
+    """
+    if _tracer is None or _unsampled():
+        return contextlib.nullcontext()
+    return _tracer.start_as_current_span(name, attributes=_attributes(attributes))
+
+
+def annotate(**attributes):
+    """
+    Add attributes (e.g. cache_hit=True, retry_count=2) to the current span, if it is sampled.
+    """
+    if trace is None:
+        return
+    current = trace.get_current_span()
+    if current.is_recording():
+        current.set_attributes(_attributes(attributes))
+
+
+def instrument(name):
+    """
+    Decorator running a function (an agent step, a service operation) in a span;
+    coroutine functions stay coroutine functions, with the span around the await.
+    """
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def bind(fn):
+    """
+    fn bound to the caller's context, so spans it opens on a pool thread keep their parent.
+    """
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+def traced(client, name):
+    """
+    Wrap a client so every method call runs in a "<name>.<method>" client span.
+    Args:
+        client: Any client object; None and already traced clients are returned as they are.
+        name (str): Dependency name used as span prefix and peer.service.
+    Returns:
+        TracedClient: Proxy forwarding everything to the client.
+    """
+    if client is None or _tracer is None or isinstance(client, TracedClient):
+        return client
+    return TracedClient(client, name)
+
+
+class TracedClient:
+    """
+    Proxy that traces method calls; other attributes are the client's own.
+    Async methods stay coroutine functions, so async_support.call() still finds them.
+    """
+    def __init__(self, client, name):
+        object.__setattr__(self, "_client", client)
+        object.__setattr__(self, "_name", name)
+
+    def __getattr__(self, attribute):
+        value = getattr(self._client, attribute)
+        if not callable(value) or attribute.startswith("_") or inspect.isclass(value):
+            return value
+        wrapper = _traced_method(self, value, f"{self._name}.{attribute}", self._name, attribute)
+        # Cached on the proxy: later lookups skip __getattr__
+        object.__setattr__(self, attribute, wrapper)
+        return wrapper
+
+    def __setattr__(self, attribute, value):
+        setattr(self._client, attribute, value)
+
+    def __repr__(self):
+        return f"traced({self._client!r}, {self._name!r})"
+
+
+def _traced_method(proxy, method, span_name, peer, attribute):
+    start_span = _tracer.start_as_current_span
+    kind = trace.SpanKind.CLIENT
+
+    if inspect.iscoroutinefunction(method):
+        async def wrapper(self, *args, **kwargs):
+            if _unsampled():
+                return await method(*args, **kwargs)
+            with start_span(span_name, kind=kind) as current:
+                if current.is_recording():
+                    _describe(current, peer, attribute, args, kwargs)
+                result = await method(*args, **kwargs)
+                if current.is_recording():
+                    current.set_attribute("payload.response_bytes", _size(result))
+                return result
+    else:
+        def wrapper(self, *args, **kwargs):
+            if _unsampled():
+                return method(*args, **kwargs)
+            with start_span(span_name, kind=kind) as current:
+                if current.is_recording():
+                    _describe(current, peer, attribute, args, kwargs)
+                result = method(*args, **kwargs)
+                if current.is_recording():
+                    current.set_attribute("payload.response_bytes", _size(result))
+                return result
+    wrapper.__name__ = attribute
+    wrapper.__qualname__ = span_name
+    return types.MethodType(wrapper, proxy)
+
+
+def _unsampled():
+    # Inside a trace that was not sampled: the sampler would drop a child span anyway,
+    # so skip creating it; this keeps unsampled requests to one check per call
+    parent = trace.get_current_span().get_span_context()
+    return parent.is_valid and not parent.trace_flags.sampled
+
+
+def _describe(current, peer, attribute, args, kwargs):
+    current.set_attributes({
+        "peer.service": peer,
+        "rpc.method": attribute,
+        "payload.request_bytes": sum(_size(value) for value in args) + sum(_size(value) for value in kwargs.values()),
+    })
+
+
+def _size(value):
+    # Approximate wire size; only computed for sampled spans
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    try:
+        return len(dumps_json(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _attributes(attributes):
+    return {key.replace("_", "."): value for key, value in attributes.items() if value is not None}
+
+
+# --- Export ---
+class FileSpanExporter(SpanExporter):
+    """
+    Appends finished spans to a local file, one JSON object per line, for offline use.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans):
+        lines = "".join(item.to_json(indent=None) + "\n" for item in spans)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        with self._lock:
+            self._file.close()
+
+    def force_flush(self, timeout_millis=30000):
+        with self._lock:
+            self._file.flush()
+        return True
+
+
+def configure_tracing(exporter="otlp", path="traces.jsonl", endpoint=None, sample_rate=DEFAULT_SAMPLE_RATE, service_name=SERVICE_NAME):
+    """
+    Install a global TracerProvider exporting sampled spans in batches.
+    Args:
+        exporter (str | SpanExporter): "otlp", "file", "none", or an exporter instance.
+        path (str): Output file for the "file" exporter.
+        endpoint (str): OTLP endpoint; defaults to OTEL_EXPORTER_OTLP_ENDPOINT / localhost.
+        sample_rate (float): Fraction of new traces to record (0 to 1).
+        service_name (str): service.name resource attribute.
+    Returns:
+        TracerProvider: The installed provider, or None without the OpenTelemetry SDK.
+    """
+    if TracerProvider is None:
+        return None
+    provider = TracerProvider(
+        sampler=ParentBased(TraceIdRatioBased(sample_rate)),
+        resource=Resource.create({"service.name": service_name}),
+    )
+    if exporter == "otlp":
+        exporter = _otlp_exporter(endpoint)
+    elif exporter == "file":
+        exporter = FileSpanExporter(path)
+    elif exporter in (None, "none"):
+        exporter = None
+    elif isinstance(exporter, str):
+        raise ValueError(f"Unknown trace exporter '{exporter}'")
+    if exporter is not None:
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    return provider
+
+
+def _otlp_exporter(endpoint):
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+    except ImportError:
+        try:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import (
+                OTLPSpanExporter,
+            )
+        except ImportError as exc:
+            raise ImportError("opentelemetry-exporter-otlp is required for the OTLP trace exporter") from exc
+    return OTLPSpanExporter(endpoint=endpoint) if endpoint else OTLPSpanExporter()
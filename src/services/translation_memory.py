@@ -0,0 +1,146 @@
+"""
+Personalized Trip Planner - Translation Memory
+
+Stores translations keyed by (source text hash, target language) so identical
+strings (attraction names, fixed UI text) are translated by Gemini/Vertex AI once.
+An in-memory LRU sits in front of an optional SQLite store that survives restarts.
+The store is bounded by least recent access: its row count is kept in memory rather
+than counted on every write, and access times of hits (from either layer) are
+written in batches, so reads do not write to the database.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def source_key(text: str, target_language: str) -> str:
+    """
+    Memory key for a source string and target language.
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{digest}:{target_language}"
+
+
+class TranslationMemory:
+    def __init__(self, path=None, max_entries=200_000, max_stored_entries=5_000_000, touch_batch=1000, touch_interval=60.0):
+        self.max_entries = max_entries
+        self.max_stored_entries = max_stored_entries
+        self.touch_batch = touch_batch  # Access times written once this many keys were hit...
+        self.touch_interval = touch_interval  # ...or this many seconds after the last write
+        self._entries = OrderedDict()  # key -> translation
+        self._lock = threading.Lock()
+        self._db = None
+        self._stored = 0  # Rows in the store
+        self._touched = {}  # key -> last hit time, not yet written
+        self._touched_at = time.monotonic()
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, value TEXT, accessed REAL)"
+            )
+            self._db.commit()
+            # Counted once; kept up to date by put_many and evictions
+            self._stored = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        """
+        Look up several keys at once.
+        Returns:
+            dict: key -> translation for the keys that are known.
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is None:
+                    missing.append(key)
+                else:
+                    self._entries.move_to_end(key)
+                    found[key] = value
+            if missing and self._db is not None:
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._db.execute(
+                        f"SELECT key, value FROM translations WHERE key IN ({placeholders})", chunk
+                    ).fetchall()
+                    for key, value in rows:
+                        found[key] = value
+                        self._insert(key, value)
+            if found and self._db is not None:
+                now = time.time()
+                self._touched.update(dict.fromkeys(found, now))
+                if len(self._touched) >= self.touch_batch or time.monotonic() - self._touched_at >= self.touch_interval:
+                    self._write_touched()
+                    self._db.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """
+        Store translations.
+        Args:
+            items (dict): key -> translation.
+        """
+        if not items:
+            return
+        with self._lock:
+            for key, value in items.items():
+                self._insert(key, value)
+                self._touched.pop(key, None)
+            if self._db is not None:
+                now = time.time()
+                rows = [(key, value, now) for key, value in items.items()]
+                inserted = self._db.executemany("INSERT OR IGNORE INTO translations VALUES (?, ?, ?)", rows).rowcount
+                if inserted < len(rows):
+                    self._db.executemany(
+                        "UPDATE translations SET value = ?, accessed = ? WHERE key = ?",
+                        [(value, accessed, key) for key, value, accessed in rows],
+                    )
+                self._stored += inserted
+                # Pending access times go in first, so eviction sees recent hits
+                self._write_touched()
+                if self._stored > self.max_stored_entries:
+                    self._stored -= self._db.execute(
+                        "DELETE FROM translations WHERE key IN "
+                        "(SELECT key FROM translations ORDER BY accessed LIMIT ?)",
+                        (self._stored - self.max_stored_entries,),
+                    ).rowcount
+                self._db.commit()
+
+    def flush(self):
+        """
+        Write pending access times to the store.
+        """
+        with self._lock:
+            if self._db is not None and self._touched:
+                self._write_touched()
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _write_touched(self):
+        if self._touched:
+            self._db.executemany(
+                "UPDATE translations SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched = {}
+        self._touched_at = time.monotonic()
+
+    def _insert(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,203 @@
+"""
+Personalized Trip Planner - User Profile Service
+
+Stores user profiles in Firebase and serves reads through a read-through cache
+with a single loader. Concurrent misses for the same user wait on a single
+Firebase read (single-flight), and writes invalidate the cached entry. Users the
+store does not know are not cached, so a profile created later is seen at once.
+Cached profiles are slotted dataclasses with interned strings and tuples rather
+than nested dicts, so hundreds of thousands of hot profiles fit in memory.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+from src.services.interfaces.user_interaction import UserInteractionInterface
+from src.services.tracing import annotate, traced
+
+PROFILE_FIELDS = ("user_id", "name", "age", "budget", "interests", "preferences", "history")
+# Interests and preferences repeat across users, so identical tuples are stored once
+MAX_SHARED_TUPLES = 100_000
+_shared_tuples = {}
+
+
+@dataclass(slots=True, frozen=True)
+class Profile:
+    """
+    Compact in-memory form of a Firebase user profile.
+    """
+    user_id: str
+    name: str = None
+    age: int = None
+    budget: float = None
+    interests: tuple = ()
+    preferences: tuple = ()  # (key, value) pairs
+    history: tuple = ()
+    extra: tuple = ()  # (key, value) pairs for fields not listed above
+
+    @classmethod
+    def from_dict(cls, user_id, data):
+        data = data or {}
+        return cls(
+            user_id=sys.intern(str(data.get('user_id') or user_id)),
+            name=data.get('name'),
+            age=data.get('age'),
+            budget=data.get('budget'),
+            interests=_shared(tuple(sys.intern(str(interest)) for interest in data.get('interests') or ())),
+            preferences=_shared(tuple(_intern_items(data.get('preferences') or {}))),
+            history=tuple(data.get('history') or ()),
+            extra=tuple(_intern_items({k: v for k, v in data.items() if k not in PROFILE_FIELDS})),
+        )
+
+    def to_dict(self):
+        profile = {
+            'user_id': self.user_id,
+            'preferences': dict(self.preferences),
+            'history': list(self.history),
+        }
+        for field in ('name', 'age', 'budget'):
+            value = getattr(self, field)
+            if value is not None:
+                profile[field] = value
+        if self.interests:
+            profile['interests'] = list(self.interests)
+        profile.update(self.extra)
+        return profile
+
+
+class ProfileCache:
+    """
+    LRU + TTL cache of Profile records with single-flight loading.
+    Args:
+        loader: callable(user_id) -> profile dict, or None for an unknown user. Every
+            entry comes from this one loader, so callers cannot fill it from different sources.
+    """
+    def __init__(self, loader, max_entries=500_000, ttl=600.0):
+        self.loader = loader
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user_id -> (expires, Profile)
+        self._inflight = {}  # user_id -> Future
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, user_id):
+        """
+        Cached profile for user_id; on a miss the loader is called once however many
+        callers are waiting for the same user.
+        Returns:
+            Profile: The profile, or None if the loader has none (not cached).
+        """
+        owner = False
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                annotate(profile_cache_hit=True)
+                return entry[1]
+            future = self._inflight.get(user_id)
+            if future is not None:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                self._inflight[user_id] = future = Future()
+                owner = True
+        annotate(profile_cache_hit=False)
+        if owner:
+            self._load(user_id, future)
+        return future.result()
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            # A read already in flight may return the old profile; it is not cached
+            self._inflight.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "entries": len(self._entries)}
+
+    def _load(self, user_id, future):
+        try:
+            data = self.loader(user_id)
+            profile = Profile.from_dict(user_id, data) if data is not None else None
+        except Exception as exc:
+            with self._lock:
+                if self._inflight.get(user_id) is future:
+                    del self._inflight[user_id]
+            future.set_exception(exc)
+            return
+        with self._lock:
+            if self._inflight.get(user_id) is future:
+                del self._inflight[user_id]
+                # Unknown users are not cached: a profile created next is read straight away
+                if profile is not None:
+                    self._entries[user_id] = (time.monotonic() + self.ttl, profile)
+                    self._entries.move_to_end(user_id)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        future.set_result(profile)
+
+
+class UserProfileService(UserInteractionInterface):
+    def __init__(self, firebase_client, cache=None):
+        self.firebase = traced(firebase_client, "firebase")
+        # One service per process (agent.py), so its cache is the process-wide profile cache
+        self.cache = cache if cache is not None else ProfileCache(self.firebase.get_user_profile)
+
+    def create_profile(self, user_data):
+        """
+        Store user profile (preferences, budget, interests, travel history) in Firebase.
+        """
+        user_id = user_data.get('user_id')
+        self.firebase.save_user_profile(user_id, user_data)
+        self.cache.invalidate(user_id)
+
+    def get_profile(self, user_id):
+        """
+        Retrieve user profile data, from the cache when possible; None for an unknown user.
+        """
+        profile = self.get_profile_record(user_id)
+        return profile.to_dict() if profile is not None else None
+
+    def get_profile_record(self, user_id):
+        """
+        Cached Profile record (or None), for hot paths that do not need a dict.
+        """
+        return self.cache.get(user_id)
+
+    def update_name(self, user_id, name):
+        self.firebase.update_user_profile(user_id, {'name': name})
+        self.cache.invalidate(user_id)
+
+    def update_age(self, user_id, age):
+        self.firebase.update_user_profile(user_id, {'age': age})
+        self.cache.invalidate(user_id)
+
+    def collect_feedback(self, user_id, feedback):
+        self.firebase.save_feedback(user_id, feedback)
+
+
+def _shared(value):
+    try:
+        shared = _shared_tuples.get(value)
+    except TypeError:
+        # Unhashable contents (e.g. a list preference)
+        return value
+    if shared is not None:
+        return shared
+    if len(_shared_tuples) < MAX_SHARED_TUPLES:
+        _shared_tuples[value] = value
+    return value
+
+
+def _intern_items(mapping):
+    for key, value in mapping.items():
+        yield sys.intern(str(key)), sys.intern(value) if isinstance(value, str) else value
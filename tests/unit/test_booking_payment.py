@@ -0,0 +1,131 @@
+import pytest
+
+from src.services import booking_payment
+from src.services.booking_payment import BookingError, BookingPaymentService, Leg
+
+
+class LegEMT:
+    def book(self, itinerary_id, request):
+        return {"confirmation": request["idempotency_key"]}
+
+
+class RecordingPayment:
+    def __init__(self):
+        self.requests = []
+
+    def process(self, payment_info):
+        self.requests.append(payment_info)
+        return {"status": "paid"}
+
+
+class FailingEMT:
+    def book(self, itinerary_id, request):
+        raise ConnectionError("EMT unavailable")
+
+
+class NullFirebase:
+    def save_booking_confirmation(self, itinerary_id, booking_confirmation):
+        pass
+
+
+class BrokenFirebase:
+    def save_booking_confirmation(self, itinerary_id, booking_confirmation):
+        raise ConnectionError("firebase unavailable")
+
+
+def test_one_phase_payment_is_not_charged_when_inventory_fails():
+    payment = RecordingPayment()
+    service = BookingPaymentService(FailingEMT(), NullFirebase(), payment)
+
+    with pytest.raises(BookingError) as failure:
+        service.book("trip-1", {"amount": 1000})
+
+    assert failure.value.step == "inventory"
+    assert payment.requests == []
+
+
+@pytest.mark.asyncio
+async def test_async_one_phase_payment_is_not_charged_when_inventory_fails():
+    payment = RecordingPayment()
+    service = BookingPaymentService(FailingEMT(), NullFirebase(), payment)
+
+    with pytest.raises(BookingError):
+        await service.abook("trip-1", {"amount": 1000})
+
+    assert payment.requests == []
+
+
+def test_failed_confirmation_write_is_logged_and_the_booking_stands(caplog):
+    payment = RecordingPayment()
+    service = BookingPaymentService(LegEMT(), BrokenFirebase(), payment)
+
+    confirmation, status = service.book("trip-1", {"amount": 1000}, idempotency_key="client-key")
+
+    assert confirmation == {"confirmation": "client-key"} and status == {"status": "paid"}
+    assert "trip-1 was not stored" in caplog.text
+
+
+def test_book_legs_rejects_an_itinerary_without_legs():
+    payment = RecordingPayment()
+    service = BookingPaymentService(LegEMT(), NullFirebase(), payment)
+
+    with pytest.raises(ValueError):
+        service.book_legs("trip-1", {"card": "tok"}, legs=[])
+    assert payment.requests == []
+
+
+@pytest.mark.parametrize("legs, max_parallel", [
+    ([{"leg_id": "a", "kind": "hotel", "price": 10}], 8),
+    ([{"kind": "hotel"}], 8),
+    ([{"leg_id": "a", "kind": "hotel", "details": "suite"}], 8),
+    (["a"], 8),
+    ("a", 8),
+    ([{"leg_id": "a", "kind": "hotel"}, {"leg_id": "a", "kind": "train"}], 8),
+    ([{"leg_id": "a", "kind": "hotel"}], 0),
+    ([{"leg_id": "a", "kind": "hotel"}], "4"),
+])
+def test_book_legs_rejects_malformed_requests_with_value_error(legs, max_parallel):
+    payment = RecordingPayment()
+    service = BookingPaymentService(LegEMT(), NullFirebase(), payment)
+
+    with pytest.raises(ValueError):
+        service.book_legs("trip-1", {"card": "tok"}, legs=legs, max_parallel=max_parallel)
+    assert payment.requests == []
+
+
+def test_book_legs_charges_the_exact_decimal_total():
+    payment = RecordingPayment()
+    service = BookingPaymentService(LegEMT(), NullFirebase(), payment)
+    legs = [Leg("a", "activity", {}, 0.1), Leg("b", "activity", {}, 0.2), Leg("c", "hotel", {}, "₹1,250")]
+
+    report = service.book_legs("trip-1", {"card": "tok"}, legs=legs)
+
+    assert report.status == "booked"
+    assert payment.requests[0]["amount"] == "1250.30"
+
+
+def test_client_key_replays_the_original_booking():
+    payment = RecordingPayment()
+    service = BookingPaymentService(LegEMT(), NullFirebase(), payment)
+
+    first = service.book("trip-1", {"amount": 1000}, idempotency_key="client-key")
+    replay = service.book("trip-1", {"amount": 1000}, idempotency_key="client-key")
+
+    assert replay == first
+    assert len(payment.requests) == 1
+    assert payment.requests[0]["idempotency_key"] == "client-key"
+
+
+def test_identical_request_without_a_key_is_only_a_retry_within_the_window(monkeypatch):
+    payment = RecordingPayment()
+    service = BookingPaymentService(LegEMT(), NullFirebase(), payment)
+
+    first = service.book("trip-1", {"amount": 1000})
+    assert service.book("trip-1", {"amount": 1000}) == first
+    assert len(payment.requests) == 1
+
+    monkeypatch.setattr(booking_payment, "RETRY_WINDOW", 0)
+    service.book("trip-2", {"amount": 1000})
+    service.book("trip-2", {"amount": 1000})
+    keys = [request["idempotency_key"] for request in payment.requests[1:]]
+    assert len(keys) == 2 and keys[0] != keys[1]
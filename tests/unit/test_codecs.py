@@ -0,0 +1,42 @@
+import json
+import time
+
+import pytest
+
+from src.services.codecs import COMPRESSIONS, SERIALIZERS, BlobCodec, decode_blob
+from src.services.itinerary_cache import DiskBackend, ItineraryCache
+
+# Codecs installed here, by the names BlobCodec takes
+SERIALIZER_NAMES = [{b"j": "json", b"m": "msgpack"}[tag] for tag in SERIALIZERS]
+COMPRESSION_NAMES = [{b"n": "none", b"l": "zlib", b"z": "zstd"}[tag] for tag in COMPRESSIONS]
+
+ITINERARY = {"destination": "Jaipur", "budget": 25000, "details": [{"day": 1, "activities": [{"name": "Amber Fort", "cost": "₹500"}]}]}
+
+
+def test_legacy_json_blobs_decode():
+    # Written by the cache before blobs had a codec header
+    legacy = json.dumps(ITINERARY, default=str, separators=(",", ":")).encode()
+
+    assert decode_blob(legacy) == ITINERARY
+    assert decode_blob(memoryview(legacy)) == ITINERARY
+    assert decode_blob(legacy.decode()) == ITINERARY
+
+
+def test_cache_reads_legacy_json_rows_from_disk(tmp_path):
+    backend = DiskBackend(str(tmp_path / "cache.db"))
+    backend.put("jaipur:heritage", time.time() + 3600, json.dumps(ITINERARY, default=str, separators=(",", ":")).encode())
+
+    assert ItineraryCache(backend=backend).get("jaipur:heritage") == ITINERARY
+
+
+@pytest.mark.parametrize("serializer", SERIALIZER_NAMES)
+@pytest.mark.parametrize("compression", COMPRESSION_NAMES)
+def test_every_available_codec_round_trips(serializer, compression):
+    itinerary = {**ITINERARY, "details": ITINERARY["details"] * 20}
+
+    assert decode_blob(BlobCodec(serializer, compression).encode(itinerary)) == itinerary
+
+
+def test_blob_from_a_missing_codec_is_reported():
+    with pytest.raises(ValueError):
+        decode_blob(b"TPCxn{}")
@@ -0,0 +1,108 @@
+import datetime
+from zoneinfo import ZoneInfo
+
+from src.services.condition_monitor import ConditionMonitor, next_start
+
+KOLKATA = ZoneInfo("Asia/Kolkata")
+DAY = datetime.date(2026, 5, 1)
+
+
+def _midnight(day, tz=KOLKATA):
+    return datetime.datetime.combine(day, datetime.time(), tzinfo=tz).timestamp()
+
+
+def _trip(arrival, lat=26.92, lng=75.82, day=DAY):
+    """Dated Jaipur itinerary with one stop arriving `arrival` minutes after midnight."""
+    return {
+        "date": day.isoformat(),
+        "timezone": "Asia/Kolkata",
+        "locations": [{"place_id": "p", "geometry": {"location": {"lat": lat, "lng": lng}}}],
+        "route": {"stops": [{"place_id": "p", "arrival": arrival, "departure": arrival + 60}]},
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.fetches = []
+        self.replanned = []
+
+    def fetch(self, itinerary, when):
+        self.fetches.append(when)
+        return {"weather": "rain", "window": int(when // 3600)}
+
+    def replan(self, itinerary_id, conditions):
+        self.replanned.append(itinerary_id)
+
+
+def test_undated_itinerary_is_not_monitored():
+    monitor = ConditionMonitor(replan=lambda itinerary_id, conditions: None, fetch_conditions=lambda itinerary, when: {})
+    undated = {"route": {"stops": [{"arrival": 600, "departure": 660}]}}
+
+    assert not monitor.track("trip-1", undated)
+    assert next_start(undated, _midnight(DAY)) is None
+    assert monitor.poll() == 0
+
+
+def test_next_start_reads_the_date_from_preferences():
+    itinerary = {
+        "preferences": {"start_date": DAY.isoformat(), "timezone": "Asia/Kolkata"},
+        "route": {"stops": [{"arrival": 540, "departure": 600}, {"arrival": 660, "departure": 720}]},
+    }
+    now = _midnight(DAY) + 610 * 60
+
+    assert next_start(itinerary, now) == _midnight(DAY) + 660 * 60
+    assert next_start(itinerary, _midnight(DAY + datetime.timedelta(days=1)) + 60) is None
+
+
+def test_next_start_uses_the_destination_timezone():
+    stop = {"route": {"stops": [{"arrival": 540, "departure": 600}]}, "date": DAY.isoformat()}
+    utc = _midnight(DAY, datetime.timezone.utc)
+
+    assert next_start(stop, utc) == utc + 540 * 60
+    assert next_start({**stop, "timezone": "Asia/Kolkata"}, utc - 6 * 3600) == _midnight(DAY) + 540 * 60
+    assert _midnight(DAY) + 540 * 60 == utc + 210 * 60
+    # An unknown zone name falls back to the default instead of failing the poll
+    assert next_start({**stop, "timezone": "Mars/Olympus"}, utc) == utc + 540 * 60
+
+
+def test_poll_fetches_once_per_region_and_hour():
+    recorder = Recorder()
+    monitor = ConditionMonitor(recorder.replan, fetch_conditions=recorder.fetch)
+    monitor.track("a", _trip(600))
+    monitor.track("b", _trip(610))  # same cell, same hour
+    monitor.track("c", _trip(720))  # same cell, later hour
+    monitor.track("d", _trip(600, lat=19.07, lng=72.87))  # Mumbai
+
+    assert monitor.poll(now=_midnight(DAY) + 540 * 60) == 4
+    assert len(recorder.fetches) == 3
+    assert monitor.metrics(now=_midnight(DAY) + 540 * 60)["backlog"] == 4
+
+    # Once re-planned, unchanged conditions are not queued again
+    monitor.drain()
+    assert monitor.poll(now=_midnight(DAY) + 540 * 60) == 0
+
+
+def test_trips_starting_soonest_are_replanned_first():
+    recorder = Recorder()
+    monitor = ConditionMonitor(recorder.replan, fetch_conditions=recorder.fetch)
+    for itinerary_id, arrival in (("late", 780), ("first", 560), ("middle", 660)):
+        monitor.track(itinerary_id, _trip(arrival))
+
+    monitor.poll(now=_midnight(DAY) + 540 * 60)
+    monitor.drain()
+
+    assert recorder.replanned == ["first", "middle", "late"]
+
+
+def test_untracked_trips_are_dropped_from_the_queue():
+    recorder = Recorder()
+    monitor = ConditionMonitor(recorder.replan, fetch_conditions=recorder.fetch)
+    monitor.track("kept", _trip(600))
+    monitor.track("cancelled", _trip(610))
+
+    monitor.poll(now=_midnight(DAY) + 540 * 60)
+    monitor.untrack("cancelled")
+    monitor.drain()
+
+    assert recorder.replanned == ["kept"]
+    assert monitor.metrics(now=_midnight(DAY) + 540 * 60)["tracked"] == 1
@@ -0,0 +1,78 @@
+import threading
+
+from src.services.conditions_cache import ConditionsCache, FakeConditionsProvider
+
+JAIPUR = (26.92, 75.82)
+NOON = 1_777_636_800  # An hour boundary
+
+
+class ManualExecutor:
+    """Holds submitted refreshes until run() so a test can look at the stale window."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, fn, *args):
+        self.jobs.append((fn, args))
+
+    def run(self):
+        jobs, self.jobs = self.jobs, []
+        for fn, args in jobs:
+            fn(*args)
+
+
+def test_concurrent_misses_share_one_fetch():
+    provider = FakeConditionsProvider(latency=0.2)
+    cache = ConditionsCache(provider)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(*JAIPUR, when=NOON))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert provider.calls == 1
+    assert len(results) == 8 and all(result == results[0] for result in results)
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["coalesced"] + stats["hits"] == 7
+
+
+def test_same_cell_and_hour_share_an_entry():
+    provider = FakeConditionsProvider()
+    cache = ConditionsCache(provider)
+
+    cache.get(*JAIPUR, when=NOON)
+    cache.get(JAIPUR[0] + 0.001, JAIPUR[1], when=NOON + 1800)
+    assert provider.calls == 1
+    cache.get(*JAIPUR, when=NOON + 3600)
+    assert provider.calls == 2
+
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    provider = FakeConditionsProvider()
+    executor = ManualExecutor()
+    cache = ConditionsCache(provider, ttl=0, stale_ttl=3600, executor=executor)
+    cell = "jaipur"
+    provider.set(cell, NOON, {"weather": "Sunny"})
+    assert cache.lookup(cell, when=NOON) == {"weather": "Sunny"}
+
+    provider.set(cell, NOON, {"weather": "Rain"})
+    assert cache.lookup(cell, when=NOON) == {"weather": "Sunny"}
+    assert cache.lookup(cell, when=NOON) == {"weather": "Sunny"}
+    assert len(executor.jobs) == 1 and provider.calls == 1
+
+    executor.run()
+    assert cache.lookup(cell, when=NOON) == {"weather": "Rain"}
+    assert cache.stats()["stale_hits"] == 3 and provider.calls == 2
+
+
+def test_entry_past_the_stale_window_is_fetched_again():
+    provider = FakeConditionsProvider()
+    executor = ManualExecutor()
+    cache = ConditionsCache(provider, ttl=0, stale_ttl=0, executor=executor)
+    cache.lookup("jaipur", when=NOON)
+    cache.lookup("jaipur", when=NOON)
+
+    assert provider.calls == 2 and not executor.jobs
+    assert cache.stats()["misses"] == 2
@@ -0,0 +1,146 @@
+from decimal import Decimal
+
+import pytest
+
+from src.services.cost_engine import CostEngine, allocate, money
+from src.services.cost_sharing import CostSharingService
+
+
+class StoredBreakdownFirebase:
+    def __init__(self, itinerary):
+        self.itinerary = itinerary
+
+    def get_itinerary(self, itinerary_id):
+        return self.itinerary
+
+    def get_cost_breakdown(self, itinerary_id):
+        return {"itinerary_id": itinerary_id, "total": "4200.00", "source": "firebase"}
+
+
+def test_unpriced_itinerary_falls_back_to_the_stored_breakdown():
+    itinerary = {"details": [{"activities": [{"name": "Fort walk"}, {"name": "Lake", "cost": ""}]}]}
+    service = CostSharingService(StoredBreakdownFirebase(itinerary))
+
+    assert service.get_cost_breakdown("trip-1")["source"] == "firebase"
+    # Cached as empty: later reads still fall back instead of reporting a zero total
+    assert service.get_cost_breakdown("trip-1")["source"] == "firebase"
+
+
+def test_free_activity_counts_as_priced():
+    engine = CostEngine()
+
+    breakdown = engine.track({"id": "trip-1", "details": [{"activities": [{"name": "Park", "cost": 0}]}]})
+
+    assert breakdown["items"] == 1
+    assert breakdown["total"] == "0.00"
+
+
+@pytest.mark.parametrize("text, amount", [
+    ("Rs.1,250", "1250.00"),
+    ("₹1,250", "1250.00"),
+    ("12,50,000", "1250000.00"),
+    ("1,250.50 INR", "1250.50"),
+    ("-₹75.5", "-75.50"),
+    ("$3.10", "3.10"),
+])
+def test_money_parses_currency_and_separators(text, amount):
+    assert money(text) == Decimal(amount)
+
+
+@pytest.mark.parametrize("text", ["1.250,50", "1,25", "1,2345", "12 apples"])
+def test_money_rejects_ambiguous_amounts(text):
+    with pytest.raises(ValueError):
+        money(text)
+
+
+class DocumentFirebase:
+    """Itinerary documents with Firebase-style multi-path updates."""
+
+    def __init__(self, itineraries):
+        self.itineraries = itineraries
+        self.reads = 0
+
+    def get_itinerary(self, itinerary_id):
+        self.reads += 1
+        return self.itineraries.get(itinerary_id)
+
+    def update_itinerary(self, itinerary_id, updates):
+        for path, value in updates.items():
+            *parents, leaf = path.split("/")
+            node = self.itineraries[itinerary_id]
+            for key in parents:
+                node = node.setdefault(key, {})
+            node[leaf] = value
+
+
+def _trip():
+    return {"details": [{"activities": [{"name": "Fort", "cost": "500"}, {"name": "Boat", "cost": "300"}]}]}
+
+
+def test_item_and_split_changes_survive_a_reload_in_another_process():
+    firebase = DocumentFirebase({"trip-1": _trip()})
+    writer = CostSharingService(firebase)
+    writer.update_item("trip-1", {"item_id": "dinner.1", "category": "food", "amount": "1200"})
+    writer.remove_item("trip-1", "trip-1:activity:0.1")
+    writer.set_split("trip-1", ["asha", "ravi"], "weighted", {"asha": 2, "ravi": 1})
+
+    breakdown = CostSharingService(firebase).get_cost_breakdown("trip-1")
+
+    assert breakdown["total"] == "1700.00"
+    assert breakdown["categories"] == {"activities": "500.00", "food": "1200.00"}
+    assert breakdown["split"] == {"mode": "weighted", "travellers": {"asha": "1133.33", "ravi": "566.67"}}
+
+
+def test_breakdown_reloads_on_new_version_or_after_ttl():
+    now = [0.0]
+    firebase = DocumentFirebase({"trip-1": {**_trip(), "version": 1}})
+    engine = CostEngine(ttl=60.0, clock=lambda: now[0])
+
+    engine.breakdown("trip-1", loader=firebase.get_itinerary)
+    engine.breakdown("trip-1", loader=firebase.get_itinerary, version=1)
+    assert firebase.reads == 1
+
+    firebase.itineraries["trip-1"]["details"][0]["activities"][0]["cost"] = "900"
+    firebase.itineraries["trip-1"]["version"] = 2
+    assert engine.breakdown("trip-1", loader=firebase.get_itinerary, version=2)["total"] == "1200.00"
+
+    firebase.itineraries["trip-1"]["details"][0]["activities"][1]["cost"] = "100"
+    now[0] = 61.0
+    assert engine.breakdown("trip-1", loader=firebase.get_itinerary)["total"] == "1000.00"
+    assert firebase.reads == 3
+
+
+def test_breakdown_cache_evicts_least_recently_used():
+    engine = CostEngine(max_entries=2)
+    for itinerary_id in ("a", "b"):
+        engine.track({"id": itinerary_id, **_trip()})
+    engine.breakdown("a")
+    engine.track({"id": "c", **_trip()})
+
+    assert engine.is_tracked("a") and engine.is_tracked("c")
+    assert not engine.is_tracked("b")
+
+
+@pytest.mark.parametrize("amount, weights", [
+    ("100.00", {"asha": 1, "ravi": 1, "meera": 1}),
+    ("0.01", {"asha": 1, "ravi": 1}),
+    ("1250.50", {"asha": 2, "ravi": 1, "meera": 0.5}),
+    ("-75.50", {"asha": 1, "ravi": 1, "meera": 1}),
+    ("999999.99", {f"t{i}": i + 1 for i in range(7)}),
+])
+def test_allocate_shares_sum_exactly_to_the_amount(amount, weights):
+    shares = allocate(Decimal(amount), weights)
+
+    assert sum(shares.values()) == Decimal(amount)
+    assert all(share == share.quantize(Decimal("0.01")) for share in shares.values())
+
+
+def test_allocate_gives_leftover_paise_to_the_first_listed_on_ties():
+    assert allocate(Decimal("100.00"), {"asha": 1, "ravi": 1, "meera": 1}) == {
+        "asha": Decimal("33.34"), "ravi": Decimal("33.33"), "meera": Decimal("33.33"),
+    }
+
+
+def test_allocate_rejects_all_zero_weights():
+    with pytest.raises(ValueError):
+        allocate(Decimal("10"), {"asha": 0})
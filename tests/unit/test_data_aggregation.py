@@ -0,0 +1,100 @@
+import time
+
+from src.services import fanout
+from src.services.data_aggregation import DataAggregationService, Source
+from src.services.fanout import CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Places:
+    def search(self, query):
+        return [{"name": f"{query} fort"}]
+
+
+class Feed:
+    """Event/guide client that fails while `down`, counting calls."""
+
+    def __init__(self, items, delay=0.0):
+        self.items = items
+        self.delay = delay
+        self.down = False
+        self.calls = 0
+
+    def fetch(self, preferences):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("feed unavailable")
+        time.sleep(self.delay)
+        return list(self.items)
+
+    get_events = get_guides = fetch
+
+
+def test_breaker_opens_after_the_threshold_and_probes_once_when_half_open(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fanout.time, "monotonic", clock)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+    clock.now += 30.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # Only one probe at a time
+
+    # A failed probe re-opens at once, without counting up to the threshold again
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 30.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+
+def _service(events, guides, **kwargs):
+    return DataAggregationService("AIza-test-key", events, guides, places=Places(), **kwargs)
+
+
+def test_failed_and_late_sources_degrade_to_empty_results():
+    events, guides = Feed(["festival"]), Feed(["guide"], delay=0.5)
+    events.down = True
+    service = _service(events, guides, sources=[Source("board", lambda preferences: ["board pick"])])
+    service.sources[2].deadline = 0.05
+
+    result = service.aggregate({"destination": "Jaipur"})
+
+    assert result["locations"] == [{"name": "Jaipur fort"}]
+    assert result["board"] == ["board pick"]
+    assert result["events"] == [] and result["guides"] == []
+    statuses = {name: status["status"] for name, status in result["sources"].items()}
+    assert statuses == {"locations": "ok", "events": "error", "guides": "timeout", "board": "ok"}
+    assert "feed unavailable" in result["sources"]["events"]["error"]
+
+
+def test_open_circuit_skips_the_source_until_it_recovers(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fanout.time, "monotonic", clock)
+    events = Feed(["festival"])
+    service = _service(events, Feed(["guide"]))
+    service.sources[1].breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+
+    events.down = True
+    assert service.aggregate({})["sources"]["events"]["status"] == "error"
+    result = service.aggregate({})
+    assert result["sources"]["events"] == {"status": "circuit_open"} and result["events"] == []
+    assert events.calls == 1
+
+    events.down = False
+    clock.now += 30.0
+    assert service.aggregate({})["events"] == ["festival"]
+    assert service.sources[1].breaker.state == CircuitBreaker.CLOSED
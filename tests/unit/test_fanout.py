@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.services.fanout import Stage, StageError, afan_out, fan_out, make_executor
+from src.services.itinerary_generator import ItineraryGenerator
+
+
+def _slow(value, delay):
+    time.sleep(delay)
+    return value
+
+
+def _fail():
+    raise ConnectionError("bigquery unavailable")
+
+
+def test_fan_out_keeps_finished_stages_and_times_out_late_ones():
+    executor = make_executor(max_workers=4)
+    start = time.monotonic()
+
+    result = fan_out(executor, [
+        Stage("ai", _slow, {"details": []}, 0.01, timeout=1.0),
+        Stage("maps", _slow, ["place"], 0.5, timeout=0.05),
+        Stage("analytics", _fail, timeout=1.0),
+    ])
+
+    assert time.monotonic() - start < 0.4  # The late stage's deadline, not its runtime
+    assert result.values == {"ai": {"details": []}}
+    assert isinstance(result.errors["maps"], TimeoutError)
+    assert isinstance(result.errors["analytics"], ConnectionError)
+    assert result.degraded == ["analytics", "maps"]
+    assert set(result.timings) == {"ai", "maps", "analytics"}
+
+
+def test_deadlines_are_measured_from_submission():
+    # Both stages run concurrently: waiting on the first does not eat into the second's deadline
+    result = fan_out(make_executor(max_workers=2), [
+        Stage("a", _slow, 1, 0.1, timeout=0.3),
+        Stage("b", _slow, 2, 0.2, timeout=0.3),
+    ])
+
+    assert result.values == {"a": 1, "b": 2}
+
+
+def test_required_stage_failure_raises():
+    with pytest.raises(StageError) as failure:
+        fan_out(make_executor(), [Stage("ai", _fail, required=True), Stage("maps", _slow, [], 0.0)])
+
+    assert failure.value.stage == "ai"
+
+
+class FixedAI:
+    def generate_itinerary(self, preferences):
+        return {"summary": "Two days in Jaipur", "details": [{"title": "Old city"}]}
+
+
+class HangingPlaces:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def search(self, query):
+        self.release.wait(timeout=2)
+        return ()
+
+
+class FailingRecommendations:
+    def lookup(self, theme, budget):
+        raise ConnectionError("bigquery unavailable")
+
+
+class RecordingFirebase:
+    def __init__(self):
+        self.saved = []
+
+    def save_itinerary(self, user_id, itinerary):
+        self.saved.append(itinerary)
+
+
+def test_generate_degrades_optional_stages_instead_of_failing():
+    places = HangingPlaces()
+    firebase = RecordingFirebase()
+    generator = ItineraryGenerator(
+        FixedAI(), None, None, firebase, maps_client=object(),
+        recommendations=FailingRecommendations(), places=places, stage_timeouts={"maps": 0.05},
+    )
+
+    itinerary = generator.generate("user-1", {"destination": "Jaipur"})
+    places.release.set()
+
+    assert itinerary["summary"] == "Two days in Jaipur"
+    assert itinerary["degraded"] == ["analytics", "maps"]
+    assert itinerary["locations"] == [] and itinerary["analytics"] == []
+    assert firebase.saved == [itinerary]
+
+
+async def _asleep(value, delay):
+    await asyncio.sleep(delay)
+    return value
+
+
+@pytest.mark.asyncio
+async def test_afan_out_awaits_coroutines_and_offloads_blocking_stages():
+    result = await afan_out([
+        Stage("ai", _asleep, {"details": []}, 0.01, timeout=1.0),
+        Stage("maps", _asleep, ["place"], 0.5, timeout=0.05),
+        Stage("analytics", _fail, timeout=1.0),
+        Stage("places", _slow, ["cached"], 0.01, timeout=1.0),
+    ])
+
+    assert result.values == {"ai": {"details": []}, "places": ["cached"]}
+    assert isinstance(result.errors["maps"], TimeoutError)
+    assert result.degraded == ["analytics", "maps"]
+
+    with pytest.raises(StageError):
+        await afan_out([Stage("ai", _fail, required=True), Stage("maps", _asleep, [], 1.0)])
+
+
+class AsyncOnlyAI:
+    """Fails if the blocking call is used."""
+
+    def generate_itinerary(self, preferences):
+        raise AssertionError("blocking client call on the async path")
+
+    async def agenerate_itinerary(self, preferences):
+        await asyncio.sleep(0.01)
+        return {"summary": "Two days in Jaipur", "details": []}
+
+
+class AsyncPlaces:
+    def search(self, query):
+        raise AssertionError("blocking client call on the async path")
+
+    async def asearch(self, query):
+        await asyncio.sleep(1.0)
+        return ()
+
+
+class AsyncFirebase(RecordingFirebase):
+    async def asave_itinerary(self, user_id, itinerary):
+        self.saved.append(itinerary)
+
+
+@pytest.mark.asyncio
+async def test_agenerate_awaits_async_clients_and_degrades_like_generate():
+    firebase = AsyncFirebase()
+    generator = ItineraryGenerator(
+        AsyncOnlyAI(), None, None, firebase, maps_client=object(),
+        recommendations=FailingRecommendations(), places=AsyncPlaces(), stage_timeouts={"maps": 0.05},
+    )
+
+    itinerary = await generator.agenerate("user-1", {"destination": "Jaipur"})
+
+    assert itinerary["summary"] == "Two days in Jaipur"
+    assert itinerary["degraded"] == ["analytics", "maps"]
+    assert firebase.saved == [itinerary]
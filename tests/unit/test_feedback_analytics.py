@@ -0,0 +1,81 @@
+from src.services.feedback_analytics import OTHER, FeedbackAnalytics, HyperLogLog
+
+
+def test_record_updates_totals_histogram_and_rollups():
+    analytics = FeedbackAnalytics()
+    analytics.record("u1", {"rating": 5, "destination": " Jaipur ", "features": ["Maps", "booking"]}, when=100.0)
+    analytics.record("u2", {"rating": "2.6", "destination": "jaipur", "feature": "maps"}, when=300.0)
+    analytics.record("u2", {"rating": 9}, when=200.0)
+    analytics.record("u3", "loved it")
+    analytics.record(None, {"rating": "inf"})
+
+    snapshot = analytics.snapshot()
+    assert (snapshot["count"], snapshot["ratings"]) == (5, 3)
+    assert snapshot["histogram"] == {"1": 0, "2": 0, "3": 1, "4": 0, "5": 2}
+    assert snapshot["average_rating"] == round(13 / 3, 3)
+    assert snapshot["destinations"]["jaipur"]["count"] == 2
+    assert snapshot["destinations"]["jaipur"]["average_rating"] == 4.0
+    assert snapshot["features"]["maps"]["count"] == 2 and snapshot["features"]["booking"]["count"] == 1
+    assert snapshot["distinct_users"] == 3
+    assert snapshot["last_feedback_at"] > 300.0  # The entries without `when` count as now
+
+
+def test_snapshot_is_rebuilt_only_after_new_feedback():
+    analytics = FeedbackAnalytics()
+    assert analytics.is_empty()
+    analytics.record("u1", {"rating": 4})
+
+    first = analytics.snapshot()
+    assert analytics.snapshot() is first
+    analytics.record("u2", {"rating": 3})
+    assert analytics.snapshot() is not first and analytics.snapshot()["count"] == 2
+
+
+def test_rollups_beyond_max_keys_are_counted_under_other():
+    analytics = FeedbackAnalytics(max_keys=2)
+    for destination in ("goa", "jaipur", "leh", "kochi"):
+        analytics.record("u", {"destination": destination, "rating": 4})
+
+    destinations = analytics.snapshot()["destinations"]
+    assert set(destinations) == {"goa", "jaipur", OTHER}
+    assert destinations[OTHER]["count"] == 2
+
+
+def test_hyperloglog_estimates_and_merges_distinct_counts():
+    left, right = HyperLogLog(), HyperLogLog()
+    for index in range(20_000):
+        left.add(f"user-{index}")
+        right.add(f"user-{index + 10_000}")
+
+    assert abs(left.count() - 20_000) < 20_000 * 0.05
+    left.merge(right)
+    assert abs(left.count() - 30_000) < 30_000 * 0.05
+
+
+def test_checkpoint_restores_the_aggregates(tmp_path):
+    path = str(tmp_path / "analytics.checkpoint")
+    analytics = FeedbackAnalytics(checkpoint_path=path)
+    assert not analytics.checkpoint()  # Nothing recorded yet
+    for index in range(50):
+        analytics.record(f"user-{index}", {"rating": index % 5 + 1, "destination": "goa"}, when=1000.0 + index)
+
+    assert analytics.checkpoint()
+    assert not analytics.checkpoint()  # Unchanged since the last one
+
+    restored = FeedbackAnalytics(checkpoint_path=path)
+    assert not restored.is_empty()
+    assert restored.snapshot() == analytics.snapshot()
+
+
+def test_seed_folds_pre_aggregated_rows():
+    analytics = FeedbackAnalytics()
+    analytics.seed([
+        {"dimension": "total", "key": None, "rating": 4, "count": 3, "last_at": 50.0},
+        {"dimension": "feature", "key": "Maps", "rating": 4, "count": 3, "last_at": 50.0},
+        {"dimension": "user", "key": "u1", "rating": None, "count": 3, "last_at": None},
+    ])
+
+    snapshot = analytics.snapshot()
+    assert (snapshot["count"], snapshot["average_rating"], snapshot["distinct_users"]) == (3, 4.0, 1)
+    assert snapshot["features"]["maps"]["histogram"]["4"] == 3
+    assert snapshot["last_feedback_at"] == 50.0
@@ -0,0 +1,142 @@
+from src.services import feedback_ingestion, testing_feedback
+from src.services.feedback_analytics import FeedbackAnalytics
+from src.services.feedback_ingestion import (
+    FEEDBACK_ROWS_TABLE,
+    BigQuerySink,
+    FeedbackIngestion,
+    FeedbackServiceSink,
+    Journal,
+)
+
+
+class FlakyFirebase:
+    """Fails the nth save_feedback call once."""
+
+    def __init__(self, fail_on):
+        self.fail_on = fail_on
+        self.calls = 0
+        self.saved = []
+
+    def save_feedback(self, user_id, feedback):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise ConnectionError("firebase unavailable")
+        self.saved.append((user_id, feedback))
+
+
+def test_retried_batch_does_not_reapply_items_to_the_feedback_service():
+    firebase = FlakyFirebase(fail_on=3)
+    analytics = FeedbackAnalytics()
+    service = testing_feedback.TestingFeedbackService(firebase, bigquery_client=None, analytics=analytics)
+    ingestion = FeedbackIngestion([FeedbackServiceSink(service)], max_batch=10, retry_backoff=0)
+    for index in range(5):
+        ingestion.submit(f"user-{index}", {"rating": 5})
+
+    ingestion.flush()
+
+    assert analytics.snapshot()["count"] == 5
+    assert len(firebase.saved) == 5
+    assert firebase.calls == 6
+    assert ingestion.stats["retries"] == 1
+    assert not ingestion.dead_letters
+
+
+class FailingSink:
+    def __init__(self):
+        self.down = True
+        self.written = []
+
+    def write(self, items):
+        if self.down:
+            raise ConnectionError("sink unavailable")
+        self.written.extend(items)
+
+
+def test_rejected_batch_is_parked_and_redelivered_after_restart(tmp_path):
+    journal_path = str(tmp_path / "feedback.journal")
+    sink = FailingSink()
+    ingestion = FeedbackIngestion(
+        [sink],
+        journal=Journal(journal_path),
+        dead_letter_journal=Journal(f"{journal_path}.dead"),
+        max_retries=1,
+        retry_backoff=0,
+    )
+    ids = [ingestion.submit("user", {"rating": 4}) for _ in range(3)]
+    ingestion.flush()
+    assert ingestion.journal.pending() == []
+    assert len(ingestion.dead_letters) == 1
+
+    sink.down = False
+    restarted = FeedbackIngestion(
+        [sink],
+        journal=Journal(journal_path),
+        dead_letter_journal=Journal(f"{journal_path}.dead"),
+    )
+    restarted.start()
+    restarted.stop()
+
+    assert [item["id"] for item in sink.written] == ids
+    assert restarted.dead_letter_journal.pending() == []
+
+
+def test_submit_returns_once_the_item_is_fsynced(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(feedback_ingestion.os, "fsync", synced.append)
+    journal = Journal(str(tmp_path / "feedback.journal"))
+    ingestion = FeedbackIngestion([FailingSink()], journal=journal)
+
+    ingestion.submit("user", {"rating": 5})
+    assert journal.synced == 1 and journal.syncs == 1
+
+    # Group commit: one fsync covers every record appended before it
+    first, _, last = (journal.append({"n": n}) for n in range(3))
+    journal.sync(first)
+    journal.sync(last)
+    assert journal.synced == last and journal.syncs == 2
+
+
+def test_in_memory_dead_letters_are_bounded():
+    ingestion = FeedbackIngestion([FailingSink()], max_batch=1, max_retries=0, max_dead_letters=2)
+    for _ in range(5):
+        ingestion.submit("user", {"rating": 1})
+    ingestion.flush()
+    assert len(ingestion.dead_letters) == 2
+    assert ingestion.stats["failed"] == 5
+
+
+class AggregateBigQuery:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def query(self, query, job_config=None):
+        self.queries.append(query)
+        return self.rows
+
+
+def test_empty_analytics_are_seeded_once_from_one_aggregate_query():
+    bigquery = AggregateBigQuery([
+        {"dimension": "total", "key": None, "rating": 5, "count": 3, "last_at": 100.0},
+        {"dimension": "total", "key": None, "rating": None, "count": 1, "last_at": 200.0},
+        {"dimension": "destination", "key": "Jaipur", "rating": 5, "count": 2, "last_at": 100.0},
+        {"dimension": "user", "key": "user-1", "rating": None, "count": 3, "last_at": 100.0},
+        {"dimension": "user", "key": "user-2", "rating": None, "count": 1, "last_at": 200.0},
+    ])
+    service = testing_feedback.TestingFeedbackService(firebase_client=None, bigquery_client=bigquery)
+
+    assert service.seed_analytics()
+    assert not service.seed_analytics()
+
+    snapshot = service.analyze_feedback()
+    assert len(bigquery.queries) == 1
+    assert FEEDBACK_ROWS_TABLE in bigquery.queries[0]
+    assert (snapshot["count"], snapshot["ratings"], snapshot["average_rating"]) == (4, 3, 5.0)
+    assert snapshot["destinations"]["jaipur"]["count"] == 2
+    assert snapshot["distinct_users"] == 2
+    assert snapshot["last_feedback_at"] == 200.0
+
+
+def test_export_reads_the_table_bigquery_sink_writes():
+    assert BigQuerySink(None).table == testing_feedback.FEEDBACK_TABLE
+    assert f"`{FEEDBACK_ROWS_TABLE}`" in testing_feedback.EXPORT_SQL
@@ -0,0 +1,165 @@
+import threading
+import time
+
+from src.services.firebase_gateway import FirebaseGateway
+from src.services.payment_gateway import (
+    record_booking_request,
+    record_payment_confirmation,
+)
+
+
+class RecordingClient:
+    def __init__(self):
+        self.calls = []
+
+    def save_booking_request(self, user_id, key, booking_details):
+        self.calls.append(("booking", user_id, booking_details))
+
+    def save_payment_confirmation(self, user_id, key, payment_details):
+        self.calls.append(("payment", user_id, payment_details))
+
+    def save_feedback(self, user_id, feedback, key=None):
+        self.calls.append(("feedback", user_id, feedback))
+
+
+class FlakyBackend:
+    """Fails the first commit, then records committed paths."""
+
+    def __init__(self):
+        self.failed = False
+        self.committed = []
+
+    def supports(self, write):
+        return True
+
+    def commit(self, writes):
+        if not self.failed:
+            self.failed = True
+            raise ConnectionError("firebase unavailable")
+        self.committed.extend(write.path for write in writes)
+
+
+def test_payment_records_commit_through_the_default_client_backend():
+    client = RecordingClient()
+    gateway = FirebaseGateway(client)
+
+    assert record_booking_request("user-1", {"itinerary_id": "trip-1"}, gateway=gateway)
+    assert record_payment_confirmation("user-1", {"amount": "1000.00"}, gateway=gateway)
+
+    assert client.calls == [
+        ("booking", "user-1", {"itinerary_id": "trip-1"}),
+        ("payment", "user-1", {"amount": "1000.00"}),
+    ]
+
+
+def test_retry_backoff_does_not_hold_the_commit_lock():
+    backend = FlakyBackend()
+    gateway = FirebaseGateway(RecordingClient(), backend=backend, retry_backoff=0.3)
+    gateway.start()
+    writer = threading.Thread(target=gateway.save_feedback, args=("user-1", {"rating": 5}), kwargs={"durable": True})
+    writer.start()
+    deadline = time.monotonic() + 2
+    while not backend.failed and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # Mid-backoff: another thread can take the commit lock straight away
+    assert gateway._commit_lock.acquire(timeout=0.1)
+    gateway._commit_lock.release()
+
+    writer.join(timeout=2)
+    gateway.stop()
+    assert len(backend.committed) == 1
+    assert gateway.stats["retries"] == 1
+
+
+class StoreClient:
+    """Firebase-like client: keyed feedback rows and itineraries; the nth call fails once."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.calls = 0
+        self.feedback = {}
+        self.itineraries = {}
+
+    def _call(self):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise ConnectionError("firebase unavailable")
+
+    def save_feedback(self, user_id, feedback, key=None):
+        self._call()
+        self.feedback[key] = (user_id, feedback)
+
+    def save_itinerary(self, user_id, itinerary):
+        self._call()
+        self.itineraries[itinerary["id"]] = itinerary
+
+    def get_itinerary(self, itinerary_id):
+        return self.itineraries.get(itinerary_id)
+
+
+def test_retried_batch_does_not_replay_applied_writes():
+    client = StoreClient(fail_on=3)
+    # The flusher only wakes for a full batch, so the writes below are committed as one batch by flush()
+    gateway = FirebaseGateway(client, retry_backoff=0, flush_interval=10)
+    gateway.start()
+    for rating in range(1, 5):
+        gateway.save_feedback("user-1", {"rating": rating})
+
+    gateway.flush()
+    gateway.stop()
+
+    assert sorted(feedback["rating"] for _, feedback in client.feedback.values()) == [1, 2, 3, 4]
+    assert client.calls == 5  # Four writes, one of them retried
+    assert gateway.stats["retries"] == 1
+
+
+class SlowBackend:
+    """Commits to the client only once released."""
+
+    def __init__(self, client):
+        self.client = client
+        self.committing = threading.Event()
+        self.release = threading.Event()
+
+    def supports(self, write):
+        return True
+
+    def commit(self, writes):
+        self.committing.set()
+        self.release.wait(timeout=2)
+        for write in writes:
+            getattr(self.client, write.method)(*write.args, **write.kwargs)
+
+
+def test_read_waits_for_a_batch_being_committed():
+    client = StoreClient()
+    backend = SlowBackend(client)
+    gateway = FirebaseGateway(client, backend=backend)
+    gateway.start()
+    gateway.save_itinerary("user-1", {"id": "trip-1", "days": 2})
+    assert backend.committing.wait(timeout=2)
+
+    read = []
+    reader = threading.Thread(target=lambda: read.append(gateway.get_itinerary("trip-1")))
+    reader.start()
+    reader.join(timeout=0.1)
+    assert reader.is_alive()  # Waiting for the in-flight batch
+
+    backend.release.set()
+    reader.join(timeout=2)
+    gateway.stop()
+    assert read == [{"id": "trip-1", "days": 2}]
+
+
+def test_dead_letters_are_bounded():
+    gateway = FirebaseGateway(StoreClient(), backend=FlakyBackend(), max_retries=0, max_dead_letters=2)
+    for rating in range(3):
+        gateway.backend.failed = False
+        try:
+            gateway.save_feedback("user-1", {"rating": rating}, durable=True)
+        except ConnectionError:
+            pass
+
+    assert len(gateway.dead_letters) == 2
+    assert gateway.stats["failed"] == 3
@@ -0,0 +1,34 @@
+from decimal import Decimal
+
+import pytest
+
+from src.services.itinerary_cache import ItineraryCache, personalize
+
+ANALYTICS = [
+    {"name": "Stepwell", "budget": 8000},
+    {"name": "Fort", "budget": Decimal("9500.50")},
+    {"name": "Palace", "budget": Decimal("19000.00")},
+    {"name": "Bazaar walk"},
+]
+
+
+@pytest.mark.parametrize("budget", [10000, "10000", Decimal("10000")])
+def test_personalize_trims_decimal_budgets_to_the_users_budget(budget):
+    itinerary = personalize({"analytics": ANALYTICS}, "user-1", {"budget": budget})
+
+    assert [row["name"] for row in itinerary["analytics"]] == ["Stepwell", "Fort", "Bazaar walk"]
+
+
+def test_personalize_trims_budgets_stored_as_strings_by_the_cache():
+    cache = ItineraryCache()
+    cache.put("jaipur|heritage|10000|3", {"analytics": ANALYTICS})
+    base = cache.get("jaipur|heritage|10000|3")
+    assert base["analytics"][2]["budget"] == "19000.00"
+
+    itinerary = personalize(base, "user-1", {"budget": 10000})
+
+    assert "Palace" not in [row["name"] for row in itinerary["analytics"]]
+
+
+def test_personalize_keeps_every_row_without_a_valid_budget():
+    assert personalize({"analytics": ANALYTICS}, "user-1", {"budget": "flexible"})["analytics"] == ANALYTICS
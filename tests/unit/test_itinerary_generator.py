@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.services.agent_client import AgentClient
+from src.services.itinerary_generator import ItineraryGenerator
+
+
+class FailingStreamAI:
+    """Streams one day, then fails."""
+
+    def stream_itinerary(self, preferences):
+        yield {"day": {"day": 1, "activities": []}}
+        raise TimeoutError("gemini deadline exceeded")
+
+
+class BlockingPlaces:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def search(self, query):
+        self.release.wait(timeout=2)
+        return ()
+
+
+class EmptyRecommendations:
+    def lookup(self, theme, budget):
+        return []
+
+
+class RecordingFirebase:
+    def __init__(self):
+        self.saved = []
+
+    def save_itinerary(self, user_id, itinerary):
+        self.saved.append(itinerary)
+
+
+def test_stream_reports_an_ai_failure_and_saves_nothing():
+    firebase = RecordingFirebase()
+    places = BlockingPlaces()
+    generator = ItineraryGenerator(
+        FailingStreamAI(), None, None, firebase, maps_client=object(),
+        recommendations=EmptyRecommendations(), places=places,
+    )
+
+    events = list(generator.generate_stream("user-1", {"destination": "Jaipur", "theme": "heritage"}))
+    places.release.set()
+
+    kinds = [event["event"] for event in events]
+    assert kinds[0] == "day" and kinds[-1] == "error" and "done" not in kinds
+    assert events[-1]["stage"] == "ai"
+    assert firebase.saved == []
+
+
+class SlowAgent:
+    """Writes an itinerary reply line by line, recording how far it got."""
+
+    def __init__(self):
+        self.finished = False
+
+    def stream_text(self, prompt):
+        yield '{"day": {"title": "Old city", '
+        yield '"activities": [{"name": "Amber Fort"}]}}\n{"day": {"title": "Lak'
+        yield 'es", "activities": []}}\n'
+        yield '{"summary": "Two days in Jaipur"}'
+        self.finished = True
+
+
+def test_agent_client_streams_day_one_before_the_model_finishes():
+    agent = SlowAgent()
+    firebase = RecordingFirebase()
+    generator = ItineraryGenerator(
+        AgentClient(agent.stream_text), None, None, firebase, maps_client=object(),
+        recommendations=EmptyRecommendations(), places=BlockingPlaces(),
+        stage_timeouts={"maps": 0.01},
+    )
+    events = generator.generate_stream("user-1", {"destination": "Jaipur"})
+
+    first = next(events)
+    assert first == {"event": "day", "index": 0, "day": {"title": "Old city", "activities": [{"name": "Amber Fort"}]}}
+    assert not agent.finished
+
+    rest = list(events)
+    assert agent.finished
+    assert [event["index"] for event in rest if event["event"] == "day"] == [1]
+    assert firebase.saved[0]["summary"] == "Two days in Jaipur"
+
+
+def test_agent_client_rejects_a_reply_that_is_not_json_lines():
+    def stream_text(prompt):
+        yield "Here is your itinerary!\n"
+
+    with pytest.raises(ValueError):
+        list(AgentClient(stream_text).stream_itinerary({"destination": "Jaipur"}))
+
+
+@pytest.mark.asyncio
+async def test_agent_client_awaits_an_async_text_stream():
+    async def astream_text(prompt):
+        for delta in ('{"day": {"title": "Old city"}}\n{"summ', 'ary": "One day"}'):
+            await asyncio.sleep(0)
+            yield delta
+
+    def stream_text(prompt):
+        raise AssertionError("blocking stream on the async path")
+
+    client = AgentClient(stream_text, astream_text)
+
+    assert await client.agenerate_itinerary({"destination": "Jaipur"}) == {
+        "details": [{"title": "Old city"}], "summary": "One day",
+    }
+    # Without an async stream the blocking one runs on the offload pool
+    assert await AgentClient(SlowAgent().stream_text).agenerate_itinerary({}) == {
+        "details": [{"title": "Old city", "activities": [{"name": "Amber Fort"}]}, {"title": "Lakes", "activities": []}],
+        "summary": "Two days in Jaipur",
+    }
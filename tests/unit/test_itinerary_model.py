@@ -0,0 +1,85 @@
+import json
+from decimal import Decimal
+
+from src.services.itinerary_model import Itinerary, Place, compact_places
+
+
+def _payload():
+    return {
+        "id": "trip-1",
+        "user_id": "u1",
+        "summary": "Three days in Jaipur",
+        "preferences": {"destination": "Jaipur", "budget": 20000},
+        "details": [
+            {"title": "Forts", "activities": [
+                {"name": "Amber Fort", "place_id": "amber", "start_time": "09:30", "end_time": "12:00", "type": "outdoor"},
+                {"title": "Lunch", "start": 750, "end": 810, "cost": 400},
+            ]},
+            {"theme": "Markets", "activities": []},
+        ],
+        "locations": [{
+            "place_id": "amber",
+            "name": "Amber Fort",
+            "geometry": {"location": {"lat": 26.98, "lng": 75.85}},
+            "formatted_address": "Devisinghpura, Amer",
+            "rating": 4.6,
+            "types": ["tourist_attraction"],
+            "opening_hours": {"periods": [{"open": {"time": "0800"}, "close": {"time": "1730"}}]},
+        }],
+        "analytics": [{"name": "Palace", "budget": 19000}],
+        "route": {
+            "stops": [{"place_id": "amber", "name": "Amber Fort", "arrival": 570.0, "departure": 720.0, "travel": 25.0}],
+            "dropped": [],
+            "travel_minutes": 25.0,
+        },
+        "degraded": ["analytics"],
+    }
+
+
+def test_payload_round_trip_keeps_the_fields_the_services_use():
+    model = Itinerary.from_payload(_payload())
+
+    assert model.destination == "Jaipur"
+    assert [day.title for day in model.days] == ["Forts", "Markets"]
+    assert (model.days[0].activities[0].start, model.days[0].activities[0].end) == (570, 720)
+    assert model.locations[0].window == (480, 1050)
+    assert model.route.stops[0].arrival == 570.0
+
+    payload = model.to_payload()
+    assert payload["details"][0]["activities"][1] == {"name": "Lunch", "start": 750, "end": 810, "cost": 400}
+    assert payload["locations"][0]["geometry"] == {"location": {"lat": 26.98, "lng": 75.85}}
+    assert payload["locations"][0]["address"] == "Devisinghpura, Amer"
+    assert Itinerary.from_payload(payload) == model
+
+
+def test_bytes_and_json_round_trip():
+    model = Itinerary.from_payload(_payload())
+
+    assert Itinerary.from_bytes(model.to_bytes()) == model
+    assert Itinerary.from_dict(json.loads(model.to_json())) == model
+
+
+def test_bigquery_decimals_are_encoded():
+    payload = {**_payload(), "analytics": [{"name": "Palace", "budget": Decimal("19000.00")}]}
+    model = Itinerary.from_payload(payload)
+
+    assert Itinerary.from_bytes(model.to_bytes()).analytics == ({"name": "Palace", "budget": "19000.00"},)
+    assert json.loads(model.to_json())["analytics"] == [{"name": "Palace", "budget": "19000.00"}]
+
+
+def test_rows_written_before_a_field_was_added_still_load():
+    row = Place(place_id="amber", name="Amber Fort").to_row()
+
+    assert Place.from_row(row[:2]) == Place(place_id="amber", name="Amber Fort")
+
+
+def test_opening_hours_past_midnight_close_at_the_end_of_the_day():
+    late = {"name": "Night market", "opening_hours": {"periods": [{"open": {"time": "1800"}, "close": {"time": "0200"}}]}}
+    same = {"name": "Closed", "opening_hours": {"periods": [{"open": {"time": "0900"}, "close": {"time": "0900"}}]}}
+    explicit = {"name": "Fort", "window": [540, 600], "opening_hours": late["opening_hours"]}
+
+    assert Place.from_maps(late).window == (1080, 1440)
+    assert Place.from_maps(same).window == (540, 1440)
+    assert Place.from_maps(explicit).window == (540, 600)
+    assert Place.from_maps({"name": "Park"}).window is None
+    assert compact_places([late])[0] == {"place_id": None, "name": "Night market", "types": [], "window": [1080, 1440]}
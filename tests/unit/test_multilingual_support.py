@@ -0,0 +1,75 @@
+import pytest
+
+from src.services.multilingual_support import (
+    MultilingualSupportService,
+    pack_segments,
+    unpack_segments,
+)
+
+
+class UpperCaseAI:
+    """Translates by upper-casing; markers survive as a model keeps them."""
+
+    def __init__(self):
+        self.calls = []
+
+    def translate(self, text, target_language):
+        self.calls.append(text)
+        return text.upper()
+
+
+class LossyAI(UpperCaseAI):
+    """Drops the last line of a packed request, as a model sometimes merges or skips segments."""
+
+    def translate(self, text, target_language):
+        self.calls.append(text)
+        return "\n".join(text.upper().splitlines()[:-1]) if "\n" in text else text.upper()
+
+
+def test_translate_many_packs_misses_into_one_call_per_language():
+    ai = UpperCaseAI()
+    service = MultilingualSupportService(ai)
+
+    result = service.translate_many(["Amber Fort", "City Palace", "Amber Fort"], ["hi", "ta"])
+
+    assert result == {lang: ["AMBER FORT", "CITY PALACE", "AMBER FORT"] for lang in ("hi", "ta")}
+    assert len(ai.calls) == 2
+
+    # Known translations come from the translation memory
+    service.translate_many(["City Palace"], ["hi"])
+    assert len(ai.calls) == 2
+
+
+def test_short_reply_falls_back_to_one_call_per_string():
+    ai = LossyAI()
+    service = MultilingualSupportService(ai)
+
+    result = service.translate_many(["Amber Fort", "City Palace", "Hawa Mahal"], ["hi"])
+
+    assert result["hi"] == ["AMBER FORT", "CITY PALACE", "HAWA MAHAL"]
+    assert len(ai.calls) == 4
+
+
+def test_unpack_rejects_missing_or_reordered_segments():
+    packed = pack_segments(["a", "b", "c"])
+
+    assert unpack_segments(packed, 3) == ["a", "b", "c"]
+    assert unpack_segments("[[0]] a\n[[2]] c", 3) is None
+    assert unpack_segments("[[1]] b\n[[0]] a", 2) is None
+
+
+@pytest.mark.parametrize("text, language", [(None, "hi"), ("Amber Fort", None), (42, "hi")])
+def test_translate_rejects_non_strings(text, language):
+    with pytest.raises(ValueError):
+        MultilingualSupportService(UpperCaseAI()).translate(text, language)
+
+
+@pytest.mark.asyncio
+async def test_atranslate_many_matches_translate_many():
+    ai = UpperCaseAI()
+    service = MultilingualSupportService(ai)
+
+    result = await service.atranslate_many(["Amber Fort", "City Palace"], ["hi"])
+
+    assert result == {"hi": ["AMBER FORT", "CITY PALACE"]}
+    assert len(ai.calls) == 1
@@ -0,0 +1,34 @@
+from src.services.places_index import GeoGridIndex, PlacesService
+
+
+def _place(place_id, lat, lng):
+    return {"place_id": place_id, "name": place_id, "geometry": {"location": {"lat": lat, "lng": lng}}}
+
+
+class CountingMaps:
+    def __init__(self):
+        self.calls = 0
+
+    def places(self, query):
+        self.calls += 1
+        return {"results": [_place("fort", 26.98, 75.85)]}
+
+
+def test_index_evicts_the_least_recently_added_places():
+    index = GeoGridIndex(max_places=2)
+    index.add([_place("a", 26.90, 75.80), _place("b", 26.91, 75.81)])
+    index.add([_place("a", 26.90, 75.80), _place("c", 30.0, 80.0)])
+
+    assert len(index) == 2
+    assert [place["place_id"] for place in index.nearby(26.90, 75.80, 5000)] == ["a"]
+    assert index.nearby(30.0, 80.0, 100)[0]["place_id"] == "c"
+
+
+def test_cached_search_results_cannot_be_changed_by_a_caller():
+    maps = CountingMaps()
+    service = PlacesService(maps, index=GeoGridIndex())
+
+    first = service.search("Jaipur")
+    assert isinstance(first, tuple)
+    assert service.search("  jaipur ") == first
+    assert maps.calls == 1
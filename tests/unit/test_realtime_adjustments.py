@@ -0,0 +1,63 @@
+import copy
+
+from src.services.realtime_adjustments import (
+    apply_patch,
+    firebase_updates,
+    replan_for_conditions,
+)
+
+
+def _itinerary():
+    return {
+        "route": {
+            "stops": [
+                {"place_id": "a", "arrival": 600.0, "departure": 660.0, "closes": 670.0},
+                {"place_id": "b", "arrival": 680.0, "departure": 740.0, "travel": 20.0},
+                {"place_id": "c", "arrival": 760.0, "departure": 820.0, "travel": 20.0},
+            ]
+        }
+    }
+
+
+def _firebase_apply(document, updates):
+    """Apply a multi-path update the way Firebase does (None deletes the path)."""
+    for path, value in updates.items():
+        *parents, key = path.split("/")
+        node = document
+        for token in parents:
+            node = node[int(token)] if isinstance(node, list) else node.setdefault(token, {})
+        if value is None:
+            node.pop(key, None)
+        else:
+            node[key] = copy.deepcopy(value)
+    return document
+
+
+def test_delay_that_drops_an_earlier_stop_rewrites_the_stop_list():
+    itinerary = _itinerary()
+    patch = replan_for_conditions(itinerary, {"delays": [{"at": 0, "minutes": 90}]})
+    patched = apply_patch(copy.deepcopy(itinerary), patch)
+
+    updates = firebase_updates(patch, patched)
+
+    assert [stop["place_id"] for stop in updates["route/stops"]] == ["b", "c"]
+    assert not any(path.startswith("route/stops/") for path in updates)
+    assert _firebase_apply(copy.deepcopy(itinerary), updates) == patched
+
+
+def test_in_place_changes_write_only_their_own_paths():
+    itinerary = _itinerary()
+    itinerary["route"]["stops"][0]["closes"] = 1440.0
+    patch = replan_for_conditions(itinerary, {"delays": [{"at": 0, "minutes": 30}]})
+    patched = apply_patch(copy.deepcopy(itinerary), patch)
+
+    updates = firebase_updates(patch, patched)
+
+    assert "route/stops" not in updates
+    assert updates["route/stops/0/arrival"] == 630.0
+    assert _firebase_apply(copy.deepcopy(itinerary), updates) == patched
+
+
+def test_unchanged_conditions_produce_no_patch():
+    itinerary = {**_itinerary(), "conditions": {"weather": "Clear"}}
+    assert replan_for_conditions(itinerary, {"weather": "Clear"}) == []
@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from src.services.recommendations_repository import RecommendationsRepository
+
+
+class TableBigQuery:
+    def query(self, query, job_config=None):
+        return [
+            {"name": "Palace", "theme": "heritage", "budget": Decimal("45000.00")},
+            {"name": "Fort", "theme": "heritage", "budget": Decimal("12000.50")},
+            {"name": "Stepwell", "theme": "heritage", "budget": 8000},
+        ]
+
+
+def test_numeric_budgets_are_filtered_and_sorted():
+    repository = RecommendationsRepository(TableBigQuery())
+    repository.refresh()
+
+    rows = repository.lookup("heritage", 20000)
+
+    assert [row["name"] for row in rows] == ["Stepwell", "Fort"]
+
+
+class CountingBigQuery:
+    def __init__(self):
+        self.calls = 0
+
+    def query(self, query, job_config=None):
+        self.calls += 1
+        return [{"name": "Fort", "theme": "heritage", "budget": 100}]
+
+
+def test_cached_lookups_are_bounded_and_least_recently_used_go_first():
+    bigquery = CountingBigQuery()
+    repository = RecommendationsRepository(bigquery, max_lookups=2)
+
+    repository.lookup("heritage", 1000)
+    repository.lookup("beach", 1000)
+    repository.lookup("heritage", 1000)  # hit: heritage becomes most recent
+    repository.lookup("food", 1000)  # evicts beach
+
+    assert len(repository._lookups) == 2
+    assert bigquery.calls == 3
+    repository.lookup("heritage", 1000)
+    assert bigquery.calls == 3
+    repository.lookup("beach", 1000)
+    assert bigquery.calls == repository.queries == 4
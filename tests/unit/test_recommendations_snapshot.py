@@ -0,0 +1,97 @@
+from decimal import Decimal
+
+import pytest
+
+from src.services.recommendations_repository import RecommendationsRepository
+from src.services.recommendations_snapshot import (
+    RecommendationsSnapshot,
+    SnapshotLoader,
+    write_snapshot,
+)
+
+pa = pytest.importorskip("pyarrow")
+
+ROWS = [
+    {"name": "Palace", "theme": "Heritage", "budget": Decimal("45000.00")},
+    {"name": "Free walk", "theme": "heritage", "budget": None},
+    {"name": "Fort", "theme": "heritage", "budget": Decimal("12000.50")},
+    {"name": "Stepwell", "theme": "HERITAGE", "budget": Decimal("8000.00")},
+    {"name": "Beach shack", "theme": "beach", "budget": Decimal("3000.00")},
+]
+
+
+class RowsBigQuery:
+    """BigQuery stand-in whose results are plain rows (no to_arrow())."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def query(self, query, job_config=None):
+        self.queries += 1
+        return list(self.rows)
+
+
+class DownBigQuery:
+    def query(self, query, job_config=None):
+        raise ConnectionError("bigquery unavailable")
+
+
+def test_lookup_returns_the_cheapest_rows_within_the_bucket(tmp_path):
+    path = str(tmp_path / "recommendations.arrow")
+    write_snapshot(pa.Table.from_pylist(ROWS), path)
+    snapshot = RecommendationsSnapshot(path)
+
+    # A null budget sorts as 0 instead of breaking the budget index
+    assert [row["name"] for row in snapshot.lookup("heritage", 20000, limit=10)] == ["Free walk", "Stepwell", "Fort"]
+    assert [row["name"] for row in snapshot.lookup("heritage", -1, limit=2)] == ["Free walk", "Stepwell"]
+    assert snapshot.lookup("heritage", 20000, limit=1)[0] == {"name": "Free walk", "theme": "heritage", "budget": None}
+    assert snapshot.lookup("museums", 20000, limit=10) == []
+
+
+def test_string_and_integer_budgets_with_nulls_are_indexed(tmp_path):
+    path = str(tmp_path / "recommendations.arrow")
+    rows = [{"name": name, "theme": "food", "budget": budget} for name, budget in (("a", "1200"), ("b", None), ("c", "300"))]
+    write_snapshot(pa.Table.from_pylist(rows), path)
+    assert [row["name"] for row in RecommendationsSnapshot(path).lookup("food", 500, limit=10)] == ["b", "c"]
+
+    write_snapshot(pa.table({"name": ["a", "b"], "theme": ["food", "food"], "budget": pa.array([700, None])}), path)
+    assert [row["name"] for row in RecommendationsSnapshot(path).lookup("food", 500, limit=10)] == ["b"]
+
+
+def test_repository_serves_lookups_from_the_snapshot(tmp_path):
+    bigquery = RowsBigQuery(ROWS)
+    repository = RecommendationsRepository(bigquery, snapshot=SnapshotLoader(str(tmp_path / "recommendations.arrow")))
+    repository.start()
+    repository.stop()
+
+    assert [row["name"] for row in repository.lookup("Heritage", 10000)] == ["Free walk", "Stepwell"]
+    assert [row["name"] for row in repository.lookup("beach", 10000)] == ["Beach shack"]
+    assert bigquery.queries == 1
+
+
+def test_new_exports_are_swapped_in(tmp_path):
+    loader = SnapshotLoader(str(tmp_path / "recommendations.arrow"))
+    assert loader.lookup("beach", 10000, limit=10) is None
+
+    loader.refresh_from(RowsBigQuery(ROWS))
+    first = loader.snapshot
+    assert not loader.reload()
+    loader.refresh_from(RowsBigQuery([{"name": "Lagoon", "theme": "beach", "budget": Decimal("2000.00")}]))
+
+    assert loader.snapshot is not first
+    assert [row["name"] for row in loader.lookup("beach", 10000, limit=10)] == ["Lagoon"]
+    assert [row["name"] for row in first.lookup("beach", 10000, limit=10)] == ["Beach shack"]
+
+
+def test_start_serves_the_last_export_when_bigquery_is_down(tmp_path):
+    path = str(tmp_path / "recommendations.arrow")
+    SnapshotLoader(path).refresh_from(RowsBigQuery(ROWS))
+
+    repository = RecommendationsRepository(DownBigQuery(), snapshot=SnapshotLoader(path))
+    repository.start()
+    repository.stop()
+    assert [row["name"] for row in repository.lookup("beach", 10000)] == ["Beach shack"]
+
+    with pytest.raises(ConnectionError):
+        RecommendationsRepository(DownBigQuery(), snapshot=SnapshotLoader(str(tmp_path / "missing.arrow"))).start()
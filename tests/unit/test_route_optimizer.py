@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from src.services.route_optimizer import (
+    DistanceMatrixCache,
+    haversine_minutes,
+    plan_day,
+)
+
+DAY_START, DAY_END = 8 * 60, 20 * 60
+NEAREST_NEIGHBOUR = {"time_budget_ms": 0.0, "construction_rules": ((0.0, 0.0),)}
+
+
+def _stops(count, seed):
+    rng = random.Random(seed)
+    stops = []
+    for i in range(count):
+        opens = rng.choice([8, 9, 10, 12, 14]) * 60
+        stops.append({
+            "place_id": f"p{i}",
+            "geometry": {"location": {"lat": 26.85 + rng.random() * 0.2, "lng": 75.70 + rng.random() * 0.25}},
+            "window": (opens, opens + rng.choice([2, 4, 8]) * 60),
+            "visit_minutes": rng.choice([10, 30, 60]),
+        })
+    return stops
+
+
+class FixedMaps:
+    """Distance Matrix stand-in answering 7 minutes for every pair."""
+
+    def __init__(self):
+        self.requests = 0
+
+    def distance_matrix(self, origins, destinations, mode):
+        self.requests += 1
+        return {"rows": [{"elements": [{"status": "OK", "duration": {"value": 420}} for _ in destinations]}
+                         for _ in origins]}
+
+
+@pytest.mark.parametrize("count", [10, 50, 200])
+def test_every_stop_is_visited_within_its_window(count):
+    for seed in range(5):
+        stops = _stops(count, seed)
+        plan = plan_day(stops, day_start=DAY_START, day_end=DAY_END)
+
+        assert len(plan["stops"]) + len(plan["dropped"]) == count
+        departure = DAY_START
+        for stop in plan["stops"]:
+            opens, closes = stop["window"]
+            assert stop["arrival"] >= max(opens, departure + stop["travel"]) - 1e-9
+            assert stop["departure"] <= min(closes, DAY_END) + 1e-9
+            departure = stop["departure"]
+
+
+@pytest.mark.parametrize("count", [10, 50, 200])
+def test_plan_is_never_worse_than_nearest_neighbour(count):
+    for seed in range(5):
+        stops = _stops(count, seed)
+        matrix = haversine_minutes([(s["geometry"]["location"]["lat"], s["geometry"]["location"]["lng"]) for s in stops])
+        plan = plan_day(stops, day_start=DAY_START, day_end=DAY_END, matrix=matrix)
+        nn = plan_day(stops, day_start=DAY_START, day_end=DAY_END, matrix=matrix, **NEAREST_NEIGHBOUR)
+
+        assert len(plan["stops"]) >= len(nn["stops"])
+        if len(plan["stops"]) == len(nn["stops"]):
+            assert plan["travel_minutes"] <= nn["travel_minutes"] + 1e-9
+
+
+def test_distance_cache_is_bounded():
+    maps = FixedMaps()
+    cache = DistanceMatrixCache(maps, max_pairs=4)
+    points = [(26.90, 75.80), (26.91, 75.81), (26.92, 75.82)]
+
+    matrix = cache.minutes(points)
+
+    assert matrix[0, 1] == matrix[2, 1] == 7.0
+    assert len(cache._pairs) == 4
+    # Evicted pairs are fetched again rather than served stale or missing
+    assert cache.minutes(points)[1, 0] == 7.0
+    assert maps.requests == 2 and len(cache._pairs) == 4
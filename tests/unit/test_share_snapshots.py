@@ -0,0 +1,42 @@
+from src.services.cost_sharing import CostSharingService
+from src.services.share_snapshots import LocalArtifactStore, ShareSnapshotService
+
+
+class CountingFirebase:
+    def __init__(self, itineraries):
+        self.itineraries = itineraries
+        self.reads = 0
+
+    def get_itinerary(self, itinerary_id):
+        self.reads += 1
+        return self.itineraries.get(itinerary_id)
+
+
+def _trip(cost="500"):
+    return {"destination": "Jaipur", "details": [{"activities": [{"name": "Fort", "cost": cost}]}]}
+
+
+def test_repeat_share_reuses_the_snapshot_without_reading_the_itinerary(tmp_path):
+    firebase = CountingFirebase({"trip-1": _trip()})
+    snapshots = ShareSnapshotService(LocalArtifactStore(str(tmp_path)))
+    service = CostSharingService(firebase, snapshots=snapshots)
+
+    first = service.share_snapshot("trip-1")
+    assert service.share_snapshot("trip-1") == first
+    assert firebase.reads == 1 and snapshots.renders == 1
+
+    # A change made in this process is picked up on the next share
+    firebase.itineraries["trip-1"] = {"id": "trip-1", **_trip("900")}
+    service.track_itinerary(firebase.itineraries["trip-1"])
+    changed = service.share_snapshot("trip-1")
+    assert changed["hash"] != first["hash"]
+    assert firebase.reads == 2
+
+
+def test_published_snapshots_are_bounded(tmp_path):
+    snapshots = ShareSnapshotService(LocalArtifactStore(str(tmp_path)), max_entries=2)
+    for itinerary_id in ("a", "b", "c"):
+        snapshots.publish({"id": itinerary_id, **_trip()})
+
+    assert snapshots.current("a") is None
+    assert snapshots.current("b") is not None and snapshots.current("c") is not None
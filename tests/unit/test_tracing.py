@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from src.services.tracing import (
+    FileSpanExporter,
+    annotate,
+    configure_tracing,
+    span,
+    traced,
+)
+
+trace = pytest.importorskip("opentelemetry.trace")
+in_memory = pytest.importorskip("opentelemetry.sdk.trace.export.in_memory_span_exporter")
+
+TRACE_ID = 0x5CE0E9A56015FEC5AADFA328AE398115
+
+
+class Maps:
+    def geocode(self, address):
+        return [{"formatted_address": address}]
+
+    async def adirections(self, origin, destination):
+        return {"legs": [origin, destination]}
+
+
+@pytest.fixture(scope="module")
+def exporter():
+    # The global provider can be installed once per process. New traces are never
+    # sampled (rate 0), so what gets recorded depends only on the parent's decision.
+    exporter = in_memory.InMemorySpanExporter()
+    provider = configure_tracing(exporter=exporter, sample_rate=0.0)
+    if trace.get_tracer_provider() is not provider:
+        pytest.skip("another tracer provider is already installed")
+    yield exporter, provider
+
+
+@pytest.fixture
+def spans(exporter):
+    memory, provider = exporter
+    memory.clear()
+
+    def finished():
+        provider.force_flush()
+        return memory.get_finished_spans()
+    return finished
+
+
+def _parent(sampled):
+    context = trace.SpanContext(TRACE_ID, 0x1, is_remote=True, trace_flags=trace.TraceFlags(int(sampled)))
+    return trace.use_span(trace.NonRecordingSpan(context))
+
+
+def test_client_spans_carry_peer_method_payload_sizes_and_annotations(spans):
+    maps = traced(Maps(), "maps")
+
+    with _parent(sampled=True), span("itinerary.generate", cache_hit=False):
+        annotate(retry_count=2)
+        maps.geocode("Jaipur")
+
+    client, operation = spans()
+    assert client.name == "maps.geocode" and client.kind == trace.SpanKind.CLIENT
+    assert client.parent.span_id == operation.context.span_id
+    assert client.attributes["peer.service"] == "maps"
+    assert client.attributes["rpc.method"] == "geocode"
+    assert client.attributes["payload.request_bytes"] == len("Jaipur")
+    assert client.attributes["payload.response_bytes"] == len(b'[{"formatted_address":"Jaipur"}]')
+    assert operation.attributes == {"cache.hit": False, "retry.count": 2}
+
+
+@pytest.mark.asyncio
+async def test_async_client_methods_are_traced_and_stay_coroutines(spans):
+    maps = traced(Maps(), "maps")
+
+    with _parent(sampled=True):
+        assert await maps.adirections("a", "b") == {"legs": ["a", "b"]}
+
+    assert [item.name for item in spans()] == ["maps.adirections"]
+
+
+def test_unsampled_requests_create_no_spans(spans):
+    maps = traced(Maps(), "maps")
+
+    with _parent(sampled=False), span("itinerary.generate"):
+        maps.geocode("Jaipur")
+    # A new trace is subject to the ratio sampler, which records none at rate 0
+    with span("itinerary.generate"):
+        maps.geocode("Jaipur")
+
+    assert spans() == ()
+
+
+def test_file_exporter_appends_one_json_object_per_span(spans, tmp_path):
+    with _parent(sampled=True), span("booking.book"):
+        traced(Maps(), "maps").geocode("Jaipur")
+    path = tmp_path / "traces.jsonl"
+    exporter = FileSpanExporter(str(path))
+
+    exporter.export(spans())
+    exporter.export(spans()[:1])
+    exporter.shutdown()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["maps.geocode", "booking.book", "maps.geocode"]
+    assert lines[0]["attributes"]["peer.service"] == "maps"
+
+
+def test_traced_leaves_missing_and_traced_clients_alone():
+    maps = traced(Maps(), "maps")
+
+    assert traced(None, "maps") is None
+    assert traced(maps, "maps") is maps
+    assert maps.geocode("Jaipur") == [{"formatted_address": "Jaipur"}]
@@ -0,0 +1,37 @@
+import sqlite3
+
+from src.services.translation_memory import TranslationMemory
+
+
+def _accessed(path):
+    with sqlite3.connect(path) as db:
+        return dict(db.execute("SELECT key, accessed FROM translations"))
+
+
+def test_store_stays_bounded_by_least_recent_access(tmp_path):
+    path = str(tmp_path / "memory.db")
+    memory = TranslationMemory(path, max_entries=10, max_stored_entries=3)
+    memory.put_many({"a": "A", "b": "B"})
+    memory.put_many({"a": "A2", "c": "C"})  # a replaced, not counted twice
+    memory.get_many(["a"])
+    memory.put_many({"d": "D"})
+
+    assert set(_accessed(path)) == {"a", "c", "d"}
+    # The count survives a restart and keeps bounding the store
+    reopened = TranslationMemory(path, max_stored_entries=3)
+    reopened.put_many({"e": "E"})
+    assert len(_accessed(path)) == 3
+
+
+def test_read_hits_write_access_times_in_batches(tmp_path):
+    path = str(tmp_path / "memory.db")
+    memory = TranslationMemory(path, touch_batch=3, touch_interval=3600)
+    memory.put_many({"a": "A", "b": "B", "c": "C"})
+    written = _accessed(path)
+
+    memory.get_many(["a", "b"])
+    assert _accessed(path) == written
+
+    memory.get_many(["c"])
+    assert all(_accessed(path)[key] >= written[key] for key in "abc")
+    assert _accessed(path) != written
@@ -0,0 +1,83 @@
+import threading
+
+from src.services import maps_integration
+from src.services.user_profile import ProfileCache, UserProfileService
+
+
+class SlowFirebase:
+    """Profile store whose reads block until released, counting them."""
+
+    def __init__(self, profiles):
+        self.profiles = profiles
+        self.reads = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_user_profile(self, user_id):
+        self.reads += 1
+        self.release.wait(timeout=2)
+        return self.profiles.get(user_id)
+
+    def save_user_profile(self, user_id, data):
+        self.profiles[user_id] = dict(data)
+
+    def update_user_profile(self, user_id, data):
+        self.profiles[user_id].update(data)
+
+
+def test_concurrent_misses_share_one_read():
+    firebase = SlowFirebase({"u1": {"name": "Asha", "interests": ["forts"]}})
+    firebase.release.clear()
+    service = UserProfileService(firebase)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.get_profile("u1"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while service.cache.stats()["coalesced"] < 7:
+        threading.Event().wait(0.001)
+    firebase.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert firebase.reads == 1
+    assert [profile["name"] for profile in results] == ["Asha"] * 8
+
+
+def test_writes_invalidate_the_cached_profile():
+    firebase = SlowFirebase({"u1": {"name": "Asha"}})
+    service = UserProfileService(firebase)
+
+    assert service.get_profile("u1")["name"] == "Asha"
+    service.update_name("u1", "Ravi")
+    assert service.get_profile("u1")["name"] == "Ravi"
+    assert firebase.reads == 2
+
+
+def test_unknown_users_are_not_cached():
+    firebase = SlowFirebase({})
+    service = UserProfileService(firebase)
+
+    assert service.get_profile("u2") is None
+    firebase.profiles["u2"] = {"name": "Meera"}
+    assert service.get_profile("u2")["name"] == "Meera"
+    assert service.cache.stats()["entries"] == 1
+
+
+def test_caches_are_filled_only_by_their_own_loader():
+    firebase = SlowFirebase({"u3": {"name": "Kabir"}})
+    service = UserProfileService(firebase)
+
+    assert maps_integration.get_user_profile("u3") == {"user_id": "u3", "preferences": {}, "history": []}
+    assert service.get_profile("u3")["name"] == "Kabir"
+    assert firebase.reads == 1
+
+
+def test_cache_is_bounded():
+    cache = ProfileCache(lambda user_id: {"name": user_id}, max_entries=2)
+    for user_id in ("a", "b", "c"):
+        cache.get(user_id)
+
+    assert cache.stats()["entries"] == 2
+    cache.get("a")
+    assert cache.stats()["misses"] == 4
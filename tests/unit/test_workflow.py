@@ -0,0 +1,131 @@
+import asyncio
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# app/app/__init__.py imports the ADK root agent, so the workflow module is loaded on its own
+_spec = importlib.util.spec_from_file_location("workflow", Path(__file__).parents[2] / "app" / "app" / "workflow.py")
+workflow = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(workflow)
+Step, Workflow = workflow.Step, workflow.Workflow
+
+
+def _writer(key, value, delay=0.0, log=None):
+    def fn(session_state):
+        if log is not None:
+            log.append(key)
+        time.sleep(delay)
+        session_state[key] = value
+    return fn
+
+
+def test_steps_run_after_their_inputs():
+    log = []
+    flow = Workflow("order", [
+        Step("cost", _writer("cost", 1, log=log), inputs=("itinerary",), outputs=("cost",)),
+        Step("itinerary", _writer("itinerary", {"id": "trip-1"}, delay=0.05, log=log), inputs=("user_id",), outputs=("itinerary",)),
+        Step("booking", _writer("booking", 2, log=log), inputs=("itinerary", "cost"), outputs=("booking",)),
+    ])
+
+    state = flow.run({"user_id": "user-1"})
+
+    assert log == ["itinerary", "cost", "booking"]
+    assert {name: step["status"] for name, step in state["workflow"]["order"]["steps"].items()} == {
+        "itinerary": "success", "cost": "success", "booking": "success",
+    }
+
+
+def test_failure_skips_dependants_but_not_independent_steps():
+    def fail(session_state):
+        raise RuntimeError("maps down")
+
+    flow = Workflow("failure", [
+        Step("itinerary", fail, outputs=("itinerary",)),
+        Step("cost", _writer("cost", 1), inputs=("itinerary",), outputs=("cost",)),
+        Step("feedback", _writer("feedbacks", []), inputs=("feedback",), outputs=("feedbacks",)),
+    ])
+
+    report = flow.run({"feedback": {"rating": 5}})["workflow"]["failure"]["steps"]
+
+    assert report["itinerary"]["status"] == "error" and "maps down" in report["itinerary"]["error"]
+    assert report["cost"] == {"status": "skipped", "missing": ["itinerary"]}
+    assert report["feedback"]["status"] == "success"
+
+
+def test_max_workers_caps_one_run_not_the_process():
+    lock = threading.Lock()
+    active = [0, 0]  # current, peak
+
+    def step(session_state):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+
+    flow = Workflow("fanout", [Step(f"s{i}", step) for i in range(4)], max_workers=2)
+
+    flow.run({})
+    assert active[1] == 2
+
+    # Concurrent runs each get their own max_workers: 4 runs x 2 steps meet at the barrier
+    barrier = threading.Barrier(8)
+    reports = []
+    flow = Workflow("concurrent", [Step(f"s{i}", lambda state: barrier.wait(timeout=2)) for i in range(4)], max_workers=2)
+    runs = [threading.Thread(target=lambda: reports.append(flow.run({})["workflow"]["concurrent"]["steps"])) for _ in range(4)]
+    for run in runs:
+        run.start()
+    for run in runs:
+        run.join()
+    assert [step["status"] for report in reports for step in report.values()] == ["success"] * 16
+
+
+@pytest.mark.asyncio
+async def test_arun_awaits_async_steps_and_offloads_blocking_ones():
+    threads = {}
+
+    def blocking(session_state):
+        threads["cost"] = threading.current_thread().name
+        session_state["cost"] = 1
+
+    async def itinerary(session_state):
+        threads["itinerary"] = threading.current_thread().name
+        await asyncio.sleep(0.01)
+        session_state["itinerary"] = {"id": "trip-1"}
+
+    flow = Workflow("async", [
+        Step("cost", blocking, inputs=("itinerary",), outputs=("cost",)),
+        Step("itinerary", _writer("itinerary", None), outputs=("itinerary",), afn=itinerary),
+        Step("booking", _writer("booking", 2), inputs=("payment_info",), outputs=("booking",)),
+    ])
+
+    state = await flow.arun({})
+
+    assert state["itinerary"] == {"id": "trip-1"} and state["cost"] == 1
+    assert threads["itinerary"] == threading.current_thread().name
+    assert threads["cost"].startswith("offload")
+    report = state["workflow"]["async"]["steps"]
+    assert report["booking"] == {"status": "skipped", "missing": ["payment_info"]}
+    assert report["cost"]["status"] == report["itinerary"]["status"] == "success"
+
+
+@pytest.mark.asyncio
+async def test_arun_caps_steps_in_flight_per_run():
+    active = [0, 0]  # current, peak
+
+    async def step(session_state):
+        active[0] += 1
+        active[1] = max(active[1], active[0])
+        await asyncio.sleep(0.01)
+        active[0] -= 1
+
+    flow = Workflow("capped", [Step(f"s{i}", None, afn=step) for i in range(5)], max_workers=2)
+
+    report = (await flow.arun({}))["workflow"]["capped"]["steps"]
+
+    assert active[1] == 2
+    assert [step["status"] for step in report.values()] == ["success"] * 5